@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Alumno, Padre
+from django.contrib import admin, messages
+from .models import Alumno, Padre, SolicitudRecarga
+from .solicitudes import procesar_solicitudes
 
 @admin.register(Alumno)
 class AlumnoAdmin(admin.ModelAdmin):
@@ -11,3 +12,38 @@ class AlumnoAdmin(admin.ModelAdmin):
 class PadreAdmin(admin.ModelAdmin):
     list_display = ('apellido', 'nombre', 'ruc', 'razon_social', 'email')
     search_fields = ('nombre', 'apellido', 'ruc', 'email')
+
+@admin.register(SolicitudRecarga)
+class SolicitudRecargaAdmin(admin.ModelAdmin):
+    list_display = ('fecha_solicitud', 'alumno', 'padre', 'monto', 'estado', 'procesado_por')
+    list_filter = ('estado', 'fecha_solicitud')
+    search_fields = ('alumno__nombre', 'alumno__apellido', 'alumno__numero_tarjeta', 'padre__username')
+    list_select_related = ('alumno', 'padre', 'procesado_por')
+    raw_id_fields = ('alumno', 'padre')
+    # Aprobar o rechazar solo por las acciones: acreditan el saldo y dejan el movimiento
+    readonly_fields = ('monto', 'estado', 'fecha_procesamiento', 'procesado_por')
+    date_hierarchy = 'fecha_solicitud'
+    actions = ('aprobar_seleccionadas', 'rechazar_seleccionadas')
+
+    def _procesar(self, request, queryset, aprobar):
+        try:
+            resultado = procesar_solicitudes(queryset, request.user, aprobar=aprobar)
+        except ValueError as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return
+        accion = 'aprobadas' if aprobar else 'rechazadas'
+        self.message_user(request, f'{len(resultado["procesadas"])} solicitudes {accion}', messages.SUCCESS)
+        if resultado['omitidas']:
+            self.message_user(
+                request,
+                f'{len(resultado["omitidas"])} solicitudes quedaron pendientes (tarjeta inactiva)',
+                messages.WARNING
+            )
+
+    @admin.action(description='Aprobar solicitudes seleccionadas')
+    def aprobar_seleccionadas(self, request, queryset):
+        self._procesar(request, queryset, aprobar=True)
+
+    @admin.action(description='Rechazar solicitudes seleccionadas')
+    def rechazar_seleccionadas(self, request, queryset):
+        self._procesar(request, queryset, aprobar=False)
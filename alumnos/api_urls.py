@@ -1,7 +1,9 @@
 from django.urls import path
-from .api_views import hijos_del_padre, detalle_alumno
+from .api_views import MovimientosAlumnoView, detalle_alumno, hijos_del_padre, resumen_padre
 
 urlpatterns = [
+    path('resumen/', resumen_padre, name='api_resumen_padre'),
     path('hijos/', hijos_del_padre, name='api_hijos_del_padre'),
     path('hijos/<int:alumno_id>/detalle/', detalle_alumno, name='api_detalle_alumno'),
+    path('hijos/<int:alumno_id>/movimientos/', MovimientosAlumnoView.as_view(), name='api_movimientos_alumno'),
 ]
@@ -1,19 +1,56 @@
+from rest_framework import generics
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Alumno
-from .serializers import AlumnoSerializer
+from .models import Alumno, MovimientoSaldo, Padre
+from .resumen_padre import resumen_padre as construir_resumen_padre
+from .serializers import AlumnoSerializer, MovimientoSaldoSerializer
 from ventas.models import Venta
 from ventas.serializers import VentaSerializer
 
 
+def _padre_de(usuario):
+    try:
+        return usuario.padre_profile
+    except Padre.DoesNotExist:
+        raise PermissionDenied('El usuario no está asociado a un padre/tutor')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def resumen_padre(request):
+    """Hijos, saldos, consumo de hoy y últimos movimientos (cacheado por padre)"""
+    return Response(construir_resumen_padre(_padre_de(request.user).pk))
+
+
+class MovimientosCursorPagination(CursorPagination):
+    """Historial estable aunque entren movimientos nuevos mientras se pagina"""
+    ordering = ('-fecha_movimiento', '-id')
+    page_size = 20
+    page_size_query_param = 'cantidad'
+    max_page_size = 100
+
+
+class MovimientosAlumnoView(generics.ListAPIView):
+    """Historial completo de movimientos de un hijo, paginado por cursor"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = MovimientoSaldoSerializer
+    pagination_class = MovimientosCursorPagination
+
+    def get_queryset(self):
+        padre = _padre_de(self.request.user)
+        return MovimientoSaldo.objects.filter(
+            alumno_id=self.kwargs['alumno_id'], alumno__padre_tutor=padre
+        )
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def hijos_del_padre(request):
-    padre = request.user.padre_profile  # accede al padre conectado
-    hijos = Alumno.objects.filter(padre=padre)
+    padre = _padre_de(request.user)  # accede al padre conectado
+    hijos = Alumno.objects.filter(padre_tutor=padre)
     serializer = AlumnoSerializer(hijos, many=True)
     return Response(serializer.data)
 
@@ -23,7 +60,7 @@ def detalle_alumno(request, alumno_id):
     user = request.user
 
     try:
-        alumno = Alumno.objects.get(id=alumno_id, padre=user.padre_profile)
+        alumno = Alumno.objects.get(id=alumno_id, padre_tutor=_padre_de(user))
     except Alumno.DoesNotExist:
         return Response({'error': 'Alumno no encontrado o no pertenece al padre'}, status=404)
 
@@ -0,0 +1,146 @@
+"""
+Límite de consumo diario de la tarjeta de cantina.
+
+Controlar el límite sumando las ventas del día del alumno en cada compra
+no escala. En su lugar, ``ConsumoDiario`` guarda lo gastado con la tarjeta
+por alumno y día, y el cobro lo actualiza con una única sentencia que a la
+vez controla el límite::
+
+    INSERT INTO alumnos_consumodiario (alumno_id, fecha, total, cantidad)
+    VALUES (...)
+    ON CONFLICT (alumno_id, fecha) DO UPDATE
+       SET total = total + EXCLUDED.total, cantidad = cantidad + 1
+     WHERE total + EXCLUDED.total <= limite
+ RETURNING total
+
+Si no vuelve ninguna fila, la compra supera el límite. Como la sentencia
+corre en la transacción de la venta, una venta que falla no deja consumo.
+
+Solo cuenta lo pagado con la tarjeta de cantina: el límite lo fijan los
+padres sobre el saldo que cargan.
+
+``disponibles_del_dia`` (el disponible que muestra la búsqueda de
+clientes del POS) lee la caché del worker con la fecha como parte de la clave, así el cambio de día no
+requiere invalidar nada. La caché solo se usa para mostrar: el límite se
+controla siempre en la base. ``manage.py rotar_consumos_diarios`` purga
+cada noche los contadores viejos.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ConsumoDiario
+
+CENTAVOS = Decimal('0.01')
+
+
+def clave_cache(alumno_id, fecha):
+    return f'consumo_diario:{fecha.isoformat()}:{alumno_id}'
+
+
+def _segundos_hasta_fin_del_dia(fecha):
+    fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+    return max(int((fin - timezone.now()).total_seconds()), 1)
+
+
+def _guardar_en_cache(alumno_id, fecha, total):
+    ttl = min(getattr(settings, 'CONSUMO_DIARIO_CACHE_TTL', 300), _segundos_hasta_fin_del_dia(fecha))
+    cache.set(clave_cache(alumno_id, fecha), total, ttl)
+
+
+def registrar_consumo(alumno_id, monto, limite, fecha=None):
+    """
+    Suma ``monto`` al consumo del día de ``alumno_id`` si no supera ``limite``.
+
+    ``limite`` 0 significa sin límite. Retorna el total consumido en el día
+    o lanza ValueError si la compra supera el límite. Debe llamarse dentro
+    de la transacción de la venta.
+    """
+    monto = Decimal(str(monto)).quantize(CENTAVOS)
+    limite = Decimal(str(limite or 0)).quantize(CENTAVOS)
+    fecha = fecha or timezone.localdate()
+    if limite and monto > limite:
+        _rechazar(alumno_id, fecha, monto, limite)
+
+    tabla = connection.ops.quote_name(ConsumoDiario._meta.db_table)
+    parametros = [
+        alumno_id, connection.ops.adapt_datefield_value(fecha),
+        connection.ops.adapt_decimalfield_value(monto, 12, 2),
+    ]
+    condicion = ''
+    if limite:
+        condicion = f"WHERE {tabla}.total + EXCLUDED.total <= CAST(%s AS NUMERIC) "
+        parametros.append(connection.ops.adapt_decimalfield_value(limite, 12, 2))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (alumno_id, fecha, total, cantidad) VALUES (%s, %s, %s, 1) "
+            f"ON CONFLICT (alumno_id, fecha) DO UPDATE "
+            f"SET total = {tabla}.total + EXCLUDED.total, cantidad = {tabla}.cantidad + 1 "
+            f"{condicion}"
+            f"RETURNING total",
+            parametros
+        )
+        fila = cursor.fetchone()
+
+    if fila is None:
+        _rechazar(alumno_id, fecha, monto, limite)
+
+    total = Decimal(str(fila[0])).quantize(CENTAVOS)
+    transaction.on_commit(lambda: _guardar_en_cache(alumno_id, fecha, total))
+    return total
+
+
+def _rechazar(alumno_id, fecha, monto, limite):
+    """Solo en el camino de error: arma el mensaje con lo disponible"""
+    consumido = ConsumoDiario.objects.filter(alumno_id=alumno_id, fecha=fecha).values_list('total', flat=True).first()
+    disponible = max(limite - (consumido or 0), Decimal('0'))
+    raise ValueError(
+        f'Límite de consumo diario excedido. Disponible hoy: {disponible}, requerido: {monto}'
+    )
+
+
+def revertir_consumo(alumno_id, monto, fecha):
+    """Descuenta una venta anulada del consumo de su día"""
+    ConsumoDiario.objects.filter(alumno_id=alumno_id, fecha=fecha).update(
+        total=F('total') - monto, cantidad=F('cantidad') - 1
+    )
+    transaction.on_commit(lambda: cache.delete(clave_cache(alumno_id, fecha)))
+
+
+def consumos_del_dia(alumno_ids, fecha=None):
+    """
+    {alumno_id: total gastado con la tarjeta en el día}: un ``get_many`` de
+    la caché del worker y, para los que falten, una sola lectura por índice
+    """
+    fecha = fecha or timezone.localdate()
+    claves = {clave_cache(alumno_id, fecha): alumno_id for alumno_id in alumno_ids}
+    consumos = {claves[clave]: total for clave, total in cache.get_many(list(claves)).items()}
+    faltantes = [alumno_id for alumno_id in claves.values() if alumno_id not in consumos]
+    if faltantes:
+        leidos = dict(ConsumoDiario.objects.filter(
+            alumno_id__in=faltantes, fecha=fecha
+        ).values_list('alumno_id', 'total'))
+        for alumno_id in faltantes:
+            consumos[alumno_id] = leidos.get(alumno_id, Decimal('0.00'))
+            _guardar_en_cache(alumno_id, fecha, consumos[alumno_id])
+    return consumos
+
+
+def consumo_del_dia(alumno_id, fecha=None):
+    """Total gastado con la tarjeta en el día (caché del worker o una lectura por índice)"""
+    return consumos_del_dia([alumno_id], fecha)[alumno_id]
+
+
+def disponibles_del_dia(alumnos, fecha=None):
+    """{alumno.id: lo que aún puede gastar hoy, o None si no tiene límite}"""
+    con_limite = [alumno for alumno in alumnos if alumno.limite_consumo]
+    consumos = consumos_del_dia([alumno.id for alumno in con_limite], fecha)
+    disponibles = {alumno.id: None for alumno in alumnos}
+    for alumno in con_limite:
+        disponibles[alumno.id] = max(alumno.limite_consumo - consumos[alumno.id], Decimal('0.00'))
+    return disponibles
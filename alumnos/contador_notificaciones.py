@@ -0,0 +1,102 @@
+"""
+Contador de notificaciones no leídas por usuario.
+
+Cada página consultaba el contador con un ``COUNT(*)`` sobre
+``Notificacion``: con cientos de padres conectados es una carga constante
+para un número que casi nunca cambia. El contador vive en la caché con la
+clave ``notificaciones_no_leidas:{usuario_id}``:
+
+* Si la clave no está, una lectura la llena con un ``COUNT(*)`` por índice.
+* Crear, leer o eliminar notificaciones la ajusta con ``incr``/``decr``
+  después del commit. Si la clave no está no se hace nada: la próxima
+  lectura la vuelve a contar.
+* ``esperar_cambio`` (long-poll y SSE) es asíncrona y solo lee la caché,
+  así un cliente en espera no ocupa un hilo del worker ni cuesta consultas.
+
+Esperar solo tiene sentido con una caché compartida (Redis, Memcached):
+con la caché local de cada worker (o la ``DummyCache``) los ajustes de
+otro proceso, por ejemplo ``procesar_notificaciones``, recién se ven al
+vencer la clave (``NOTIFICACIONES_CACHE_TTL``, 60 segundos por defecto).
+Sin caché compartida ``cache_compartida()`` es falsa y las vistas
+responden de inmediato, para que el cliente vuelva a consultar más tarde.
+"""
+import asyncio
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .models_notificaciones import Notificacion
+
+
+def clave_cache(usuario_id):
+    return f'notificaciones_no_leidas:{usuario_id}'
+
+
+def _ttl():
+    return getattr(settings, 'NOTIFICACIONES_CACHE_TTL', 60)
+
+
+def no_leidas(usuario_id):
+    """Cantidad de notificaciones no leídas (caché o un COUNT por índice)"""
+    cantidad = cache.get(clave_cache(usuario_id))
+    if cantidad is None:
+        cantidad = Notificacion.objects.filter(usuario_id=usuario_id, leida=False).count()
+        cache.set(clave_cache(usuario_id), cantidad, _ttl())
+    return cantidad
+
+
+def _aplicar(cambios):
+    for usuario_id, delta in cambios.items():
+        if not delta:
+            continue
+        try:
+            cantidad = cache.incr(clave_cache(usuario_id), delta)
+        except ValueError:
+            continue  # No estaba en caché: la próxima lectura cuenta
+        if cantidad < 0:
+            cache.delete(clave_cache(usuario_id))
+
+
+def ajustar(cambios):
+    """
+    Suma ``{usuario_id: delta}`` a los contadores cuando la transacción
+    en curso se confirma.
+    """
+    cambios = Counter(cambios)
+    if cambios:
+        transaction.on_commit(lambda: _aplicar(cambios))
+
+
+def reiniciar(usuario_id, cantidad=None):
+    """Fija el contador (``cantidad``) o lo descarta para que se recuente"""
+    if cantidad is None:
+        transaction.on_commit(lambda: cache.delete(clave_cache(usuario_id)))
+    else:
+        transaction.on_commit(lambda: cache.set(clave_cache(usuario_id), cantidad, _ttl()))
+
+
+def cache_compartida():
+    """¿La caché por defecto la comparten todos los procesos?"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+async def esperar_cambio(usuario_id, conocido, timeout, intervalo=1.0):
+    """
+    Espera hasta ``timeout`` segundos a que el contador difiera de
+    ``conocido``; retorna el valor actual. Entre lecturas solo consulta la
+    caché y no bloquea el hilo.
+    """
+    limite = time.monotonic() + timeout
+    cantidad = await sync_to_async(no_leidas)(usuario_id)
+    while cantidad == conocido and time.monotonic() < limite:
+        await asyncio.sleep(intervalo)
+        cantidad = await cache.aget(clave_cache(usuario_id))
+        if cantidad is None:
+            cantidad = await sync_to_async(no_leidas)(usuario_id)
+    return cantidad
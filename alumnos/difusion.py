@@ -0,0 +1,218 @@
+"""
+Expansión de la bandeja de salida de notificaciones (``EventoNotificacion``).
+
+Los productores (cobro, recargas, solicitudes, alertas de stock) solo
+agregan una fila compacta; el costo de avisar a muchos padres o
+administradores no recae en la operación que lo originó.
+
+``procesar_lote`` toma los eventos pendientes más antiguos con
+``SELECT ... FOR UPDATE SKIP LOCKED`` (varios hilos o procesos se reparten
+la bandeja sin pisarse), los agrupa por tipo y cada expansor resuelve los
+destinatarios de todo el grupo con una consulta y devuelve pares
+``(evento, notificación)`` sin guardar. Las notificaciones se
+insertan con ``bulk_create`` y los eventos se marcan procesados con un
+UPDATE, todo en la misma transacción. Al confirmarse se ajustan los
+contadores de no leídas de cada destinatario.
+
+Si un expansor falla, sus eventos quedan pendientes con el error y se
+reintentan hasta ``MAXIMO_INTENTOS`` veces, con espera exponencial
+(``ESPERA_REINTENTO`` segundos, luego el doble, ...) registrada en
+``proximo_intento``: el evento no se vuelve a tomar antes de esa hora.
+"""
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .contador_notificaciones import ajustar
+from .models import Alumno, EventoNotificacion, MovimientoSaldo, Notificacion, SolicitudRecarga
+
+MAXIMO_INTENTOS = 5
+ESPERA_REINTENTO = 30
+
+
+def _guaranies(valor):
+    return f'₲{Decimal(str(valor)):,.0f}'.replace(',', '.')
+
+
+def _padres(alumno_ids):
+    """{alumno_id: (usuario_id del padre, nombre del alumno)} en una consulta"""
+    return {
+        fila['id']: (fila['padre_tutor__usuario_id'], fila['nombre'])
+        for fila in Alumno.objects.filter(
+            pk__in=alumno_ids, padre_tutor__usuario__isnull=False
+        ).values('id', 'nombre', 'padre_tutor__usuario_id')
+    }
+
+
+def _movimientos_saldo(eventos):
+    eventos_por_id = {pk: evento for evento in eventos for pk in evento.datos.get('movimientos', [])}
+    movimientos = MovimientoSaldo.objects.filter(
+        pk__in=list(eventos_por_id), alumno__padre_tutor__usuario__isnull=False
+    ).order_by().values('pk', 'tipo', 'monto', 'saldo_nuevo', 'alumno__nombre', 'alumno__padre_tutor__usuario_id')
+    tipo_movimiento = ContentType.objects.get_for_model(MovimientoSaldo)
+    tipos = dict(MovimientoSaldo.TIPO_MOVIMIENTO)
+    return [
+        (eventos_por_id[movimiento['pk']], Notificacion(
+            usuario_id=movimiento['alumno__padre_tutor__usuario_id'],
+            titulo=f'{tipos.get(movimiento["tipo"], "Movimiento")} - {movimiento["alumno__nombre"]}',
+            mensaje=(
+                f'{tipos.get(movimiento["tipo"], "Movimiento")} de {_guaranies(movimiento["monto"])} '
+                f'para {movimiento["alumno__nombre"]}. Saldo actual: {_guaranies(movimiento["saldo_nuevo"])}'
+            ),
+            tipo='transaccion',
+            nivel='info',
+            content_type=tipo_movimiento,
+            object_id=movimiento['pk'],
+        ))
+        for movimiento in movimientos
+    ]
+
+
+def _saldos(evento):
+    """Un evento trae un alumno o, si viene del barrido, la lista ``alumnos``"""
+    if 'alumnos' in evento.datos:
+        return evento.datos['alumnos']
+    return [(evento.datos['alumno_id'], evento.datos['saldo'])]
+
+
+def _saldo_bajo(eventos):
+    padres = _padres({alumno_id for evento in eventos for alumno_id, _ in _saldos(evento)})
+    notificaciones = []
+    for evento in eventos:
+        for alumno_id, saldo in _saldos(evento):
+            if alumno_id not in padres:
+                continue
+            usuario_id, nombre = padres[alumno_id]
+            notificaciones.append((evento, Notificacion(
+                usuario_id=usuario_id,
+                titulo=f'Saldo Bajo - {nombre}',
+                mensaje=f'El saldo de {nombre} es {_guaranies(saldo)}. Por favor realice una recarga.',
+                tipo='saldo_bajo',
+                nivel='warning',
+            )))
+    return notificaciones
+
+
+def _limite_consumo(eventos):
+    padres = _padres({evento.datos['alumno_id'] for evento in eventos})
+    notificaciones = []
+    for evento in eventos:
+        if evento.datos['alumno_id'] not in padres:
+            continue
+        usuario_id, nombre = padres[evento.datos['alumno_id']]
+        notificaciones.append((evento, Notificacion(
+            usuario_id=usuario_id,
+            titulo=f'Límite de Consumo Alcanzado - {nombre}',
+            mensaje=f'{nombre} alcanzó su límite de consumo diario. Consumo de hoy: {_guaranies(evento.datos["consumo"])}',
+            tipo='limite_consumo',
+            nivel='warning',
+        )))
+    return notificaciones
+
+
+def _solicitudes_procesadas(eventos):
+    eventos_por_id = {pk: evento for evento in eventos for pk in evento.datos.get('solicitudes', [])}
+    solicitudes = SolicitudRecarga.objects.filter(pk__in=list(eventos_por_id)).select_related('alumno')
+    tipo_solicitud = ContentType.objects.get_for_model(SolicitudRecarga)
+    return [
+        (eventos_por_id[solicitud.pk], Notificacion(
+            usuario_id=solicitud.padre_id,
+            titulo=f'Solicitud de Recarga {solicitud.get_estado_display().lower()}',
+            mensaje=(
+                f'Tu solicitud de recarga por {_guaranies(solicitud.monto)} para '
+                f'{solicitud.alumno.nombre} ha sido {solicitud.get_estado_display().lower()}.'
+            ),
+            tipo='solicitud',
+            nivel='success' if solicitud.estado == 'aprobada' else 'info',
+            content_type=tipo_solicitud,
+            object_id=solicitud.pk,
+        ))
+        for solicitud in solicitudes
+    ]
+
+
+def _stock(eventos):
+    from productos.alertas_stock import destinatarios as destinatarios_stock
+
+    destinatarios = destinatarios_stock()
+    return [
+        (evento, Notificacion(
+            usuario_id=usuario_id,
+            titulo=evento.datos['titulo'],
+            mensaje=evento.datos['mensaje'],
+            tipo='stock',
+            nivel=evento.datos.get('nivel', 'warning'),
+        ))
+        for evento in eventos
+        for usuario_id in destinatarios
+    ]
+
+
+EXPANSORES = {
+    'movimiento_saldo': _movimientos_saldo,
+    'saldo_bajo': _saldo_bajo,
+    'limite_consumo': _limite_consumo,
+    'solicitud_procesada': _solicitudes_procesadas,
+    'stock': _stock,
+}
+
+
+def procesar_lote(tamano=200):
+    """
+    Expande hasta ``tamano`` eventos pendientes. Retorna la cantidad de
+    eventos tomados (0 cuando no queda ninguno listo para procesar).
+    """
+    ahora = timezone.now()
+    with transaction.atomic():
+        pendientes = EventoNotificacion.objects.filter(
+            Q(proximo_intento__isnull=True) | Q(proximo_intento__lte=ahora),
+            fecha_procesado__isnull=True, intentos__lt=MAXIMO_INTENTOS,
+        ).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pendientes = pendientes.select_for_update(skip_locked=True)
+        eventos = list(pendientes[:tamano])
+        if not eventos:
+            return 0
+
+        por_tipo = {}
+        for evento in eventos:
+            por_tipo.setdefault(evento.tipo, []).append(evento)
+
+        for tipo, grupo in por_tipo.items():
+            ids = [evento.pk for evento in grupo]
+            try:
+                with transaction.atomic():
+                    expansor = EXPANSORES.get(tipo)
+                    if expansor is None:
+                        raise ValueError(f'Tipo de evento desconocido: {tipo}')
+                    pares = expansor(grupo)
+                    Notificacion.objects.bulk_create([n for _, n in pares], batch_size=1000)
+                    ajustar(Counter(notificacion.usuario_id for _, notificacion in pares))
+            except Exception as e:
+                # La espera depende de los intentos previos de cada evento
+                por_intentos = {}
+                for evento in grupo:
+                    por_intentos.setdefault(evento.intentos, []).append(evento.pk)
+                for intentos, pks in por_intentos.items():
+                    EventoNotificacion.objects.filter(pk__in=pks).update(
+                        intentos=F('intentos') + 1, error=str(e)[:1000],
+                        proximo_intento=ahora + timedelta(seconds=ESPERA_REINTENTO * 2 ** intentos),
+                    )
+                continue
+
+            # Un UPDATE por cada cantidad distinta de notificaciones (casi siempre una o dos)
+            creadas = Counter(evento.pk for evento, _ in pares)
+            por_cantidad = {}
+            for pk in ids:
+                por_cantidad.setdefault(creadas[pk], []).append(pk)
+            for cantidad, pks in por_cantidad.items():
+                EventoNotificacion.objects.filter(pk__in=pks).update(
+                    fecha_procesado=ahora, notificaciones_creadas=cantidad, error=''
+                )
+
+        return len(eventos)
@@ -0,0 +1,207 @@
+"""
+Estados de cuenta mensuales por familia (``Padre``).
+
+Cada estado lista los hijos del padre con su saldo inicial, las recargas
+y compras del mes y el saldo de cierre. Se arman por bloques de padres con
+consultas de conjunto, nunca por alumno:
+
+1. Los padres activos del bloque que tienen hijos.
+2. Sus hijos con el saldo de apertura del mes: el cierre de la foto
+   ``SaldoMensual`` del mes anterior (el mismo que mostró el estado
+   anterior). Solo sin foto se lee el libro, con subconsultas sobre el
+   índice (alumno, fecha_movimiento).
+3. Todos los movimientos del mes de esos hijos, en orden.
+
+Los estados son diccionarios simples: se renderizan (CSV o PDF) en un pool
+de procesos y el proceso principal escribe los archivos en el storage de
+media, en ``estados_cuenta/AAAA-MM/padre_<id>.<formato>``. Un estado que
+ya existe se saltea, así una corrida interrumpida se retoma donde quedó.
+Por eso cada archivo se escribe con un nombre temporal y se renombra al
+terminar: un archivo a medio escribir nunca queda con el nombre final.
+"""
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+
+from .libro_saldos import _momento, inicio_mes, mes_siguiente
+from .models import Alumno, MovimientoSaldo, Padre, SaldoMensual
+
+FORMATOS = ('csv', 'pdf')
+PADRES_POR_BLOQUE = 200
+
+
+def ruta_estado(mes, padre_id, formato):
+    return f'estados_cuenta/{mes:%Y-%m}/padre_{padre_id}.{formato}'
+
+
+def _generados(mes, formato):
+    """Nombres ya escritos para ``mes`` (una sola llamada al storage)"""
+    try:
+        _, archivos = default_storage.listdir(f'estados_cuenta/{mes:%Y-%m}')
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+    return {nombre for nombre in archivos if nombre.endswith(f'.{formato}')}
+
+
+def _guardar(ruta, contenido, forzar):
+    """Escribe ``ruta`` completa o no la escribe"""
+    try:
+        destino = default_storage.path(ruta)
+    except NotImplementedError:
+        # Storage remoto (S3, ...): el objeto aparece completo al terminar la subida
+        if forzar and default_storage.exists(ruta):
+            default_storage.delete(ruta)
+        default_storage.save(ruta, ContentFile(contenido))
+        return
+
+    parcial = f'{ruta}.parcial'
+    if default_storage.exists(parcial):
+        default_storage.delete(parcial)
+    default_storage.save(parcial, ContentFile(contenido))
+    os.replace(default_storage.path(parcial), destino)
+
+
+def armar_estados(mes, padre_ids):
+    """
+    Estados de cuenta de ``mes`` para ``padre_ids`` con tres consultas.
+    Retorna una lista de diccionarios serializables (uno por padre).
+    """
+    mes = inicio_mes(mes)
+    inicio, fin = _momento(mes), _momento(mes_siguiente(mes))
+
+    padres = {
+        padre['id']: {**padre, 'mes': mes.strftime('%Y-%m'), 'hijos': []}
+        for padre in Padre.objects.filter(pk__in=padre_ids).order_by('id').values(
+            'id', 'nombre', 'apellido', 'ruc', 'razon_social', 'email'
+        )
+    }
+
+    foto = SaldoMensual.objects.filter(alumno_id=OuterRef('pk'), mes=inicio_mes(mes - timedelta(days=1)))
+    movimientos = MovimientoSaldo.objects.filter(alumno_id=OuterRef('pk')).order_by()
+    anterior = movimientos.filter(fecha_movimiento__lt=inicio).order_by('-fecha_movimiento', '-id')
+    primero = movimientos.filter(fecha_movimiento__gte=inicio).order_by('fecha_movimiento', 'id')
+    hijos = Alumno.objects.filter(padre_tutor_id__in=padres).annotate(
+        # Sin foto del mes anterior, el último saldo previo; sin movimientos previos, el saldo
+        # previo al primer movimiento; sin ninguno, el saldo actual
+        apertura=Coalesce(
+            Subquery(foto.values('saldo_cierre')[:1]),
+            Subquery(anterior.values('saldo_nuevo')[:1]),
+            Subquery(primero.values('saldo_anterior')[:1]),
+            'saldo_tarjeta',
+        ),
+    ).order_by('padre_tutor_id', 'nombre', 'apellido').values(
+        'id', 'padre_tutor_id', 'nombre', 'apellido', 'numero_tarjeta', 'apertura'
+    )
+
+    por_alumno = {}
+    for hijo in hijos:
+        apertura = Decimal(str(hijo['apertura'])).quantize(Decimal('0.01'))
+        datos = {
+            'nombre': f"{hijo['nombre']} {hijo['apellido']}",
+            'numero_tarjeta': hijo['numero_tarjeta'],
+            'saldo_inicial': apertura,
+            'saldo_cierre': apertura,
+            'total_cargas': Decimal('0.00'),
+            'total_consumos': Decimal('0.00'),
+            'movimientos': [],
+        }
+        padres[hijo['padre_tutor_id']]['hijos'].append(datos)
+        por_alumno[hijo['id']] = datos
+
+    del_mes = MovimientoSaldo.objects.filter(
+        alumno_id__in=por_alumno, fecha_movimiento__gte=inicio, fecha_movimiento__lt=fin
+    ).order_by('alumno_id', 'fecha_movimiento', 'id').values_list(
+        'alumno_id', 'fecha_movimiento', 'tipo', 'descripcion', 'monto', 'saldo_anterior', 'saldo_nuevo'
+    )
+    for alumno_id, fecha, tipo, descripcion, monto, saldo_anterior, saldo_nuevo in del_mes.iterator(chunk_size=5000):
+        datos = por_alumno[alumno_id]
+        datos['saldo_cierre'] += saldo_nuevo - saldo_anterior
+        if tipo == 'carga':
+            datos['total_cargas'] += monto
+        elif tipo == 'compra':
+            datos['total_consumos'] += monto
+        datos['movimientos'].append({
+            'fecha': fecha, 'tipo': tipo, 'descripcion': descripcion or '', 'monto': monto, 'saldo': saldo_nuevo,
+        })
+
+    return list(padres.values())
+
+
+def renderizar_csv(estado):
+    salida = io.StringIO()
+    escritor = csv.writer(salida, delimiter=';')
+    escritor.writerow(['Estado de cuenta', estado['mes'], estado['razon_social'], estado['ruc']])
+    escritor.writerow(['alumno', 'tarjeta', 'fecha', 'tipo', 'descripcion', 'monto', 'saldo'])
+    for hijo in estado['hijos']:
+        escritor.writerow([hijo['nombre'], hijo['numero_tarjeta'], '', 'saldo_inicial', '', '', hijo['saldo_inicial']])
+        for movimiento in hijo['movimientos']:
+            escritor.writerow([
+                hijo['nombre'], hijo['numero_tarjeta'], movimiento['fecha'].strftime('%Y-%m-%d %H:%M'),
+                movimiento['tipo'], movimiento['descripcion'], movimiento['monto'], movimiento['saldo'],
+            ])
+        escritor.writerow([hijo['nombre'], hijo['numero_tarjeta'], '', 'saldo_cierre', '', '', hijo['saldo_cierre']])
+    return salida.getvalue().encode('utf-8-sig')
+
+
+def renderizar_pdf(estado):
+    from weasyprint import HTML  # Carga librerías nativas: solo al renderizar PDF
+
+    html = render_to_string('alumnos/estados_cuenta/estado_cuenta.html', {'estado': estado})
+    return HTML(string=html).write_pdf()
+
+
+def _renderizar(estado, formato):
+    """Corre en el pool de procesos: no toca la base"""
+    contenido = renderizar_pdf(estado) if formato == 'pdf' else renderizar_csv(estado)
+    return estado['id'], contenido
+
+
+def generar_estados(mes, formato='csv', procesos=None, forzar=False, padres_por_bloque=PADRES_POR_BLOQUE):
+    """
+    Genera los estados de cuenta de ``mes`` de todos los padres activos con
+    hijos. ``procesos=0`` renderiza en el proceso actual. Retorna
+    ``{'generados', 'salteados', 'segundos'}``.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato no soportado: {formato}')
+    mes = inicio_mes(mes)
+    inicio = time.perf_counter()
+
+    padre_ids = list(
+        Padre.objects.filter(activo=True).annotate(cantidad_hijos=Count('hijos'))
+        .filter(cantidad_hijos__gt=0).order_by('id').values_list('id', flat=True)
+    )
+    generados = set() if forzar else _generados(mes, formato)
+    pendientes = [pk for pk in padre_ids if f'padre_{pk}.{formato}' not in generados]
+    resultado = {'generados': 0, 'salteados': len(padre_ids) - len(pendientes)}
+
+    pool = ProcessPoolExecutor(max_workers=procesos) if procesos != 0 else None
+    try:
+        for desde in range(0, len(pendientes), padres_por_bloque):
+            estados = armar_estados(mes, pendientes[desde:desde + padres_por_bloque])
+            if pool is None:
+                renderizados = (_renderizar(estado, formato) for estado in estados)
+            else:
+                # Los procesos se crean con fork en el primer map: no deben heredar conexiones abiertas
+                connections.close_all()
+                renderizados = pool.map(_renderizar, estados, [formato] * len(estados))
+            for padre_id, contenido in renderizados:
+                _guardar(ruta_estado(mes, padre_id, formato), contenido, forzar)
+                resultado['generados'] += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
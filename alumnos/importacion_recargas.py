@@ -0,0 +1,255 @@
+"""
+Importación masiva de recargas desde el extracto del banco (CSV o XLSX).
+
+A principio de mes la oficina recibe cientos de transferencias. En lugar de
+cargarlas una por una, el archivo se procesa en dos pasos:
+
+1. **Lectura y validación.** Las filas se leen en streaming y se comparan
+   contra un diccionario del directorio de alumnos armado con una sola
+   consulta (por ``numero_tarjeta`` y por ``ci``). Nada se escribe hasta
+   validar todo el archivo; con errores no se aplica ninguna fila, salvo que
+   se pida una importación ``parcial``.
+
+   Cada fila debe traer la referencia de la transferencia. Se guarda en
+   ``MovimientoSaldo.referencia_banco`` (única), así que volver a importar
+   el mismo extracto rechaza las filas ya acreditadas en lugar de
+   acreditarlas dos veces.
+
+   Los montos vienen en guaraníes con separador de miles: ``50.000`` y
+   ``50,000`` son cincuenta mil. Un separador seguido de uno o dos dígitos
+   es el decimal; cualquier otra combinación se rechaza.
+2. **Saldos y libro.** Las filas válidas se pasan a
+   ``saldo.acreditar_en_bloque``: bloquea los alumnos en orden, suma los
+   montos con un ``UPDATE ... FROM (VALUES ...)`` por bloque e inserta los
+   ``MovimientoSaldo`` con ``bulk_create``, encadenando los saldos
+   anterior/nuevo en el orden del archivo.
+
+El resultado es un reporte con el estado de cada fila del archivo.
+"""
+import csv
+import io
+import re
+import zipfile
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError
+
+from .models import Alumno, MovimientoSaldo
+from .saldo import CENTAVOS, acreditar_en_bloque
+
+COLUMNAS = {
+    'numero_tarjeta': ('numero_tarjeta', 'tarjeta', 'nro_tarjeta'),
+    'ci': ('ci', 'cedula', 'documento'),
+    'monto': ('monto', 'importe'),
+    'referencia': ('referencia', 'nro_referencia', 'comprobante', 'nro_operacion'),
+    'concepto': ('concepto', 'descripcion'),
+}
+
+# Miles agrupados de a tres con un mismo separador, y decimales opcionales
+# (uno o dos dígitos) con el otro separador
+MONTO = re.compile(r'-?(\d{1,3}([.,])\d{3}(?:\2\d{3})*|\d+)(?:([.,])(\d{1,2}))?')
+
+
+def _normalizar_encabezado(encabezado):
+    nombres = [str(nombre or '').strip().lower().replace(' ', '_') for nombre in encabezado]
+    columnas = {}
+    for campo, alias in COLUMNAS.items():
+        for indice, nombre in enumerate(nombres):
+            if nombre in alias:
+                columnas[campo] = indice
+                break
+    if 'monto' not in columnas or not {'numero_tarjeta', 'ci'} & columnas.keys():
+        raise ValueError('El archivo debe tener la columna monto y numero_tarjeta o ci')
+    if 'referencia' not in columnas:
+        raise ValueError('El archivo debe tener la columna referencia (número de operación del banco)')
+    return columnas
+
+
+def _filas(encabezado, registros):
+    """Valida el encabezado de inmediato y retorna el iterador de (linea, datos)"""
+    return _iterar_filas(_normalizar_encabezado(encabezado), registros)
+
+
+def _iterar_filas(columnas, registros):
+    for linea, registro in registros:
+        if not any(str(valor or '').strip() for valor in registro):
+            continue
+        yield linea, {
+            campo: str(registro[indice] if indice < len(registro) and registro[indice] is not None else '').strip()
+            for campo, indice in columnas.items()
+        }
+
+
+def leer_csv(archivo):
+    """Lee un CSV (separado por coma o punto y coma) desde un archivo binario o de texto"""
+    if not isinstance(archivo, io.TextIOBase):
+        archivo = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = archivo.readline()
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    encabezado = next(csv.reader([muestra], dialecto), None)
+    if not encabezado:
+        raise ValueError('El archivo está vacío')
+    registros = csv.reader(archivo, dialecto)
+    return _filas(encabezado, ((registros.line_num + 1, registro) for registro in registros))
+
+
+def leer_xlsx(archivo):
+    """Lee la primera hoja de un XLSX en modo de solo lectura (requiere openpyxl)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('La importación de XLSX no está disponible en el servidor (falta openpyxl); use CSV')
+
+    try:
+        hoja = load_workbook(archivo, read_only=True, data_only=True).worksheets[0]
+    except (zipfile.BadZipFile, KeyError, IndexError) as e:
+        raise ValueError(f'El archivo XLSX no es válido: {e}')
+    registros = hoja.iter_rows(values_only=True)
+    encabezado = next(registros, None)
+    if not encabezado:
+        raise ValueError('El archivo está vacío')
+    return _filas(encabezado, enumerate(registros, start=2))
+
+
+def leer_archivo(archivo, nombre):
+    """Elige el lector según la extensión de ``nombre``"""
+    if nombre.lower().endswith('.xlsx'):
+        return leer_xlsx(archivo)
+    if nombre.lower().endswith(('.csv', '.txt')):
+        return leer_csv(archivo)
+    raise ValueError('Formato no soportado: use CSV o XLSX')
+
+
+def _directorio():
+    """Directorio completo en memoria: una consulta para todo el archivo"""
+    por_tarjeta, por_ci = {}, {}
+    for alumno in Alumno.objects.values('id', 'numero_tarjeta', 'ci', 'nombre', 'apellido', 'activo'):
+        por_tarjeta[alumno['numero_tarjeta']] = alumno
+        por_ci[alumno['ci']] = alumno
+    return por_tarjeta, por_ci
+
+
+def _validar(datos, por_tarjeta, por_ci):
+    """Retorna (alumno, monto) o lanza ValueError con el motivo del rechazo"""
+    tarjeta, ci = datos.get('numero_tarjeta', ''), datos.get('ci', '')
+    if not tarjeta and not ci:
+        raise ValueError('Falta numero_tarjeta o ci')
+
+    alumno = por_tarjeta.get(tarjeta) if tarjeta else por_ci.get(ci)
+    if alumno is None:
+        raise ValueError(f'Alumno no encontrado: {tarjeta or ci}')
+    if tarjeta and ci and alumno['ci'] != ci:
+        raise ValueError(f'La tarjeta {tarjeta} no corresponde a la CI {ci}')
+    if not alumno['activo']:
+        raise ValueError(f'La tarjeta de {alumno["nombre"]} {alumno["apellido"]} está inactiva')
+
+    monto = leer_monto(datos['monto'])
+    if monto <= 0:
+        raise ValueError('El monto debe ser mayor a cero')
+    return alumno, monto
+
+
+def leer_monto(valor):
+    """
+    Monto en guaraníes del extracto: ``50.000``, ``50,000``, ``1.250.000,50``
+    o ``50000``. Lanza ValueError si el formato es ambiguo o inválido.
+    """
+    texto = re.sub(r'\s|₲|(?i:gs)\.?', '', valor)
+    coincidencia = MONTO.fullmatch(texto)
+    if coincidencia is None or (coincidencia[2] and coincidencia[2] == coincidencia[3]):
+        raise ValueError(f'Monto inválido: {valor}')
+    entero = re.sub(r'[.,]', '', coincidencia[1])
+    try:
+        monto = Decimal(f'{entero}.{coincidencia[4] or 0}').quantize(CENTAVOS)
+    except InvalidOperation:
+        raise ValueError(f'Monto inválido: {valor}')
+    return -monto if texto.startswith('-') else monto
+
+
+def _validar_referencia(referencia, importadas, vistas):
+    if not referencia:
+        raise ValueError('Falta la referencia del banco')
+    if referencia in importadas:
+        raise ValueError(f'La referencia {referencia} ya fue importada')
+    if referencia in vistas:
+        raise ValueError(f'La referencia {referencia} está repetida en el archivo')
+    vistas.add(referencia)
+    return referencia
+
+
+def importar_recargas(filas, usuario=None, parcial=False, simular=False):
+    """
+    Valida y aplica las recargas de ``filas`` (pares ``(linea, datos)`` como
+    los de ``leer_archivo``).
+
+    Con errores de validación no se aplica nada, salvo ``parcial=True``.
+    ``simular=True`` solo valida. Retorna el reporte::
+
+        {'aplicadas': n, 'errores': n, 'monto_total': Decimal,
+         'filas': [{'linea', 'identificador', 'referencia', 'alumno_id', 'alumno',
+                    'monto', 'estado', 'mensaje', 'saldo_nuevo'}, ...]}
+
+    ``estado`` es 'aplicada', 'valida' (simulación o archivo rechazado),
+    o 'error'.
+    """
+    por_tarjeta, por_ci = _directorio()
+    filas = list(filas)
+    # Referencias ya acreditadas por importaciones anteriores, en una consulta
+    importadas = set(MovimientoSaldo.objects.filter(
+        referencia_banco__in={datos.get('referencia') for _, datos in filas if datos.get('referencia')}
+    ).values_list('referencia_banco', flat=True))
+
+    reporte, validas, vistas = [], [], set()
+    for linea, datos in filas:
+        fila = {
+            'linea': linea,
+            'identificador': datos.get('numero_tarjeta') or datos.get('ci', ''),
+            'referencia': datos.get('referencia', ''),
+            'alumno_id': None, 'alumno': '', 'monto': datos.get('monto', ''),
+            'estado': 'valida', 'mensaje': '', 'saldo_nuevo': None,
+        }
+        reporte.append(fila)
+        try:
+            alumno, monto = _validar(datos, por_tarjeta, por_ci)
+            referencia = _validar_referencia(datos.get('referencia', ''), importadas, vistas)
+        except ValueError as e:
+            fila.update(estado='error', mensaje=str(e))
+            continue
+        fila.update(alumno_id=alumno['id'], alumno=f'{alumno["nombre"]} {alumno["apellido"]}', monto=monto,
+                    referencia=referencia)
+        validas.append((fila, datos.get('concepto') or referencia))
+
+    errores = sum(1 for fila in reporte if fila['estado'] == 'error')
+    aplicar = bool(validas) and not simular and (parcial or not errores)
+    if aplicar:
+        try:
+            movimientos = acreditar_en_bloque(
+                [(fila['alumno_id'], fila['monto'], descripcion) for fila, descripcion in validas],
+                usuario=usuario,
+                referencias=[fila['referencia'] for fila, _ in validas],
+            )
+        except ValueError as e:
+            # Una tarjeta se desactivó entre la validación y el UPDATE: no se aplica nada
+            motivo = str(e)
+        except IntegrityError:
+            # Otra importación del mismo extracto se adelantó: no se aplica nada
+            motivo = 'alguna referencia ya fue importada'
+        else:
+            motivo = None
+            for (fila, _), movimiento in zip(validas, movimientos):
+                fila.update(estado='aplicada', saldo_nuevo=movimiento.saldo_nuevo)
+        if motivo:
+            for fila, _ in validas:
+                fila.update(estado='error', mensaje=f'No se aplicó: {motivo}')
+            errores += len(validas)
+            aplicar = False
+
+    return {
+        'aplicadas': len(validas) if aplicar else 0,
+        'errores': errores,
+        'monto_total': sum((fila['monto'] for fila, _ in validas), Decimal('0')) if aplicar else Decimal('0'),
+        'filas': reporte,
+    }
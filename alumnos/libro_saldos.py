@@ -0,0 +1,120 @@
+"""
+Libro de saldos de la tarjeta: saldo a una fecha y fotos mensuales.
+
+``MovimientoSaldo`` es de solo agregado y cada fila guarda el saldo
+anterior y el nuevo. Para no recorrer todo el historial de un alumno, al
+cierre de cada mes se guarda una foto en ``SaldoMensual``; el saldo a un
+momento dado es::
+
+    saldo_cierre de la última foto anterior al mes del momento
+    + suma(saldo_nuevo - saldo_anterior) de los movimientos posteriores
+
+Ambas lecturas usan el índice (alumno, fecha_movimiento), así que el costo
+depende de los movimientos de un mes, no de toda la historia.
+
+Las fotos se generan con ``manage.py generar_saldos_mensuales``; regenerar
+un mes reemplaza sus fotos. Si falta la foto de algún mes el resultado
+sigue siendo correcto: solo se suman más movimientos.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import MovimientoSaldo, SaldoMensual
+
+DELTA = ExpressionWrapper(F('saldo_nuevo') - F('saldo_anterior'),
+                          output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def inicio_mes(fecha):
+    """Primer día del mes de ``fecha`` (date o datetime)"""
+    if isinstance(fecha, datetime):
+        fecha = timezone.localtime(fecha).date() if timezone.is_aware(fecha) else fecha.date()
+    return fecha.replace(day=1)
+
+
+def mes_siguiente(mes):
+    return date(mes.year + 1, 1, 1) if mes.month == 12 else date(mes.year, mes.month + 1, 1)
+
+
+def _momento(mes):
+    """Medianoche local del primer día de ``mes``"""
+    return timezone.make_aware(datetime.combine(mes, datetime.min.time()))
+
+
+def saldo_a_fecha(alumno_id, momento=None):
+    """
+    Saldo de la tarjeta de ``alumno_id`` en ``momento`` (por defecto, ahora).
+
+    Lee la última foto mensual anterior y suma los movimientos siguientes
+    hasta ``momento`` inclusive. Sin fotos ni movimientos retorna el saldo
+    previo al primer movimiento, o 0 si el alumno nunca tuvo movimientos.
+    """
+    momento = momento or timezone.now()
+    movimientos = MovimientoSaldo.objects.filter(alumno_id=alumno_id)
+
+    foto = SaldoMensual.objects.filter(
+        alumno_id=alumno_id, mes__lt=inicio_mes(momento)
+    ).order_by('-mes').values_list('mes', 'saldo_cierre').first()
+
+    if foto:
+        mes, base = foto
+        movimientos = movimientos.filter(fecha_movimiento__gte=_momento(mes_siguiente(mes)))
+    else:
+        # Sin foto, el punto de partida es el saldo previo al primer movimiento
+        primero = movimientos.order_by('fecha_movimiento', 'id').values_list('saldo_anterior', flat=True).first()
+        base = primero if primero is not None else Decimal('0')
+
+    delta = movimientos.filter(fecha_movimiento__lte=momento).aggregate(delta=Sum(DELTA))['delta']
+    return base + (delta or 0)
+
+
+def generar_saldos_mes(mes):
+    """
+    Genera (o reemplaza) las fotos ``SaldoMensual`` de ``mes``.
+
+    Una consulta agrupada por alumno sobre los movimientos del mes y un
+    upsert por lotes. Solo se generan fotos para los alumnos con
+    movimientos en el mes. Retorna la cantidad de fotos escritas.
+
+    Lanza ValueError si el mes no terminó: una foto del mes en curso
+    quedaría incompleta y ``saldo_a_fecha`` la usaría como cierre.
+    """
+    mes = inicio_mes(mes)
+    if mes >= inicio_mes(timezone.localdate()):
+        raise ValueError(f'El mes {mes:%Y-%m} todavía no cerró')
+    inicio, fin = _momento(mes), _momento(mes_siguiente(mes))
+    del_mes = MovimientoSaldo.objects.filter(fecha_movimiento__gte=inicio, fecha_movimiento__lt=fin)
+
+    ultimo = del_mes.filter(alumno_id=OuterRef('alumno_id')).order_by('-fecha_movimiento', '-id')
+    resumen = del_mes.values('alumno_id').annotate(
+        cantidad=Count('id'),
+        delta=Sum(DELTA),
+        cargas=Sum('monto', filter=Q(tipo='carga')),
+        consumos=Sum('monto', filter=Q(tipo='compra')),
+        cierre=Subquery(ultimo.values('saldo_nuevo')[:1]),
+    ).order_by()
+
+    fotos = [
+        SaldoMensual(
+            alumno_id=datos['alumno_id'],
+            mes=mes,
+            saldo_inicial=datos['cierre'] - datos['delta'],
+            saldo_cierre=datos['cierre'],
+            total_cargas=datos['cargas'] or 0,
+            total_consumos=datos['consumos'] or 0,
+            cantidad_movimientos=datos['cantidad'],
+        )
+        for datos in resumen.iterator(chunk_size=2000)
+    ]
+    SaldoMensual.objects.bulk_create(
+        fotos,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['alumno', 'mes'],
+        update_fields=['saldo_inicial', 'saldo_cierre', 'total_cargas', 'total_consumos',
+                       'cantidad_movimientos', 'generado_el'],
+    )
+    return len(fotos)
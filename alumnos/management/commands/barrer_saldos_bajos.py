@@ -0,0 +1,24 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos.saldo_bajo import barrer_saldos_bajos, umbral_por_defecto
+
+
+class Command(BaseCommand):
+    help = 'Avisa a los padres de los alumnos con saldo bajo (una vez por recarga)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral', help='Saldo por debajo del cual se avisa (por defecto SALDO_BAJO_UMBRAL)')
+
+    def handle(self, *args, **options):
+        try:
+            umbral = Decimal(options['umbral']) if options['umbral'] else umbral_por_defecto()
+        except InvalidOperation:
+            raise CommandError(f'Umbral inválido: {options["umbral"]}')
+        try:
+            avisados = barrer_saldos_bajos(umbral)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'{len(avisados)} alumnos con saldo menor a {umbral} avisados'))
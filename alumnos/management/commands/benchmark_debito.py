@@ -0,0 +1,54 @@
+import statistics
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from alumnos.models import Alumno
+from alumnos.saldo import debitar_tarjeta
+
+NUMERO_TARJETA = 'BENCH-DEBITO'
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia del débito de tarjeta de cantina'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debitos', type=int, default=500)
+
+    def handle(self, *args, **options):
+        debitos = options['debitos']
+        monto = Decimal('1000')
+        # Todo corre en una transacción que se revierte: el alumno, sus
+        # movimientos y los eventos de notificación nunca se confirman, y no
+        # hay borrado que registrar en la sincronización del POS. Por eso no
+        # se mide con varias conexiones (no verían al alumno); la concurrencia
+        # la cubre el test de débitos en paralelo.
+        with transaction.atomic():
+            alumno = Alumno.objects.create(
+                numero_tarjeta=NUMERO_TARJETA, nombre='Benchmark', apellido='Débito',
+                ci=NUMERO_TARJETA, fecha_nacimiento=date(2015, 1, 1),
+                saldo_tarjeta=monto * debitos * 2
+            )
+
+            inicio = time.perf_counter()
+            tiempos = [self._debitar(monto) for _ in range(debitos)]
+            self._reportar('secuencial', tiempos, time.perf_counter() - inicio)
+
+            alumno.refresh_from_db()
+            self.stdout.write(f'Saldo final: {alumno.saldo_tarjeta}')
+            transaction.set_rollback(True)
+
+    def _debitar(self, monto):
+        inicio = time.perf_counter()
+        debitar_tarjeta(NUMERO_TARJETA, monto)
+        return (time.perf_counter() - inicio) * 1000
+
+    def _reportar(self, etiqueta, tiempos, segundos):
+        p95 = statistics.quantiles(tiempos, n=20)[-1]
+        self.stdout.write(
+            f'{etiqueta:12s} | p50 {statistics.median(tiempos):6.2f} ms | p95 {p95:6.2f} ms | '
+            f'{len(tiempos) / segundos:6.0f} débitos/s'
+        )
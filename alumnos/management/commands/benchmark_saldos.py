@@ -0,0 +1,135 @@
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from alumnos.libro_saldos import DELTA, generar_saldos_mes, inicio_mes, mes_siguiente, saldo_a_fecha
+from alumnos.models import Alumno, MovimientoSaldo
+
+PREFIJO = 'BENCH-SALDO-'
+CARGA = 20000
+COMPRA = 5000
+
+
+class Command(BaseCommand):
+    help = 'Mide el saldo a una fecha con fotos mensuales contra recorrer todos los movimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movimientos', type=int, default=5_000_000)
+        parser.add_argument('--alumnos', type=int, default=5000)
+        parser.add_argument('--meses', type=int, default=12, help='Meses de historia a simular')
+        parser.add_argument('--consultas', type=int, default=200, help='Consultas de saldo a medir')
+
+    def handle(self, *args, **options):
+        cantidad_alumnos = options['alumnos']
+        por_alumno = max(options['movimientos'] // cantidad_alumnos, 1)
+        meses = options['meses']
+
+        # Todos los datos de prueba se crean y descartan dentro de una transacción
+        with transaction.atomic():
+            primer_mes = inicio_mes(timezone.localdate())
+            for _ in range(meses):
+                primer_mes = inicio_mes(primer_mes - timedelta(days=1))
+            inicio = timezone.make_aware(datetime.combine(primer_mes, datetime.min.time()))
+            paso = timedelta(days=30 * meses) / por_alumno
+
+            segundos = time.perf_counter()
+            alumnos = self._crear_alumnos(cantidad_alumnos)
+            self._crear_movimientos(alumnos, por_alumno, inicio, paso)
+            self.stdout.write(
+                f'{len(alumnos) * por_alumno} movimientos creados en {time.perf_counter() - segundos:.1f} s'
+            )
+
+            segundos = time.perf_counter()
+            mes, fotos = primer_mes, 0
+            for _ in range(meses):
+                fotos += generar_saldos_mes(mes)
+                mes = mes_siguiente(mes)
+            self.stdout.write(f'{fotos} fotos mensuales generadas en {time.perf_counter() - segundos:.1f} s')
+
+            azar = random.Random(11)
+            consultas = [
+                (azar.choice(alumnos), inicio + paso * azar.randrange(por_alumno))
+                for _ in range(options['consultas'])
+            ]
+
+            con_fotos, completo = [], []
+            for alumno_id, momento in consultas:
+                segundos = time.perf_counter()
+                saldo = saldo_a_fecha(alumno_id, momento)
+                con_fotos.append((time.perf_counter() - segundos) * 1000)
+
+                segundos = time.perf_counter()
+                esperado = MovimientoSaldo.objects.filter(
+                    alumno_id=alumno_id, fecha_movimiento__lte=momento
+                ).aggregate(delta=Sum(DELTA))['delta']
+                completo.append((time.perf_counter() - segundos) * 1000)
+
+                if saldo != esperado:
+                    self.stderr.write(f'Diferencia para alumno {alumno_id} en {momento}: {saldo} != {esperado}')
+
+            self._reportar('fotos + cola', con_fotos)
+            self._reportar('recorrido', completo)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completado (datos de prueba descartados)'))
+
+    def _crear_alumnos(self, cantidad):
+        Alumno.objects.bulk_create([
+            Alumno(numero_tarjeta=f'{PREFIJO}{i}', ci=f'{PREFIJO}{i}', nombre='Benchmark',
+                   apellido=str(i), fecha_nacimiento=date(2015, 1, 1))
+            for i in range(cantidad)
+        ], batch_size=2000)
+        return list(Alumno.objects.filter(numero_tarjeta__startswith=PREFIJO).values_list('id', flat=True))
+
+    def _crear_movimientos(self, alumnos, por_alumno, inicio, paso):
+        """
+        Cada alumno alterna una carga y tres compras desde saldo 0, así el
+        saldo tras el movimiento k tiene forma cerrada y los datos pueden
+        generarse en la base sin calcular saldos fila por fila.
+        """
+        tabla = connection.ops.quote_name(MovimientoSaldo._meta.db_table)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {tabla} (alumno_id, tipo, monto, saldo_anterior, saldo_nuevo, "
+                    f"descripcion, fecha_movimiento) "
+                    f"SELECT a.id, CASE WHEN k %% 4 = 0 THEN 'carga' ELSE 'compra' END, "
+                    f"CASE WHEN k %% 4 = 0 THEN {CARGA} ELSE {COMPRA} END, "
+                    f"{CARGA} * (k / 4 + 1) - {COMPRA} * (k - k / 4) "
+                    f"  - CASE WHEN k %% 4 = 0 THEN {CARGA} ELSE -{COMPRA} END, "
+                    f"{CARGA} * (k / 4 + 1) - {COMPRA} * (k - k / 4), '', %s + k * %s "
+                    f"FROM unnest(%s::bigint[]) AS a(id) CROSS JOIN generate_series(0, %s) AS k",
+                    [inicio, paso, alumnos, por_alumno - 1]
+                )
+                cursor.execute(f'ANALYZE {tabla}')
+            return
+
+        lote = []
+        for alumno_id in alumnos:
+            saldo = Decimal('0')
+            for k in range(por_alumno):
+                monto = Decimal(CARGA if k % 4 == 0 else COMPRA)
+                nuevo = saldo + monto if k % 4 == 0 else saldo - monto
+                lote.append(MovimientoSaldo(
+                    alumno_id=alumno_id, tipo='carga' if k % 4 == 0 else 'compra', monto=monto,
+                    saldo_anterior=saldo, saldo_nuevo=nuevo, fecha_movimiento=inicio + paso * k
+                ))
+                saldo = nuevo
+            if len(lote) >= 10000:
+                MovimientoSaldo.objects.bulk_create(lote, batch_size=2000)
+                lote = []
+        MovimientoSaldo.objects.bulk_create(lote, batch_size=2000)
+
+    def _reportar(self, etiqueta, tiempos):
+        p95 = statistics.quantiles(tiempos, n=20)[-1] if len(tiempos) > 1 else tiempos[0]
+        self.stdout.write(
+            f'{etiqueta:13s} | p50 {statistics.median(tiempos):7.2f} ms | p95 {p95:7.2f} ms'
+        )
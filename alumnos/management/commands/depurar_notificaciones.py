@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos.retencion_notificaciones import TAMANO_LOTE, depurar
+
+
+class Command(BaseCommand):
+    help = 'Depura las notificaciones leídas que superaron la retención (por lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Días de retención (por defecto NOTIFICACIONES_RETENCION_DIAS o 90)')
+        parser.add_argument('--archivar', action='store_true',
+                            help='Mover a NotificacionArchivada en lugar de eliminar')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help='Notificaciones por transacción')
+
+    def handle(self, *args, **options):
+        try:
+            total = depurar(options['dias'], archivar=options['archivar'], lote=options['lote'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        accion = 'archivadas' if options['archivar'] else 'eliminadas'
+        self.stdout.write(self.style.SUCCESS(f'{total} notificaciones leídas {accion}'))
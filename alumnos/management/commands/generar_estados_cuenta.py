@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from alumnos.estados_cuenta import FORMATOS, PADRES_POR_BLOQUE, generar_estados
+from alumnos.libro_saldos import inicio_mes
+
+
+class Command(BaseCommand):
+    help = 'Genera los estados de cuenta mensuales de todas las familias (se puede retomar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mes a generar (AAAA-MM); por defecto, el mes anterior')
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos para renderizar (por defecto, uno por CPU; 0 = sin pool)')
+        parser.add_argument('--bloque', type=int, default=PADRES_POR_BLOQUE,
+                            help='Padres por bloque de consultas')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Regenerar también los estados ya escritos')
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                mes = datetime.strptime(options['mes'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--mes debe tener el formato AAAA-MM')
+        else:
+            mes = inicio_mes(inicio_mes(timezone.localdate()) - timedelta(days=1))
+
+        try:
+            resultado = generar_estados(
+                mes, formato=options['formato'], procesos=options['procesos'],
+                forzar=options['forzar'], padres_por_bloque=options['bloque'],
+            )
+        except (ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        segundos = resultado['segundos']
+        por_segundo = resultado['generados'] / segundos if segundos else 0
+        self.stdout.write(
+            f'{mes:%Y-%m}: {resultado["generados"]} estados generados, '
+            f'{resultado["salteados"]} ya existentes, {segundos:.2f} s ({por_segundo:.1f} estados/s)'
+        )
+        self.stdout.write(self.style.SUCCESS('Estados de cuenta generados'))
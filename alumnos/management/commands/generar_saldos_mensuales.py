@@ -0,0 +1,42 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from alumnos.libro_saldos import generar_saldos_mes, inicio_mes, mes_siguiente
+
+
+class Command(BaseCommand):
+    help = 'Genera las fotos mensuales del libro de saldos (SaldoMensual)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help='Mes a generar (AAAA-MM); por defecto, el mes anterior')
+        parser.add_argument('--desde', help='Genera todos los meses desde AAAA-MM hasta --mes')
+
+    def _mes(self, valor, opcion):
+        try:
+            return datetime.strptime(valor, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f'--{opcion} debe tener el formato AAAA-MM')
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            hasta = self._mes(options['mes'], 'mes')
+        else:
+            hasta = inicio_mes(inicio_mes(timezone.localdate()) - timedelta(days=1))
+        mes = self._mes(options['desde'], 'desde') if options['desde'] else hasta
+        if mes > hasta:
+            raise CommandError('--desde no puede ser posterior a --mes')
+        if hasta >= inicio_mes(timezone.localdate()):
+            raise CommandError('--mes debe ser un mes ya cerrado')
+
+        total = 0
+        while mes <= hasta:
+            inicio = time.perf_counter()
+            fotos = generar_saldos_mes(mes)
+            total += fotos
+            self.stdout.write(f'{mes:%Y-%m}: {fotos} fotos en {time.perf_counter() - inicio:.2f} s')
+            mes = mes_siguiente(mes)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} fotos de saldo generadas'))
@@ -0,0 +1,58 @@
+import csv
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from alumnos.importacion_recargas import importar_recargas, leer_archivo
+
+CAMPOS_REPORTE = ['linea', 'identificador', 'alumno_id', 'alumno', 'monto', 'estado', 'mensaje', 'saldo_nuevo']
+
+
+class Command(BaseCommand):
+    help = 'Importa recargas de saldo desde un extracto bancario (CSV o XLSX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo CSV o XLSX con columnas numero_tarjeta/ci y monto')
+        parser.add_argument('--usuario', help='Usuario que registra las recargas')
+        parser.add_argument('--parcial', action='store_true',
+                            help='Aplica las filas válidas aunque otras tengan errores')
+        parser.add_argument('--simular', action='store_true', help='Solo valida, no aplica nada')
+        parser.add_argument('--reporte', help='Escribe el resultado por fila en este CSV')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = get_user_model().objects.get(username=options['usuario'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Usuario no encontrado: {options["usuario"]}')
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importar_recargas(
+                    leer_archivo(archivo, options['archivo']), usuario=usuario,
+                    parcial=options['parcial'], simular=options['simular']
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+
+        for fila in resultado['filas']:
+            if fila['estado'] == 'error':
+                self.stderr.write(f'Línea {fila["linea"]}: {fila["mensaje"]}')
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                escritor = csv.DictWriter(salida, fieldnames=CAMPOS_REPORTE)
+                escritor.writeheader()
+                escritor.writerows(resultado['filas'])
+
+        mensaje = (
+            f'{resultado["aplicadas"]} recargas aplicadas (₲{resultado["monto_total"]}), '
+            f'{resultado["errores"]} errores, {len(resultado["filas"])} filas en {segundos:.2f} s'
+        )
+        if resultado['errores'] and not resultado['aplicadas'] and not options['simular']:
+            raise CommandError(f'{mensaje}. No se aplicó ninguna recarga (use --parcial para aplicar las válidas)')
+        self.stdout.write(self.style.SUCCESS(mensaje))
@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from alumnos.difusion import procesar_lote
+from alumnos.models import EventoNotificacion
+
+
+def _vaciar_bandeja(lote):
+    """Un hilo: toma lotes hasta vaciar la bandeja; cada hilo usa su propia conexión"""
+    eventos = 0
+    try:
+        while True:
+            tomados = procesar_lote(lote)
+            if not tomados:
+                return eventos
+            eventos += tomados
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Expande la bandeja de salida de notificaciones a una Notificacion por destinatario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4,
+                            help='Hilos que vacían la bandeja en paralelo (SKIP LOCKED)')
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Eventos tomados por transacción')
+        parser.add_argument('--continuo', action='store_true',
+                            help='No terminar: volver a revisar la bandeja cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera en modo continuo cuando la bandeja está vacía')
+        parser.add_argument('--conservar', type=int, default=None,
+                            help='Eliminar eventos procesados hace más de N días')
+
+    def handle(self, *args, **options):
+        if options['hilos'] < 1 or options['lote'] < 1:
+            self.stderr.write(self.style.ERROR('--hilos y --lote deben ser mayores a cero'))
+            return
+
+        fallidos_previos = None
+        with ThreadPoolExecutor(max_workers=options['hilos']) as pool:
+            while True:
+                inicio = time.monotonic()
+                futuros = [pool.submit(_vaciar_bandeja, options['lote']) for _ in range(options['hilos'])]
+                eventos = sum(futuro.result() for futuro in futuros)
+                if eventos:
+                    duracion = time.monotonic() - inicio
+                    self.stdout.write(f'{eventos} eventos procesados en {duracion:.2f}s')
+
+                # En modo continuo el reporte y la purga corren en cada vuelta
+                fallidos = EventoNotificacion.objects.filter(fecha_procesado__isnull=True).exclude(error='').count()
+                if fallidos and fallidos != fallidos_previos:
+                    self.stdout.write(self.style.WARNING(f'{fallidos} eventos con errores pendientes de reintento'))
+                fallidos_previos = fallidos
+
+                if options['conservar'] is not None:
+                    eliminados = self._purgar(options['conservar'])
+                    if eliminados or not options['continuo']:
+                        self.stdout.write(f'{eliminados} eventos procesados eliminados')
+
+                if not options['continuo']:
+                    break
+                if not eventos:
+                    time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS('Bandeja de notificaciones procesada'))
+
+    def _purgar(self, dias):
+        viejos = EventoNotificacion.objects.filter(
+            fecha_procesado__lt=timezone.now() - timedelta(days=dias)
+        ).order_by('id')
+        # Lotes acotados: cada DELETE es corto y no compite con los productores
+        total = 0
+        while True:
+            ids = list(viejos.values_list('id', flat=True)[:5000])
+            if not ids:
+                return total
+            eliminados, _ = EventoNotificacion.objects.filter(id__in=ids).delete()
+            total += eliminados
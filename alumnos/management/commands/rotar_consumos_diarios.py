@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from alumnos.models import ConsumoDiario
+
+
+class Command(BaseCommand):
+    help = 'Cierre nocturno de los contadores de consumo diario: resume el día y purga los viejos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conservar', type=int, default=31,
+                            help='Días de contadores a conservar')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Contadores a eliminar por sentencia')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        # Los contadores de hoy arrancan de cero por sí solos: la fecha es parte de la clave
+        ayer = ConsumoDiario.objects.filter(fecha=hoy - timedelta(days=1)).aggregate(
+            alumnos=Count('id'), total=Sum('total')
+        )
+        self.stdout.write(f'Consumo de ayer: {ayer["alumnos"]} alumnos, ₲{ayer["total"] or 0}')
+
+        viejos = ConsumoDiario.objects.filter(fecha__lt=hoy - timedelta(days=options['conservar'])).order_by('fecha')
+
+        # Lotes acotados: cada DELETE es corto y no bloquea el cobro
+        total = 0
+        while True:
+            ids = list(viejos.values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            eliminados, _ = ConsumoDiario.objects.filter(id__in=ids).delete()
+            total += eliminados
+
+        self.stdout.write(self.style.SUCCESS(f'{total} contadores de consumo diario eliminados'))
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+INDICES = {
+    'alumnos_alumno_nombre_trgm': 'nombre',
+    'alumnos_alumno_apellido_trgm': 'apellido',
+    'alumnos_alumno_ci_trgm': 'ci',
+    'alumnos_alumno_tarjeta_trgm': 'numero_tarjeta',
+}
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, campo in INDICES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON alumnos_alumno '
+            f'USING gin (inmutable_unaccent(lower({campo})) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_busqueda_trigramas'),
+        ('alumnos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
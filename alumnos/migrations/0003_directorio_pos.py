@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0002_indices_trigramas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDirectorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('ultima_eliminacion', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de Directorio',
+                'verbose_name_plural': 'Versión de Directorio',
+            },
+        ),
+        migrations.AddField(
+            model_name='alumno',
+            name='version_directorio',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
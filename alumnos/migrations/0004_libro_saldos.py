@@ -0,0 +1,51 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0003_directorio_pos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('saldo_inicial', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('saldo_cierre', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_cargas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_consumos', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad_movimientos', models.PositiveIntegerField(default=0)),
+                ('generado_el', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Saldo Mensual',
+                'verbose_name_plural': 'Saldos Mensuales',
+                'ordering': ['-mes'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='movimientosaldo',
+            name='fecha_movimiento',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='movimientosaldo',
+            index=models.Index(fields=['alumno', 'fecha_movimiento'], name='alumnos_mov_alumno_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='saldomensual',
+            name='alumno',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_mensuales', to='alumnos.alumno'),
+        ),
+        migrations.AddConstraint(
+            model_name='saldomensual',
+            constraint=models.UniqueConstraint(fields=('alumno', 'mes'), name='alumnos_saldo_mensual_uniq'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('alumnos', '0004_libro_saldos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('tipo', models.CharField(choices=[('saldo_bajo', 'Saldo Bajo'), ('transaccion', 'Nueva Transacción'), ('solicitud', 'Solicitud de Recarga'), ('limite_consumo', 'Límite de Consumo'), ('sistema', 'Sistema')], max_length=20)),
+                ('nivel', models.CharField(choices=[('info', 'Información'), ('warning', 'Advertencia'), ('error', 'Error'), ('success', 'Éxito')], default='info', max_length=20)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_lectura', models.DateTimeField(blank=True, null=True)),
+                ('leida', models.BooleanField(default=False)),
+                ('url_accion', models.CharField(blank=True, max_length=255, null=True)),
+                ('texto_accion', models.CharField(blank=True, max_length=50, null=True)),
+                ('content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['usuario', '-fecha_creacion'], name='alumnos_not_usuario_50fa46_idx'), models.Index(fields=['tipo'], name='alumnos_not_tipo_137f94_idx'), models.Index(fields=['leida'], name='alumnos_not_leida_17ec8b_idx')],
+            },
+        ),
+    ]
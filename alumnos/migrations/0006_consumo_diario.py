@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:10
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0005_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alumno',
+            name='limite_consumo',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Consumo diario máximo con la tarjeta (0 = sin límite)', max_digits=10, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.CreateModel(
+            name='ConsumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('alumno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumos_diarios', to='alumnos.alumno')),
+            ],
+            options={
+                'verbose_name': 'Consumo Diario',
+                'verbose_name_plural': 'Consumos Diarios',
+                'indexes': [models.Index(fields=['fecha'], name='alumnos_consumo_fecha_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='consumodiario',
+            constraint=models.UniqueConstraint(fields=('alumno', 'fecha'), name='alumnos_consumo_diario_uniq'),
+        ),
+    ]
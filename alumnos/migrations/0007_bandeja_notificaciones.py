@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('alumnos', '0006_consumo_diario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='padre',
+            name='usuario',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='padre_profile', to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AlterField(
+            model_name='notificacion',
+            name='tipo',
+            field=models.CharField(choices=[('saldo_bajo', 'Saldo Bajo'), ('transaccion', 'Nueva Transacción'), ('solicitud', 'Solicitud de Recarga'), ('limite_consumo', 'Límite de Consumo'), ('stock', 'Alerta de Stock'), ('sistema', 'Sistema')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='EventoNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('movimiento_saldo', 'Movimiento de saldo'), ('saldo_bajo', 'Saldo bajo'), ('limite_consumo', 'Límite de consumo'), ('solicitud_procesada', 'Solicitud de recarga procesada'), ('stock', 'Alerta de stock')], max_length=30)),
+                ('datos', models.JSONField(default=dict)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_procesado', models.DateTimeField(blank=True, null=True)),
+                ('notificaciones_creadas', models.PositiveIntegerField(default=0)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Notificación',
+                'verbose_name_plural': 'Eventos de Notificación',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('fecha_procesado__isnull', True)), fields=['id'], name='alumnos_evento_pendiente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('alumnos', '0007_bandeja_notificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('tipo', models.CharField(choices=[('saldo_bajo', 'Saldo Bajo'), ('transaccion', 'Nueva Transacción'), ('solicitud', 'Solicitud de Recarga'), ('limite_consumo', 'Límite de Consumo'), ('stock', 'Alerta de Stock'), ('sistema', 'Sistema')], max_length=20)),
+                ('nivel', models.CharField(choices=[('info', 'Información'), ('warning', 'Advertencia'), ('error', 'Error'), ('success', 'Éxito')], default='info', max_length=20)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_lectura', models.DateTimeField(blank=True, null=True)),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación archivada',
+                'verbose_name_plural': 'Notificaciones archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='notificacion',
+            name='alumnos_not_leida_17ec8b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['usuario', '-fecha_creacion'], name='alumnos_notif_no_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', True)), fields=['fecha_creacion'], name='alumnos_notif_leida_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacionarchivada',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_archivadas', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0008_retencion_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alumno',
+            name='aviso_saldo_bajo',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='alumno',
+            index=models.Index(condition=models.Q(('activo', True), ('aviso_saldo_bajo__isnull', True)), fields=['saldo_tarjeta'], name='alumnos_saldo_sin_aviso_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0009_aviso_saldo_bajo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimientosaldo',
+            name='referencia_banco',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+    ]
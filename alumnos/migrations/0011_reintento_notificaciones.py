@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alumnos', '0010_referencia_banco'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventonotificacion',
+            name='proximo_intento',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
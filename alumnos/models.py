@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.core.validators import EmailValidator
+from django.utils import timezone
+
+from core.models import ContadorVersion
 
 class Alumno(models.Model):
     # Información básica
@@ -30,6 +33,13 @@ class Alumno(models.Model):
         default=0,
         validators=[MinValueValidator(0)]
     )
+    limite_consumo = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)],
+        help_text="Consumo diario máximo con la tarjeta (0 = sin límite)"
+    )
     
     # Relación con padres/tutores
     padre_tutor = models.ForeignKey(
@@ -46,6 +56,12 @@ class Alumno(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     
+    # Versión del directorio de tarjetas en la que cambió por última vez (POS)
+    version_directorio = models.PositiveBigIntegerField(default=0, db_index=True, editable=False)
+    
+    # Último aviso de saldo bajo; cada recarga lo vuelve a NULL
+    aviso_saldo_bajo = models.DateTimeField(null=True, blank=True, editable=False)
+    
     class Meta:
         verbose_name = 'Alumno'
         verbose_name_plural = 'Alumnos'
@@ -53,11 +69,19 @@ class Alumno(models.Model):
         indexes = [
             models.Index(fields=['numero_tarjeta']),
             models.Index(fields=['ci']),
+            # Barrido de saldos bajos: solo alumnos activos aún no avisados
+            models.Index(fields=['saldo_tarjeta'], name='alumnos_saldo_sin_aviso_idx',
+                         condition=models.Q(activo=True, aviso_saldo_bajo__isnull=True)),
         ]
     
     def __str__(self):
         return f"{self.apellido}, {self.nombre} - {self.numero_tarjeta}"
     
+    def save(self, *args, **kwargs):
+        # La versión (estampada en pre_save) y la fila se confirman juntas
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     @property
     def nombre_completo(self):
         return f"{self.nombre} {self.apellido}"
@@ -66,7 +90,24 @@ class Alumno(models.Model):
     def puede_comprar(self):
         return self.activo and self.saldo_tarjeta > 0
 
+class MovimientoSaldoQuerySet(models.QuerySet):
+    """El libro de saldos es de solo agregado: no se modifican ni borran filas"""
+
+    def update(self, **kwargs):
+        raise ValueError('Los movimientos de saldo no se modifican; registre un ajuste')
+
+    def delete(self):
+        raise ValueError('Los movimientos de saldo no se eliminan; registre un ajuste')
+
+
 class MovimientoSaldo(models.Model):
+    """
+    Libro de saldos de la tarjeta: una fila por cada cambio de saldo.
+    
+    Es de solo agregado; las correcciones se registran como 'ajuste' o
+    'devolucion'. Cada fila guarda el saldo anterior y el nuevo, y
+    ``SaldoMensual`` resume el libro por alumno y mes.
+    """
     TIPO_MOVIMIENTO = [
         ('carga', 'Carga de Saldo'),
         ('compra', 'Compra'),
@@ -80,6 +121,8 @@ class MovimientoSaldo(models.Model):
     saldo_anterior = models.DecimalField(max_digits=10, decimal_places=2)
     saldo_nuevo = models.DecimalField(max_digits=10, decimal_places=2)
     descripcion = models.TextField(blank=True, null=True)
+    # Referencia de la transferencia en el extracto del banco (recargas importadas)
+    referencia_banco = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     
     # Usuario que realizó el movimiento - usar settings.AUTH_USER_MODEL
     realizado_por = models.ForeignKey(
@@ -90,15 +133,85 @@ class MovimientoSaldo(models.Model):
         related_name='movimientos_realizados'
     )
     
-    fecha_movimiento = models.DateTimeField(auto_now_add=True)
+    fecha_movimiento = models.DateTimeField(default=timezone.now, editable=False)
+    
+    objects = MovimientoSaldoQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Movimiento de Saldo'
         verbose_name_plural = 'Movimientos de Saldo'
         ordering = ['-fecha_movimiento']
+        indexes = [
+            models.Index(fields=['alumno', 'fecha_movimiento'], name='alumnos_mov_alumno_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.alumno.nombre_completo} - {self.get_tipo_display()} - ₲{self.monto}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Los movimientos de saldo no se modifican; registre un ajuste')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('Los movimientos de saldo no se eliminan; registre un ajuste')
+
+
+class ConsumoDiario(models.Model):
+    """
+    Lo gastado con la tarjeta por un alumno en un día.
+    
+    Lo mantiene el cobro con un único upsert por venta (ver
+    ``alumnos.consumo``), así el límite diario se controla sin sumar las
+    ventas del día. Las filas viejas se purgan con
+    ``manage.py rotar_consumos_diarios``.
+    """
+    alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name='consumos_diarios')
+    fecha = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cantidad = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Consumo Diario'
+        verbose_name_plural = 'Consumos Diarios'
+        constraints = [
+            models.UniqueConstraint(fields=['alumno', 'fecha'], name='alumnos_consumo_diario_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['fecha'], name='alumnos_consumo_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.alumno.nombre_completo} - {self.fecha}: ₲{self.total}"
+
+
+class SaldoMensual(models.Model):
+    """
+    Foto del libro de saldos de un alumno al cierre de un mes.
+    
+    El saldo a una fecha se obtiene de la última foto anterior más los
+    movimientos posteriores (ver ``alumnos.libro_saldos``), sin recorrer
+    todo el historial. Se genera con ``manage.py generar_saldos_mensuales``.
+    """
+    alumno = models.ForeignKey(Alumno, on_delete=models.CASCADE, related_name='saldos_mensuales')
+    mes = models.DateField(help_text="Primer día del mes")
+    saldo_inicial = models.DecimalField(max_digits=12, decimal_places=2)
+    saldo_cierre = models.DecimalField(max_digits=12, decimal_places=2)
+    total_cargas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_consumos = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cantidad_movimientos = models.PositiveIntegerField(default=0)
+    generado_el = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Saldo Mensual'
+        verbose_name_plural = 'Saldos Mensuales'
+        ordering = ['-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['alumno', 'mes'], name='alumnos_saldo_mensual_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.alumno.nombre_completo} - {self.mes.strftime('%m/%Y')}: ₲{self.saldo_cierre}"
 
 class SolicitudRecarga(models.Model):
     """Solicitudes de recarga de saldo por parte de padres"""
@@ -153,6 +266,16 @@ class Padre(models.Model):
     email = models.EmailField(verbose_name="Correo Electrónico", validators=[EmailValidator()])
     celular = models.CharField(max_length=20, verbose_name="Celular")
     
+    # Cuenta de usuario con la que el padre ingresa al sistema (avisos, resumen de hijos)
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='padre_profile',
+        verbose_name="Usuario"
+    )
+    
     # Información adicional opcional
     direccion = models.TextField(blank=True, null=True, verbose_name="Dirección")
     telefono_fijo = models.CharField(max_length=20, blank=True, null=True, verbose_name="Teléfono Fijo")
@@ -232,3 +355,24 @@ class Transaccion(models.Model):
     
     def __str__(self):
         return f"{self.alumno.nombre_completo} - {self.get_tipo_display()} - ₲{self.monto}"
+
+
+class VersionDirectorio(ContadorVersion):
+    """
+    Versión global del directorio de tarjetas del POS (fila única).
+
+    Se incrementa al guardar o eliminar un Alumno (ver ``alumnos.signals``).
+    Los cambios de saldo se hacen con UPDATE directos y no la modifican:
+    el saldo no forma parte del directorio.
+    """
+
+    class Meta:
+        verbose_name = 'Versión de Directorio'
+        verbose_name_plural = 'Versión de Directorio'
+
+    def __str__(self):
+        return f"Directorio v{self.version}"
+
+
+# El modelo de notificaciones vive en su propio módulo; se importa aquí para registrarlo con la app
+from .models_notificaciones import EventoNotificacion, Notificacion, NotificacionArchivada  # noqa: E402,F401
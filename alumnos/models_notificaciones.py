@@ -3,7 +3,6 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from django.conf import settings
-from django.urls import reverse
 
 class Notificacion(models.Model):
     """Modelo para gestionar notificaciones en el sistema"""
@@ -13,6 +12,7 @@ class Notificacion(models.Model):
         ('transaccion', 'Nueva Transacción'),
         ('solicitud', 'Solicitud de Recarga'),
         ('limite_consumo', 'Límite de Consumo'),
+        ('stock', 'Alerta de Stock'),
         ('sistema', 'Sistema'),
     ]
     
@@ -55,18 +55,37 @@ class Notificacion(models.Model):
         indexes = [
             models.Index(fields=['usuario', '-fecha_creacion']),
             models.Index(fields=['tipo']),
-            models.Index(fields=['leida']),
+            # Parciales: la bandeja de no leídas y la depuración no recorren todo el historial
+            models.Index(fields=['usuario', '-fecha_creacion'], condition=models.Q(leida=False),
+                         name='alumnos_notif_no_leida_idx'),
+            models.Index(fields=['fecha_creacion'], condition=models.Q(leida=True),
+                         name='alumnos_notif_leida_fecha_idx'),
         ]
     
     def __str__(self):
         return f"{self.titulo} - {self.get_tipo_display()}"
     
+    def save(self, *args, **kwargs):
+        nueva = self._state.adding
+        super().save(*args, **kwargs)
+        if nueva and not self.leida:
+            from .contador_notificaciones import ajustar
+            ajustar({self.usuario_id: 1})
+    
+    def delete(self, *args, **kwargs):
+        if not self.leida:
+            from .contador_notificaciones import ajustar
+            ajustar({self.usuario_id: -1})
+        return super().delete(*args, **kwargs)
+    
     def marcar_como_leida(self):
         """Marca la notificación como leída"""
         if not self.leida:
+            from .contador_notificaciones import ajustar
             self.leida = True
             self.fecha_lectura = timezone.now()
             self.save()
+            ajustar({self.usuario_id: -1})
     
     def get_url_absoluta(self):
         """Retorna la URL absoluta de la acción o del contenido relacionado"""
@@ -89,6 +108,7 @@ class Notificacion(models.Model):
             'transaccion': '💳',
             'solicitud': '📝',
             'limite_consumo': '⚠️',
+            'stock': '📦',
             'sistema': '🔔',
         }
         return iconos.get(self.tipo, '🔔')
@@ -103,120 +123,101 @@ class Notificacion(models.Model):
         }
         return colores.get(self.nivel, 'secondary')
     
+    # Los productores no crean notificaciones directamente: publican un evento
+    # en EventoNotificacion y el worker lo expande a los destinatarios
+    # (ver alumnos.difusion y ``manage.py procesar_notificaciones``).
+    
     @classmethod
     def crear_notificacion_saldo_bajo(cls, alumno, saldo_actual):
-        """Crea una notificación de saldo bajo para el alumno y sus padres"""
-        # Notificar al alumno si tiene usuario
-        if hasattr(alumno, 'usuario') and alumno.usuario:
-            cls.objects.create(
-                usuario=alumno.usuario,
-                titulo='Saldo Bajo en Tarjeta',
-                mensaje=f'Tu saldo actual es ${saldo_actual:,.0f}. Por favor recarga tu tarjeta.',
-                tipo='saldo_bajo',
-                nivel='warning',
-                contenido_relacionado=alumno,
-                url_accion=reverse('alumnos:solicitar_recarga')
-            )
-        
-        # Notificar a los padres
-        for padre in alumno.padres.all():
-            if hasattr(padre, 'usuario') and padre.usuario:
-                cls.objects.create(
-                    usuario=padre.usuario,
-                    titulo=f'Saldo Bajo - {alumno.get_nombre_completo()}',
-                    mensaje=f'El saldo de {alumno.nombre} es ${saldo_actual:,.0f}. Por favor realice una recarga.',
-                    tipo='saldo_bajo',
-                    nivel='warning',
-                    contenido_relacionado=alumno,
-                    url_accion=reverse('alumnos:solicitar_recarga')
-                )
+        """Avisa a los padres que el saldo del alumno está bajo"""
+        return EventoNotificacion.publicar('saldo_bajo', alumno_id=alumno.pk, saldo=str(saldo_actual))
     
     @classmethod
-    def crear_notificacion_transaccion(cls, transaccion):
-        """Crea una notificación para una nueva transacción"""
-        alumno = transaccion.alumno
-        monto = transaccion.monto
-        tipo = transaccion.get_tipo_display().lower()
-        
-        # Notificar al alumno
-        if hasattr(alumno, 'usuario') and alumno.usuario:
-            cls.objects.create(
-                usuario=alumno.usuario,
-                titulo=f'Nueva {transaccion.get_tipo_display()}',
-                mensaje=f'Se ha realizado un {tipo} de ${monto:,.0f}. Saldo actual: ${alumno.saldo_tarjeta:,.0f}',
-                tipo='transaccion',
-                nivel='info',
-                contenido_relacionado=transaccion,
-                url_accion=reverse('alumnos:historial_transacciones', args=[alumno.pk])
-            )
-        
-        # Notificar a los padres
-        for padre in alumno.padres.all():
-            if hasattr(padre, 'usuario') and padre.usuario:
-                cls.objects.create(
-                    usuario=padre.usuario,
-                    titulo=f'Nueva {transaccion.get_tipo_display()} - {alumno.get_nombre_completo()}',
-                    mensaje=f'Se ha realizado un {tipo} de ${monto:,.0f} para {alumno.nombre}. Saldo actual: ${alumno.saldo_tarjeta:,.0f}',
-                    tipo='transaccion',
-                    nivel='info',
-                    contenido_relacionado=transaccion,
-                    url_accion=reverse('alumnos:historial_transacciones', args=[alumno.pk])
-                )
+    def crear_notificacion_transaccion(cls, movimiento):
+        """Avisa a los padres de un movimiento de saldo (carga, compra, ajuste, devolución)"""
+        return EventoNotificacion.publicar('movimiento_saldo', movimientos=[movimiento.pk])
     
     @classmethod
     def crear_notificacion_solicitud(cls, solicitud):
-        """Crea notificaciones para una solicitud de recarga"""
-        estado = solicitud.get_estado_display().lower()
-        
-        # Notificar al padre solicitante
-        cls.objects.create(
-            usuario=solicitud.padre_solicitante,
-            titulo=f'Solicitud de Recarga {estado}',
-            mensaje=f'Tu solicitud de recarga por ${solicitud.monto_solicitado:,.0f} para {solicitud.alumno.nombre} ha sido {estado}.',
-            tipo='solicitud',
-            nivel='success' if solicitud.estado == 'aprobada' else 'info',
-            contenido_relacionado=solicitud,
-            url_accion=reverse('alumnos:mis_solicitudes')
-        )
-        
-        # Si está aprobada, notificar a los administradores
-        if solicitud.estado == 'aprobada':
-            admins = settings.AUTH_USER_MODEL.objects.filter(is_staff=True)
-            for admin in admins:
-                cls.objects.create(
-                    usuario=admin,
-                    titulo=f'Nueva Solicitud de Recarga',
-                    mensaje=f'Hay una nueva solicitud de recarga por ${solicitud.monto_solicitado:,.0f} para {solicitud.alumno.nombre}.',
-                    tipo='solicitud',
-                    nivel='info',
-                    contenido_relacionado=solicitud,
-                    url_accion=reverse('alumnos:procesar_solicitud', args=[solicitud.pk])
-                )
+        """Avisa al padre que su solicitud de recarga fue procesada"""
+        return EventoNotificacion.publicar('solicitud_procesada', solicitudes=[solicitud.pk])
     
     @classmethod
     def crear_notificacion_limite_consumo(cls, alumno, consumo_actual):
-        """Crea una notificación cuando se alcanza el límite de consumo diario"""
-        mensaje = f'Has alcanzado tu límite de consumo diario de ${alumno.limite_consumo:,.0f}. Consumo actual: ${consumo_actual:,.0f}'
-        
-        # Notificar al alumno
-        if hasattr(alumno, 'usuario') and alumno.usuario:
-            cls.objects.create(
-                usuario=alumno.usuario,
-                titulo='Límite de Consumo Alcanzado',
-                mensaje=mensaje,
-                tipo='limite_consumo',
-                nivel='warning',
-                contenido_relacionado=alumno
-            )
-        
-        # Notificar a los padres
-        for padre in alumno.padres.all():
-            if hasattr(padre, 'usuario') and padre.usuario:
-                cls.objects.create(
-                    usuario=padre.usuario,
-                    titulo=f'Límite de Consumo Alcanzado - {alumno.get_nombre_completo()}',
-                    mensaje=f'{alumno.nombre} ha alcanzado su límite de consumo diario de ${alumno.limite_consumo:,.0f}',
-                    tipo='limite_consumo',
-                    nivel='warning',
-                    contenido_relacionado=alumno
-                )
\ No newline at end of file
+        """Avisa a los padres que el alumno alcanzó su límite de consumo diario"""
+        return EventoNotificacion.publicar('limite_consumo', alumno_id=alumno.pk, consumo=str(consumo_actual))
+
+
+class NotificacionArchivada(models.Model):
+    """
+    Notificaciones leídas que superaron la retención.
+    
+    ``depurar_notificaciones --archivar`` las mueve aquí por lotes para
+    que ``Notificacion`` solo contenga la bandeja reciente.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notificaciones_archivadas'
+    )
+    titulo = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    tipo = models.CharField(max_length=20, choices=Notificacion.TIPO_CHOICES)
+    nivel = models.CharField(max_length=20, choices=Notificacion.NIVEL_CHOICES, default='info')
+    fecha_creacion = models.DateTimeField()
+    fecha_lectura = models.DateTimeField(null=True, blank=True)
+    fecha_archivado = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Notificación archivada'
+        verbose_name_plural = 'Notificaciones archivadas'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"{self.titulo} - {self.get_tipo_display()}"
+
+
+class EventoNotificacion(models.Model):
+    """
+    Bandeja de salida de notificaciones.
+    
+    Quien produce una notificación agrega una sola fila compacta dentro de
+    su propia transacción (si la operación se revierte, el aviso también).
+    El worker ``procesar_notificaciones`` la expande luego a una
+    Notificacion por destinatario con ``bulk_create``, fuera del cobro y de
+    las recargas.
+    """
+    TIPO_CHOICES = [
+        ('movimiento_saldo', 'Movimiento de saldo'),
+        ('saldo_bajo', 'Saldo bajo'),
+        ('limite_consumo', 'Límite de consumo'),
+        ('solicitud_procesada', 'Solicitud de recarga procesada'),
+        ('stock', 'Alerta de stock'),
+    ]
+    
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    datos = models.JSONField(default=dict)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_procesado = models.DateTimeField(null=True, blank=True)
+    notificaciones_creadas = models.PositiveIntegerField(default=0)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        verbose_name = 'Evento de Notificación'
+        verbose_name_plural = 'Eventos de Notificación'
+        ordering = ['id']
+        indexes = [
+            # Solo las filas pendientes: el índice no crece con el historial
+            models.Index(fields=['id'], condition=models.Q(fecha_procesado__isnull=True),
+                         name='alumnos_evento_pendiente_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk}"
+    
+    @classmethod
+    def publicar(cls, tipo, **datos):
+        """Agrega un evento a la bandeja de salida (un INSERT)"""
+        return cls.objects.create(tipo=tipo, datos=datos)
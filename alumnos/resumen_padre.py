@@ -0,0 +1,125 @@
+"""
+Resumen del portal de padres: hijos, saldos, consumo de hoy y últimos
+movimientos.
+
+La app de padres lo pide justo después del recreo, cuando salen las
+notificaciones. Se arma siempre con dos consultas sin importar cuántos
+hijos tenga el padre:
+
+1. Los hijos con el consumo del día (subconsulta sobre ``ConsumoDiario``).
+2. Los últimos ``MOVIMIENTOS_RECIENTES`` movimientos de cada hijo, con un
+   ``Prefetch`` recortado (función ventana por alumno).
+
+El resultado queda en caché por padre (``resumen_padre:{padre_id}``).
+Junto con él se guarda ``resumen_padre:alumno:{alumno_id}`` → padre, así
+``invalidar`` (llamado por cada cambio de saldo) sabe qué resúmenes
+descartar sin consultar la base. El historial completo se pagina aparte
+con cursor.
+
+La invalidación solo sirve si todos los procesos ven la misma caché: con
+la caché local por proceso (``LocMemCache``, la que se usa sin
+``CACHES``) un cambio de saldo en otro worker no borraría el resumen de
+este. Sin caché compartida (``cache_compartida()``) el resumen no se
+cachea y se arma en cada pedido con las dos consultas.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .contador_notificaciones import cache_compartida
+from .models import Alumno, ConsumoDiario, MovimientoSaldo
+
+CENTAVOS = Decimal('0.01')
+MOVIMIENTOS_RECIENTES = 5
+
+
+def clave_cache(padre_id):
+    return f'resumen_padre:{padre_id}'
+
+
+def clave_alumno(alumno_id):
+    return f'resumen_padre:alumno:{alumno_id}'
+
+
+def _ttl():
+    return getattr(settings, 'RESUMEN_PADRE_CACHE_TTL', 300)
+
+
+def _movimiento(movimiento):
+    return {
+        'id': movimiento.id,
+        'tipo': movimiento.tipo,
+        'monto': str(movimiento.monto),
+        'saldo_nuevo': str(movimiento.saldo_nuevo),
+        'descripcion': movimiento.descripcion or '',
+        'fecha': movimiento.fecha_movimiento.isoformat(),
+    }
+
+
+def construir_resumen(padre_id, fecha=None):
+    """Arma el resumen de ``padre_id`` con dos consultas"""
+    fecha = fecha or timezone.localdate()
+    consumo_hoy = ConsumoDiario.objects.filter(alumno=OuterRef('pk'), fecha=fecha).values('total')[:1]
+    recientes = MovimientoSaldo.objects.order_by('-fecha_movimiento', '-id')
+    hijos = (
+        Alumno.objects.filter(padre_tutor_id=padre_id, activo=True)
+        .annotate(consumo_hoy=Coalesce(Subquery(consumo_hoy), Value(Decimal('0')), output_field=DecimalField()))
+        .prefetch_related(Prefetch(
+            'movimientos', queryset=recientes[:MOVIMIENTOS_RECIENTES], to_attr='movimientos_recientes'
+        ))
+        .order_by('nombre', 'apellido')
+    )
+
+    resultado = []
+    for hijo in hijos:
+        limite = hijo.limite_consumo
+        consumo = Decimal(hijo.consumo_hoy).quantize(CENTAVOS)
+        resultado.append({
+            'id': hijo.id,
+            'nombre': hijo.nombre,
+            'apellido': hijo.apellido,
+            'numero_tarjeta': hijo.numero_tarjeta,
+            'saldo': str(hijo.saldo_tarjeta),
+            'limite_consumo': str(limite),
+            'consumo_hoy': str(consumo),
+            'disponible_hoy': str(max(limite - consumo, Decimal('0.00'))) if limite else None,
+            'movimientos_recientes': [_movimiento(m) for m in hijo.movimientos_recientes],
+        })
+    return {'fecha': fecha.isoformat(), 'hijos': resultado}
+
+
+def resumen_padre(padre_id):
+    """Resumen cacheado de ``padre_id``; se rearma al cambiar el saldo de un hijo o el día"""
+    if not cache_compartida():
+        return construir_resumen(padre_id)
+
+    resumen = cache.get(clave_cache(padre_id))
+    if resumen is not None and resumen['fecha'] == timezone.localdate().isoformat():
+        return resumen
+
+    resumen = construir_resumen(padre_id)
+    ttl = _ttl()
+    cache.set_many({clave_alumno(hijo['id']): padre_id for hijo in resumen['hijos']}, ttl)
+    cache.set(clave_cache(padre_id), resumen, ttl)
+    return resumen
+
+
+def _descartar(alumno_ids, padre_ids):
+    padres = set(padre_ids) | set(cache.get_many([clave_alumno(pk) for pk in alumno_ids]).values())
+    cache.delete_many([clave_cache(pk) for pk in padres if pk is not None])
+
+
+def invalidar(alumno_ids, padre_ids=()):
+    """
+    Descarta, al confirmar la transacción, los resúmenes que incluyen a
+    ``alumno_ids`` (y los de ``padre_ids``). No consulta la base.
+    """
+    if not cache_compartida():
+        return
+    alumno_ids, padre_ids = list(alumno_ids), list(padre_ids)
+    transaction.on_commit(lambda: _descartar(alumno_ids, padre_ids))
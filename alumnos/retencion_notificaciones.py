@@ -0,0 +1,81 @@
+"""
+Retención y operaciones masivas sobre ``Notificacion``.
+
+La tabla recibe una fila por movimiento y por padre cada día de clases.
+Las operaciones que tocan muchas filas (marcar todas como leídas, eliminar
+las leídas, depurar el historial) trabajan por lotes de ids: cada lote es
+una transacción corta, así ninguna sentencia mantiene bloqueadas miles de
+filas mientras el worker de la bandeja inserta notificaciones nuevas.
+
+``depurar_notificaciones`` elimina (o archiva en ``NotificacionArchivada``)
+las notificaciones leídas con más de ``NOTIFICACIONES_RETENCION_DIAS``
+días. Las no leídas no se depuran nunca.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .contador_notificaciones import reiniciar
+from .models import Notificacion, NotificacionArchivada
+
+TAMANO_LOTE = 1000
+
+
+def _por_lotes(queryset, lote, accion):
+    """Aplica ``accion(ids)`` a ``queryset`` por lotes de ids; retorna el total de filas"""
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('id', flat=True)[:lote])
+            if not ids:
+                return total
+            total += accion(ids)
+
+
+def marcar_todas_leidas(usuario_id, lote=TAMANO_LOTE):
+    """Marca como leídas todas las notificaciones de ``usuario_id``; retorna cuántas"""
+    ahora = timezone.now()
+    total = _por_lotes(
+        Notificacion.objects.filter(usuario_id=usuario_id, leida=False).order_by(),
+        lote,
+        lambda ids: Notificacion.objects.filter(pk__in=ids).update(leida=True, fecha_lectura=ahora),
+    )
+    reiniciar(usuario_id)
+    return total
+
+
+def eliminar_leidas(usuario_id, lote=TAMANO_LOTE):
+    """Elimina las notificaciones leídas de ``usuario_id``; retorna cuántas"""
+    return _por_lotes(
+        Notificacion.objects.filter(usuario_id=usuario_id, leida=True).order_by(),
+        lote,
+        lambda ids: Notificacion.objects.filter(pk__in=ids).delete()[0],
+    )
+
+
+def _archivar(ids):
+    notificaciones = Notificacion.objects.filter(pk__in=ids).order_by().values(
+        'usuario_id', 'titulo', 'mensaje', 'tipo', 'nivel', 'fecha_creacion', 'fecha_lectura'
+    )
+    NotificacionArchivada.objects.bulk_create([NotificacionArchivada(**fila) for fila in notificaciones])
+    return Notificacion.objects.filter(pk__in=ids).delete()[0]
+
+
+def depurar(dias=None, archivar=False, lote=TAMANO_LOTE):
+    """
+    Elimina (o archiva) las notificaciones leídas creadas hace más de
+    ``dias`` días. Retorna la cantidad de notificaciones depuradas.
+    """
+    if dias is None:
+        dias = getattr(settings, 'NOTIFICACIONES_RETENCION_DIAS', 90)
+    if dias < 0:
+        raise ValueError('Los días de retención no pueden ser negativos')
+
+    viejas = Notificacion.objects.filter(
+        leida=True, fecha_creacion__lt=timezone.now() - timedelta(days=dias)
+    ).order_by('fecha_creacion')
+    if archivar:
+        return _por_lotes(viejas, lote, _archivar)
+    return _por_lotes(viejas, lote, lambda ids: Notificacion.objects.filter(pk__in=ids).delete()[0])
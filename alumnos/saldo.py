@@ -0,0 +1,244 @@
+"""
+Operaciones atómicas sobre el saldo de la tarjeta de cantina.
+
+El débito es una única sentencia::
+
+    UPDATE alumnos_alumno
+       SET saldo_tarjeta = saldo_tarjeta - monto
+     WHERE numero_tarjeta = ... AND activo AND saldo_tarjeta >= monto
+ RETURNING id, saldo_tarjeta
+
+La base decide si hay saldo y lo descuenta en el mismo paso, por lo que no
+hay lectura-modificación-escritura que dos cajas puedan pisar: el saldo
+nunca queda negativo. El MovimientoSaldo se escribe en la misma transacción
+con el saldo anterior/nuevo que devolvió el UPDATE.
+
+La acreditación (recargas) usa la misma forma, sin la condición de saldo.
+Las acreditaciones masivas (importación de extractos, aprobación de
+solicitudes) usan ``acreditar_en_bloque``: bloquea los alumnos en orden de
+id con una consulta y aplica todos los montos con un UPDATE ... FROM
+(VALUES ...) por bloque.
+
+Cada operación deja un único ``EventoNotificacion`` con los movimientos
+creados; avisar a los padres queda a cargo de ``procesar_notificaciones``.
+Al confirmarse descarta el resumen cacheado del portal de padres.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Alumno, EventoNotificacion, MovimientoSaldo
+from .resumen_padre import invalidar as invalidar_resumen
+
+CENTAVOS = Decimal('0.01')
+FILAS_POR_BLOQUE = 500
+
+
+def _a_decimal(valor):
+    return Decimal(str(valor)).quantize(CENTAVOS)
+
+
+def _debitar(columna, valor, monto, usuario, descripcion):
+    monto = _a_decimal(monto)
+    if monto <= 0:
+        raise ValueError('El monto a debitar debe ser mayor a cero')
+
+    tabla = connection.ops.quote_name(Alumno._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {tabla} "
+                f"SET saldo_tarjeta = saldo_tarjeta - %s, fecha_modificacion = %s "
+                f"WHERE {columna} = %s AND activo = %s AND saldo_tarjeta >= %s "
+                f"RETURNING id, saldo_tarjeta",
+                [monto, timezone.now(), valor, True, monto]
+            )
+            fila = cursor.fetchone()
+
+        if fila is None:
+            _explicar_rechazo(columna, valor, monto)
+
+        alumno_id, saldo_nuevo = fila[0], _a_decimal(fila[1])
+        movimiento = MovimientoSaldo.objects.create(
+            alumno_id=alumno_id,
+            tipo='compra',
+            monto=monto,
+            saldo_anterior=saldo_nuevo + monto,
+            saldo_nuevo=saldo_nuevo,
+            descripcion=descripcion,
+            realizado_por=usuario
+        )
+        EventoNotificacion.publicar('movimiento_saldo', movimientos=[movimiento.pk])
+        invalidar_resumen([alumno_id])
+        return movimiento
+
+
+def _rearmar_aviso(tipo):
+    """Una recarga vuelve a habilitar el aviso de saldo bajo del alumno"""
+    return ', aviso_saldo_bajo = NULL' if tipo == 'carga' else ''
+
+
+def _acreditar(columna, valor, monto, usuario, descripcion, tipo='carga'):
+    monto = _a_decimal(monto)
+    if monto <= 0:
+        raise ValueError('El monto a acreditar debe ser mayor a cero')
+
+    tabla = connection.ops.quote_name(Alumno._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {tabla} "
+                f"SET saldo_tarjeta = saldo_tarjeta + %s, fecha_modificacion = %s{_rearmar_aviso(tipo)} "
+                f"WHERE {columna} = %s AND activo = %s "
+                f"RETURNING id, saldo_tarjeta",
+                [monto, timezone.now(), valor, True]
+            )
+            fila = cursor.fetchone()
+
+        if fila is None:
+            _explicar_rechazo(columna, valor, monto)
+
+        alumno_id, saldo_nuevo = fila[0], _a_decimal(fila[1])
+        movimiento = MovimientoSaldo.objects.create(
+            alumno_id=alumno_id,
+            tipo=tipo,
+            monto=monto,
+            saldo_anterior=saldo_nuevo - monto,
+            saldo_nuevo=saldo_nuevo,
+            descripcion=descripcion,
+            realizado_por=usuario
+        )
+        EventoNotificacion.publicar('movimiento_saldo', movimientos=[movimiento.pk])
+        invalidar_resumen([alumno_id])
+        return movimiento
+
+
+def _bloquear_y_acreditar(montos, tipo='carga'):
+    """Suma ``{alumno_id: monto}`` a los saldos; retorna ``{alumno_id: saldo_nuevo}``"""
+    tabla = connection.ops.quote_name(Alumno._meta.db_table)
+    ahora = timezone.now()
+    pendientes = sorted(montos.items())
+    saldos = {}
+    for inicio in range(0, len(pendientes), FILAS_POR_BLOQUE):
+        bloque = pendientes[inicio:inicio + FILAS_POR_BLOQUE]
+        # Bloqueo en orden de id: dos acreditaciones masivas no se cruzan en un deadlock
+        list(Alumno.objects.select_for_update().filter(
+            pk__in=[alumno_id for alumno_id, _ in bloque]
+        ).order_by('pk').values_list('pk', flat=True))
+        valores = ', '.join(['(%s, %s)'] * len(bloque))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH v(alumno_id, monto) AS (VALUES {valores}) "
+                f"UPDATE {tabla} "
+                f"SET saldo_tarjeta = saldo_tarjeta + v.monto, fecha_modificacion = %s{_rearmar_aviso(tipo)} "
+                f"FROM v "
+                f"WHERE id = v.alumno_id AND activo = %s "
+                f"RETURNING id, saldo_tarjeta",
+                [*[valor for fila in bloque for valor in fila], ahora, True]
+            )
+            saldos.update((alumno_id, _a_decimal(saldo)) for alumno_id, saldo in cursor.fetchall())
+    return saldos
+
+
+def acreditar_en_bloque(cargas, usuario=None, tipo='carga', omitir_inactivos=False, notificar=True,
+                        referencias=None):
+    """
+    Acredita varias cargas ``(alumno_id, monto, descripcion)`` de una vez.
+
+    Los montos se suman por alumno y se aplican con una sentencia por
+    bloque; los MovimientoSaldo se encadenan en el orden de ``cargas`` y se
+    insertan con ``bulk_create``. Retorna los movimientos en ese orden.
+    Lanza ValueError si algún alumno no existe o está inactivo y no se
+    acredita nada, salvo ``omitir_inactivos=True``: entonces esas cargas
+    se saltean y no tienen movimiento. ``notificar=False`` omite el evento
+    de notificación cuando quien llama publica el suyo. ``referencias``
+    (alineada con ``cargas``) es la referencia del banco de cada carga;
+    una ya registrada hace fallar todo el bloque con IntegrityError.
+    """
+    cargas = [(alumno_id, _a_decimal(monto), descripcion) for alumno_id, monto, descripcion in cargas]
+    referencias = referencias or [None] * len(cargas)
+    if any(monto <= 0 for _, monto, _ in cargas):
+        raise ValueError('El monto a acreditar debe ser mayor a cero')
+
+    montos = {}
+    for alumno_id, monto, _ in cargas:
+        montos[alumno_id] = montos.get(alumno_id, Decimal('0')) + monto
+
+    with transaction.atomic():
+        saldos = _bloquear_y_acreditar(montos, tipo)
+        faltantes = montos.keys() - saldos.keys()
+        if faltantes and not omitir_inactivos:
+            raise ValueError(f'Alumnos inexistentes o inactivos: {sorted(faltantes)}')
+
+        actual = {alumno_id: saldo - montos[alumno_id] for alumno_id, saldo in saldos.items()}
+        ahora = timezone.now()
+        movimientos = []
+        for (alumno_id, monto, descripcion), referencia in zip(cargas, referencias):
+            if alumno_id in faltantes:
+                continue
+            anterior = actual[alumno_id]
+            actual[alumno_id] = anterior + monto
+            movimientos.append(MovimientoSaldo(
+                alumno_id=alumno_id,
+                tipo=tipo,
+                monto=monto,
+                saldo_anterior=anterior,
+                saldo_nuevo=anterior + monto,
+                descripcion=descripcion,
+                referencia_banco=referencia,
+                realizado_por=usuario,
+                fecha_movimiento=ahora,
+            ))
+        movimientos = MovimientoSaldo.objects.bulk_create(movimientos, batch_size=1000)
+        invalidar_resumen(saldos.keys())
+        if movimientos and notificar:
+            EventoNotificacion.publicar('movimiento_saldo', movimientos=[m.pk for m in movimientos])
+        return movimientos
+
+
+def _explicar_rechazo(columna, valor, monto):
+    """Solo en el camino de error: determina por qué no se pudo debitar"""
+    alumno = Alumno.objects.filter(**{columna: valor}).only('activo', 'saldo_tarjeta', 'nombre', 'apellido').first()
+    if alumno is None:
+        raise ValueError(f'Tarjeta no encontrada: {valor}')
+    if not alumno.activo:
+        raise ValueError(f'La tarjeta de {alumno.nombre_completo} está inactiva')
+    raise ValueError(
+        f'Saldo insuficiente para {alumno.nombre_completo}. '
+        f'Disponible: {alumno.saldo_tarjeta}, requerido: {monto}'
+    )
+
+
+def debitar_tarjeta(numero_tarjeta, monto, usuario=None, descripcion=''):
+    """
+    Cobra ``monto`` de la tarjeta ``numero_tarjeta``.
+
+    Retorna el MovimientoSaldo creado o lanza ValueError si la tarjeta no
+    existe, está inactiva o no tiene saldo suficiente.
+    """
+    return _debitar('numero_tarjeta', numero_tarjeta, monto, usuario, descripcion)
+
+
+def debitar_alumno(alumno_id, monto, usuario=None, descripcion=''):
+    """Igual que ``debitar_tarjeta`` pero identificando al alumno por id"""
+    return _debitar('id', alumno_id, monto, usuario, descripcion)
+
+
+def acreditar_tarjeta(numero_tarjeta, monto, usuario=None, descripcion=''):
+    """
+    Recarga ``monto`` en la tarjeta ``numero_tarjeta``.
+
+    Retorna el MovimientoSaldo (tipo 'carga') o lanza ValueError si la
+    tarjeta no existe o está inactiva.
+    """
+    return _acreditar('numero_tarjeta', numero_tarjeta, monto, usuario, descripcion)
+
+
+def acreditar_alumno(alumno_id, monto, usuario=None, descripcion='', tipo='carga'):
+    """
+    Igual que ``acreditar_tarjeta`` pero identificando al alumno por id.
+
+    ``tipo`` permite registrar el movimiento como 'devolucion' (anulaciones).
+    """
+    return _acreditar('id', alumno_id, monto, usuario, descripcion, tipo)
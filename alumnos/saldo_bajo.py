@@ -0,0 +1,56 @@
+"""
+Barrido periódico de saldos bajos.
+
+Evaluar el umbral en cada cobro agrega lógica al camino crítico de la caja.
+En su lugar, ``manage.py barrer_saldos_bajos`` (programado cada pocos
+minutos) marca y devuelve en una sola sentencia a todos los alumnos por
+debajo del umbral que aún no fueron avisados::
+
+    UPDATE alumnos_alumno SET aviso_saldo_bajo = ahora
+     WHERE activo AND aviso_saldo_bajo IS NULL AND saldo_tarjeta < umbral
+ RETURNING id, saldo_tarjeta
+
+La condición coincide con el índice parcial ``alumnos_saldo_sin_aviso_idx``,
+así el costo depende de los alumnos sin aviso y no del padrón completo.
+Cada recarga vuelve ``aviso_saldo_bajo`` a NULL (ver ``saldo``), por lo que
+un alumno se avisa una vez por recarga. Los avisos salen como un único
+``EventoNotificacion`` que expande ``procesar_notificaciones``.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Alumno, EventoNotificacion
+
+CENTAVOS = Decimal('0.01')
+
+
+def umbral_por_defecto():
+    return Decimal(str(getattr(settings, 'SALDO_BAJO_UMBRAL', 5000)))
+
+
+def barrer_saldos_bajos(umbral=None):
+    """
+    Marca como avisados a los alumnos activos con saldo menor a ``umbral``
+    y publica un evento con todos ellos. Retorna ``[(alumno_id, saldo)]``.
+    """
+    umbral = umbral_por_defecto() if umbral is None else Decimal(str(umbral))
+    if umbral <= 0:
+        raise ValueError('El umbral de saldo bajo debe ser mayor a cero')
+
+    tabla = connection.ops.quote_name(Alumno._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {tabla} SET aviso_saldo_bajo = %s "
+                f"WHERE activo = %s AND aviso_saldo_bajo IS NULL AND saldo_tarjeta < CAST(%s AS NUMERIC) "
+                f"RETURNING id, saldo_tarjeta",
+                [timezone.now(), True, connection.ops.adapt_decimalfield_value(umbral, 10, 2)]
+            )
+            avisados = sorted((alumno_id, Decimal(str(saldo)).quantize(CENTAVOS)) for alumno_id, saldo in cursor.fetchall())
+
+        if avisados:
+            EventoNotificacion.publicar('saldo_bajo', alumnos=[[pk, str(saldo)] for pk, saldo in avisados])
+    return avisados
@@ -1,7 +1,13 @@
 from rest_framework import serializers
-from .models import Alumno
+from .models import Alumno, MovimientoSaldo
 
 class AlumnoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alumno
         fields = ['id', 'nombre', 'apellido', 'saldo_tarjeta', 'numero_tarjeta', 'limite_consumo']
+
+
+class MovimientoSaldoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MovimientoSaldo
+        fields = ['id', 'tipo', 'monto', 'saldo_anterior', 'saldo_nuevo', 'descripcion', 'fecha_movimiento']
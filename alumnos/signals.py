@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Alumno, VersionDirectorio
+from .resumen_padre import invalidar as invalidar_resumen
+
+
+@receiver(pre_save, sender=Alumno)
+def alumno_pre_save(sender, instance, **kwargs):
+    """Estampa el alumno con una nueva versión del directorio de tarjetas"""
+    instance.version_directorio = VersionDirectorio.siguiente()
+
+
+@receiver(post_save, sender=Alumno)
+def alumno_post_save(sender, instance, **kwargs):
+    """El resumen del portal de padres muestra nombre, límite y saldo del alumno"""
+    invalidar_resumen([instance.pk], [instance.padre_tutor_id])
+
+
+@receiver(post_delete, sender=Alumno)
+def alumno_post_delete(sender, instance, **kwargs):
+    """Un borrado obliga a los POS desactualizados a pedir la copia completa"""
+    VersionDirectorio.siguiente(eliminacion=True)
+    invalidar_resumen([instance.pk], [instance.padre_tutor_id])
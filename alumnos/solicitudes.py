@@ -0,0 +1,69 @@
+"""
+Aprobación y rechazo en bloque de las solicitudes de recarga.
+
+El primer día hábil del mes llegan cientos de solicitudes. Procesarlas una
+por una cuesta varias consultas cada una (saldo, movimiento, estado,
+notificaciones) y mantiene bloqueado al alumno mientras tanto. En bloque:
+
+* Las solicitudes pendientes se bloquean con una consulta en orden de id,
+  así dos administradores no procesan la misma solicitud.
+* Los saldos se acreditan con ``saldo.acreditar_en_bloque``: un bloqueo
+  ordenado de los alumnos, un UPDATE por bloque y un ``bulk_create`` de
+  los movimientos.
+* El estado se actualiza con un único UPDATE.
+* Las notificaciones a los padres se publican como un único
+  ``EventoNotificacion``; las expande ``procesar_notificaciones``.
+"""
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import EventoNotificacion, SolicitudRecarga
+from .saldo import acreditar_en_bloque
+
+
+def procesar_solicitudes(solicitudes, usuario, aprobar=True, observaciones=''):
+    """
+    Aprueba (o rechaza) las solicitudes pendientes de ``solicitudes``.
+
+    ``solicitudes`` puede ser un QuerySet filtrado o una lista de ids; las que
+    ya no estén pendientes se ignoran. Al aprobar, las solicitudes de alumnos
+    inactivos quedan pendientes. Retorna ``{'procesadas': [ids],
+    'omitidas': [ids]}``.
+    """
+    ids = solicitudes.values('pk') if isinstance(solicitudes, QuerySet) else list(solicitudes)
+
+    with transaction.atomic():
+        pendientes = list(
+            SolicitudRecarga.objects.select_for_update()
+            .filter(pk__in=ids, estado='pendiente')
+            .order_by('pk')
+            .values_list('pk', 'alumno_id', 'monto')
+        )
+
+        omitidas = []
+        if aprobar and pendientes:
+            movimientos = acreditar_en_bloque(
+                [(alumno_id, monto, f'Solicitud de recarga #{pk}') for pk, alumno_id, monto in pendientes],
+                usuario=usuario,
+                omitir_inactivos=True,
+                notificar=False,
+            )
+            acreditados = {movimiento.alumno_id for movimiento in movimientos}
+            omitidas = [pk for pk, alumno_id, _ in pendientes if alumno_id not in acreditados]
+            pendientes = [fila for fila in pendientes if fila[1] in acreditados]
+
+        procesadas = [pk for pk, _, _ in pendientes]
+        cambios = {
+            'estado': 'aprobada' if aprobar else 'rechazada',
+            'procesado_por': usuario,
+            'fecha_procesamiento': timezone.now(),
+        }
+        if observaciones:
+            cambios['observaciones'] = observaciones
+        SolicitudRecarga.objects.filter(pk__in=procesadas).update(**cambios)
+
+        if procesadas:
+            EventoNotificacion.publicar('solicitud_procesada', solicitudes=procesadas)
+
+    return {'procesadas': procesadas, 'omitidas': omitidas}
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from alumnos.consumo import clave_cache, consumo_del_dia, disponibles_del_dia, registrar_consumo
+from alumnos.models import Alumno, ConsumoDiario
+
+
+class ConsumoDiarioTestCase(TestCase):
+    """Tests del contador de consumo diario y su caché por worker"""
+
+    def setUp(self):
+        cache.clear()
+        self.alumno = Alumno.objects.create(
+            numero_tarjeta='T600', nombre='Iris', apellido='Sosa', ci='CI600',
+            fecha_nacimiento=date(2015, 1, 1)
+        )
+
+    def test_registrar_consumo_es_una_sentencia(self):
+        with self.assertNumQueries(1):
+            registrar_consumo(self.alumno.id, Decimal('3000'), Decimal('5000'))
+        with self.assertNumQueries(1):
+            self.assertEqual(registrar_consumo(self.alumno.id, Decimal('2000'), Decimal('5000')), Decimal('5000.00'))
+
+        with self.assertRaisesMessage(ValueError, 'Disponible hoy: 0.00'):
+            registrar_consumo(self.alumno.id, Decimal('1'), Decimal('5000'))
+        with self.assertRaisesMessage(ValueError, 'Límite de consumo diario excedido'):
+            registrar_consumo(self.alumno.id, Decimal('6000'), Decimal('5000'), fecha=date(2026, 1, 1))
+
+        contador = ConsumoDiario.objects.get(alumno=self.alumno, fecha=timezone.localdate())
+        self.assertEqual((contador.total, contador.cantidad), (Decimal('5000.00'), 2))
+
+    def test_consumo_del_dia_usa_la_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_consumo(self.alumno.id, Decimal('1500'), 0)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(consumo_del_dia(self.alumno.id), Decimal('1500.00'))
+
+        # Otro día es otra clave: arranca de cero sin invalidar nada
+        ayer = timezone.localdate() - timedelta(days=1)
+        self.assertIsNone(cache.get(clave_cache(self.alumno.id, ayer)))
+        self.assertEqual(consumo_del_dia(self.alumno.id, ayer), Decimal('0.00'))
+
+    def test_disponible_en_la_busqueda_del_pos(self):
+        self.alumno.limite_consumo = Decimal('5000')
+        self.alumno.save()
+        otro = Alumno.objects.create(
+            numero_tarjeta='T601', nombre='Iván', apellido='Sosa', ci='CI601',
+            fecha_nacimiento=date(2015, 1, 1), limite_consumo=Decimal('8000')
+        )
+        sin_limite = Alumno.objects.create(
+            numero_tarjeta='T602', nombre='Inés', apellido='Sosa', ci='CI602',
+            fecha_nacimiento=date(2015, 1, 1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_consumo(self.alumno.id, Decimal('3500'), Decimal('5000'))
+        cache.delete(clave_cache(self.alumno.id, timezone.localdate()))
+
+        # Una sola lectura para todos los que no están en la caché
+        with self.assertNumQueries(1):
+            disponibles = disponibles_del_dia([self.alumno, otro, sin_limite])
+        self.assertEqual(disponibles, {self.alumno.id: Decimal('1500.00'), otro.id: Decimal('8000.00'),
+                                       sin_limite.id: None})
+        with self.assertNumQueries(0):
+            disponibles_del_dia([self.alumno, otro, sin_limite])
+
+        self.client.force_login(get_user_model().objects.create_user(
+            username='cajero_consumo', password='testpass123', tipo_usuario='cajero'))
+        respuesta = self.client.get(reverse('ventas:api_buscar_clientes'), {'q': 'T600'})
+        cliente = respuesta.json()['clientes'][0]
+        self.assertEqual((cliente['limite_consumo'], cliente['disponible_hoy']), (5000.0, 1500.0))
+
+    def test_rotacion_nocturna(self):
+        hoy = timezone.localdate()
+        for dias in (0, 1, 40, 90):
+            ConsumoDiario.objects.create(alumno=self.alumno, fecha=hoy - timedelta(days=dias),
+                                         total=Decimal('1000'), cantidad=1)
+
+        salida = StringIO()
+        call_command('rotar_consumos_diarios', lote=1, stdout=salida)
+
+        self.assertIn('2 contadores', salida.getvalue())
+        self.assertEqual(ConsumoDiario.objects.count(), 2)
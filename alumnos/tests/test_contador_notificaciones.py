@@ -0,0 +1,112 @@
+import tempfile
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from alumnos.contador_notificaciones import clave_cache, no_leidas
+from alumnos.difusion import procesar_lote
+from alumnos.models import EventoNotificacion, Notificacion
+
+User = get_user_model()
+
+
+def leer_stream(respuesta):
+    """Contenido completo de una respuesta SSE (la vista emite con un generador asíncrono)"""
+    async def leer():
+        return b''.join([parte async for parte in respuesta.streaming_content]).decode()
+    return async_to_sync(leer)()
+
+
+@override_settings(NOTIFICACIONES_LONG_POLL=0, NOTIFICACIONES_SSE_DURACION=0)
+class ContadorNoLeidasTestCase(TestCase):
+    """Tests del contador de notificaciones no leídas en caché"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(username='admin_contador', password='testpass123',
+                                                tipo_usuario='administrador')
+
+    def crear(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notificacion.objects.create(usuario=self.usuario, titulo='Aviso', mensaje='...', **kwargs)
+
+    def test_lectura_cacheada(self):
+        self.crear()
+        with self.assertNumQueries(1):
+            self.assertEqual(no_leidas(self.usuario.id), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(no_leidas(self.usuario.id), 1)
+
+    def test_crear_leer_y_eliminar_ajustan_el_contador(self):
+        no_leidas(self.usuario.id)
+        primera = self.crear()
+        segunda = self.crear()
+        self.crear(leida=True)
+        self.assertEqual(cache.get(clave_cache(self.usuario.id)), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.marcar_como_leida()
+        with self.captureOnCommitCallbacks(execute=True):
+            segunda.delete()
+        self.assertEqual(cache.get(clave_cache(self.usuario.id)), 0)
+
+    def test_la_expansion_de_la_bandeja_suma_al_contador(self):
+        no_leidas(self.usuario.id)
+        EventoNotificacion.publicar('stock', titulo='Stock', mensaje='Agotado', nivel='error')
+        EventoNotificacion.publicar('stock', titulo='Stock', mensaje='Bajo', nivel='warning')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            procesar_lote()
+
+        self.assertEqual(cache.get(clave_cache(self.usuario.id)), 2)
+
+    def test_endpoints(self):
+        self.client.force_login(self.usuario)
+        self.crear()
+
+        respuesta = self.client.get(reverse('notificaciones:contador_no_leidas'), {'desde': 0})
+        self.assertEqual(respuesta.json(), {'count': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notificaciones:marcar_todas_leidas'))
+        self.assertEqual(no_leidas(self.usuario.id), 0)
+
+        respuesta = self.client.get(reverse('notificaciones:stream_no_leidas'))
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        self.assertIn('data: {"count": 0}', leer_stream(respuesta))
+
+    @override_settings(NOTIFICACIONES_LONG_POLL=30, NOTIFICACIONES_SSE_DURACION=30)
+    def test_sin_cache_compartida_no_espera(self):
+        self.client.force_login(self.usuario)
+        self.crear()
+
+        # Con la caché local el long-poll responde sin esperar el cambio
+        respuesta = self.client.get(reverse('notificaciones:contador_no_leidas'), {'desde': 1})
+        self.assertEqual(respuesta.json(), {'count': 1})
+
+        respuesta = self.client.get(reverse('notificaciones:stream_no_leidas'))
+        contenido = leer_stream(respuesta)
+        self.assertTrue(contenido.startswith('retry: 30000'))
+        self.assertIn('data: {"count": 1}', contenido)
+
+    def test_espera_con_cache_compartida(self):
+        self.client.force_login(self.usuario)
+        with tempfile.TemporaryDirectory() as directorio, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio,
+        }}):
+            self.crear()
+            respuesta = self.client.get(reverse('notificaciones:contador_no_leidas'), {'desde': 1})
+            self.assertEqual(respuesta.json(), {'count': 1})
+
+            respuesta = self.client.get(reverse('notificaciones:stream_no_leidas'))
+            contenido = leer_stream(respuesta)
+            self.assertTrue(contenido.startswith('retry: 3000\n'))
+
+    def test_endpoints_requieren_sesion(self):
+        respuesta = self.client.get(reverse('notificaciones:contador_no_leidas'))
+        self.assertEqual(respuesta.status_code, 302)
+        respuesta = self.client.get(reverse('notificaciones:stream_no_leidas'))
+        self.assertEqual(respuesta.status_code, 302)
@@ -0,0 +1,122 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from alumnos import difusion
+from alumnos.difusion import ESPERA_REINTENTO, MAXIMO_INTENTOS, procesar_lote
+from alumnos.models import Alumno, EventoNotificacion, Notificacion, Padre
+from alumnos.saldo import acreditar_en_bloque, debitar_alumno
+from productos.models import Categoria, MovimientoStock, Producto
+
+User = get_user_model()
+
+
+class BandejaNotificacionesTestCase(TestCase):
+    """Tests de la bandeja de salida de notificaciones y su expansión"""
+
+    def setUp(self):
+        self.alumnos = []
+        for i in range(4):
+            usuario = User.objects.create_user(username=f'padre_bandeja{i}', password='testpass123',
+                                               tipo_usuario='padre')
+            padre = Padre.objects.create(
+                nombre=f'Padre{i}', apellido='Gómez', ci=f'CI70{i}', ruc=f'RUC70{i}',
+                razon_social=f'Padre{i} Gómez', email=f'padre{i}@example.com', celular='0981000000',
+                usuario=usuario
+            )
+            self.alumnos.append(Alumno.objects.create(
+                numero_tarjeta=f'T70{i}', nombre=f'Hijo{i}', apellido='Gómez', ci=f'CIA70{i}',
+                fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('10000'), padre_tutor=padre
+            ))
+        self.sin_padre = Alumno.objects.create(
+            numero_tarjeta='T799', nombre='Solo', apellido='Gómez', ci='CIA799',
+            fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('10000')
+        )
+
+    def test_el_cobro_solo_agrega_un_evento(self):
+        # UPDATE del saldo + INSERT del movimiento + INSERT del evento (más el savepoint)
+        with self.assertNumQueries(5):
+            movimiento = debitar_alumno(self.alumnos[0].id, Decimal('2500'))
+
+        evento = EventoNotificacion.objects.get()
+        self.assertEqual((evento.tipo, evento.datos), ('movimiento_saldo', {'movimientos': [movimiento.pk]}))
+        self.assertFalse(Notificacion.objects.exists())
+
+    def test_expansion_en_bloque(self):
+        acreditar_en_bloque([(alumno.id, 5000, 'Recarga') for alumno in [*self.alumnos, self.sin_padre]])
+        self.assertEqual(EventoNotificacion.objects.count(), 1)
+
+        # Toma de eventos + content type + destinatarios + INSERT + UPDATE del evento (más savepoints)
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(9):
+            self.assertEqual(procesar_lote(), 1)
+
+        notificaciones = Notificacion.objects.filter(tipo='transaccion')
+        self.assertEqual(notificaciones.count(), 4)
+        self.assertEqual(set(notificaciones.values_list('usuario__username', flat=True)),
+                         {f'padre_bandeja{i}' for i in range(4)})
+        self.assertIn('Saldo actual: ₲15.000', notificaciones.first().mensaje)
+
+        evento = EventoNotificacion.objects.get()
+        self.assertIsNotNone(evento.fecha_procesado)
+        self.assertEqual(evento.notificaciones_creadas, 4)
+        self.assertEqual(procesar_lote(), 0)
+
+    def test_alerta_de_stock_al_personal(self):
+        admin = User.objects.create_user(username='admin_bandeja', password='testpass123',
+                                         tipo_usuario='administrador')
+        User.objects.create_user(username='cajero_bandeja', password='testpass123', tipo_usuario='cajero')
+        producto = Producto.objects.create(
+            codigo='P700', nombre='Galletitas', categoria=Categoria.objects.create(nombre='Snacks'),
+            precio=Decimal('3000'), stock_actual=1, stock_minimo=5
+        )
+
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.filter(pk=producto.pk).update(stock_actual=0)
+            MovimientoStock.objects.create(producto=producto, tipo='venta', cantidad=-1,
+                                           stock_anterior=1, stock_nuevo=0)
+        procesar_lote()
+
+        notificacion = Notificacion.objects.get(tipo='stock')
+        self.assertEqual(notificacion.usuario, admin)
+        self.assertIn('agotado', notificacion.mensaje)
+
+    def test_errores_se_reintentan(self):
+        EventoNotificacion.publicar('saldo_bajo', alumno_id=self.alumnos[0].id, saldo='500')
+        evento = EventoNotificacion.publicar('limite_consumo', alumno_id=self.alumnos[1].id, consumo='9000')
+
+        with mock.patch.dict(difusion.EXPANSORES, {'limite_consumo': mock.Mock(side_effect=RuntimeError('caído'))}):
+            procesar_lote()
+
+        # El tipo que falló no arrastra a los demás
+        self.assertEqual(Notificacion.objects.get().tipo, 'saldo_bajo')
+        evento.refresh_from_db()
+        self.assertIsNone(evento.fecha_procesado)
+        self.assertEqual((evento.intentos, evento.error), (1, 'caído'))
+        espera = (evento.proximo_intento - timezone.now()).total_seconds()
+        self.assertAlmostEqual(espera, ESPERA_REINTENTO, delta=5)
+
+        # No se vuelve a tomar antes de que venza la espera
+        self.assertEqual(procesar_lote(), 0)
+        with mock.patch.dict(difusion.EXPANSORES, {'limite_consumo': mock.Mock(side_effect=RuntimeError('caído'))}):
+            EventoNotificacion.objects.filter(pk=evento.pk).update(proximo_intento=timezone.now())
+            procesar_lote()
+        evento.refresh_from_db()
+        espera = (evento.proximo_intento - timezone.now()).total_seconds()
+        self.assertAlmostEqual(espera, ESPERA_REINTENTO * 2, delta=5)
+
+        EventoNotificacion.objects.filter(pk=evento.pk).update(proximo_intento=timezone.now())
+        procesar_lote()
+        evento.refresh_from_db()
+        self.assertIsNotNone(evento.fecha_procesado)
+        self.assertEqual(Notificacion.objects.filter(tipo='limite_consumo').count(), 1)
+
+        EventoNotificacion.objects.filter(pk=evento.pk).update(fecha_procesado=None, intentos=MAXIMO_INTENTOS)
+        self.assertEqual(procesar_lote(), 0)
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from alumnos.estados_cuenta import armar_estados, generar_estados, ruta_estado
+from alumnos.libro_saldos import generar_saldos_mes
+from alumnos.models import Alumno, MovimientoSaldo, Padre, SaldoMensual
+
+
+def momento(dia, mes=3):
+    return timezone.make_aware(datetime(2026, mes, dia, 10, 0))
+
+
+class EstadosCuentaTestCase(TestCase):
+    """Tests de los estados de cuenta mensuales por familia"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.padres = [
+            Padre.objects.create(
+                nombre=f'Padre{i}', apellido='Benítez', ci=f'CI90{i}', ruc=f'RUC90{i}',
+                razon_social=f'Familia Benítez {i}', email=f'benitez{i}@example.com', celular='0981000000'
+            )
+            for i in range(2)
+        ]
+        self.ana = Alumno.objects.create(
+            numero_tarjeta='T900', nombre='Ana', apellido='Benítez', ci='CIA900',
+            fecha_nacimiento=date(2015, 1, 1), padre_tutor=self.padres[0]
+        )
+        self.beto = Alumno.objects.create(
+            numero_tarjeta='T901', nombre='Beto', apellido='Benítez', ci='CIA901',
+            fecha_nacimiento=date(2016, 1, 1), padre_tutor=self.padres[0], saldo_tarjeta=Decimal('700')
+        )
+        Alumno.objects.create(
+            numero_tarjeta='T902', nombre='Caro', apellido='Benítez', ci='CIA902',
+            fecha_nacimiento=date(2016, 1, 1), padre_tutor=self.padres[1]
+        )
+        for fecha, tipo, monto, anterior, nuevo in [
+            (momento(20, 2), 'carga', '10000', '0', '10000'),
+            (momento(2), 'compra', '3000', '10000', '7000'),
+            (momento(5), 'carga', '5000', '7000', '12000'),
+            (momento(31), 'compra', '2000', '12000', '10000'),
+            (momento(1, 4), 'compra', '1000', '10000', '9000'),
+        ]:
+            MovimientoSaldo.objects.create(
+                alumno=self.ana, tipo=tipo, monto=Decimal(monto), saldo_anterior=Decimal(anterior),
+                saldo_nuevo=Decimal(nuevo), fecha_movimiento=fecha
+            )
+
+    def test_armar_con_consultas_fijas(self):
+        with self.assertNumQueries(3):
+            estados = armar_estados(date(2026, 3, 1), [padre.pk for padre in self.padres])
+
+        ana, beto = estados[0]['hijos']
+        self.assertEqual((ana['saldo_inicial'], ana['saldo_cierre']), (Decimal('10000'), Decimal('10000')))
+        self.assertEqual((ana['total_cargas'], ana['total_consumos']), (Decimal('5000'), Decimal('5000')))
+        self.assertEqual([m['monto'] for m in ana['movimientos']], [Decimal('3000'), Decimal('5000'), Decimal('2000')])
+        # Sin movimientos: el saldo actual de la tarjeta
+        self.assertEqual((beto['saldo_inicial'], beto['saldo_cierre']), (Decimal('700'), Decimal('700')))
+        self.assertEqual(len(estados[1]['hijos']), 1)
+
+    def test_apertura_desde_la_foto_del_mes_anterior(self):
+        generar_saldos_mes(date(2026, 2, 1))
+        self.assertEqual(armar_estados(date(2026, 3, 1), [self.padres[0].pk])[0]['hijos'][0]['saldo_inicial'],
+                         Decimal('10000'))
+
+        # La apertura es el cierre de la foto (el del estado de febrero), no una nueva lectura del libro
+        SaldoMensual.objects.filter(alumno=self.ana).update(saldo_cierre=Decimal('9500'))
+        with self.assertNumQueries(3):
+            ana, beto = armar_estados(date(2026, 3, 1), [self.padres[0].pk])[0]['hijos']
+        self.assertEqual((ana['saldo_inicial'], ana['saldo_cierre']), (Decimal('9500'), Decimal('9500')))
+        self.assertEqual(beto['saldo_inicial'], Decimal('700'))
+
+    def test_archivo_a_medio_escribir_no_cuenta_como_generado(self):
+        mes = date(2026, 3, 1)
+        ruta = ruta_estado(mes, self.padres[0].pk, 'csv')
+        # Corrida cortada mientras escribía: solo queda el temporal
+        default_storage.save(f'{ruta}.parcial', ContentFile(b'Estado de'))
+
+        resultado = generar_estados(mes, procesos=0)
+
+        self.assertEqual((resultado['generados'], resultado['salteados']), (2, 0))
+        self.assertFalse(default_storage.exists(f'{ruta}.parcial'))
+        with default_storage.open(ruta) as archivo:
+            self.assertIn('Ana Benítez;T900;;saldo_cierre;;;10000', archivo.read().decode('utf-8-sig'))
+
+        resultado = generar_estados(mes, procesos=0, forzar=True)
+        self.assertEqual(resultado['generados'], 2)
+        self.assertEqual(len(default_storage.listdir(f'estados_cuenta/{mes:%Y-%m}')[1]), 2)
+
+    def test_generar_y_retomar(self):
+        resultado = generar_estados(date(2026, 3, 1), procesos=0)
+        self.assertEqual((resultado['generados'], resultado['salteados']), (2, 0))
+
+        with default_storage.open(ruta_estado(date(2026, 3, 1), self.padres[0].pk, 'csv')) as archivo:
+            contenido = archivo.read().decode('utf-8-sig')
+        self.assertIn('Familia Benítez 0', contenido)
+        self.assertIn('Ana Benítez;T900;;saldo_cierre;;;10000', contenido)
+
+        # Una corrida interrumpida se retoma: solo falta el segundo padre
+        default_storage.delete(ruta_estado(date(2026, 3, 1), self.padres[1].pk, 'csv'))
+        salida = StringIO()
+        call_command('generar_estados_cuenta', '--mes', '2026-03', '--procesos', '0', stdout=salida)
+        self.assertIn('1 estados generados, 1 ya existentes', salida.getvalue())
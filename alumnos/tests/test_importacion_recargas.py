@@ -0,0 +1,171 @@
+import io
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from alumnos.importacion_recargas import importar_recargas, leer_archivo, leer_csv, leer_monto
+from alumnos.models import Alumno, MovimientoSaldo
+
+User = get_user_model()
+
+
+def extracto(*lineas, encabezado='numero_tarjeta;ci;monto;referencia'):
+    return io.BytesIO('\n'.join([encabezado, *lineas]).encode('utf-8'))
+
+
+class ImportacionRecargasTestCase(TestCase):
+    """Tests de la importación masiva de recargas"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='oficina', password='testpass123',
+                                                tipo_usuario='administrador')
+        self.ana = Alumno.objects.create(
+            numero_tarjeta='T400', nombre='Ana', apellido='Vera', ci='CI400',
+            fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('1000')
+        )
+        self.beto = Alumno.objects.create(
+            numero_tarjeta='T401', nombre='Beto', apellido='Vera', ci='CI401',
+            fecha_nacimiento=date(2016, 1, 1)
+        )
+        Alumno.objects.create(
+            numero_tarjeta='T402', nombre='Carla', apellido='Paz', ci='CI402',
+            fecha_nacimiento=date(2016, 1, 1), activo=False
+        )
+
+    def test_aplica_recargas_con_consultas_fijas(self):
+        filas = list(leer_csv(extracto(
+            'T400;;50000;Transferencia 1',
+            ';CI401;30000;Transferencia 2',
+            'T400;CI400;20000;Transferencia 3',
+        )))
+
+        # Directorio + referencias importadas + bloqueo + UPDATE + INSERT de movimientos
+        # + evento de notificación (más el savepoint)
+        with self.assertNumQueries(8):
+            resultado = importar_recargas(filas, usuario=self.usuario)
+
+        self.assertEqual(resultado['aplicadas'], 3)
+        self.assertEqual(resultado['errores'], 0)
+        self.assertEqual(resultado['monto_total'], Decimal('100000'))
+        self.ana.refresh_from_db()
+        self.beto.refresh_from_db()
+        self.assertEqual(self.ana.saldo_tarjeta, Decimal('71000'))
+        self.assertEqual(self.beto.saldo_tarjeta, Decimal('30000'))
+
+        # Los saldos de cada fila se encadenan en el orden del archivo
+        movimientos = list(self.ana.movimientos.order_by('saldo_nuevo'))
+        self.assertEqual([(m.saldo_anterior, m.saldo_nuevo) for m in movimientos],
+                         [(Decimal('1000'), Decimal('51000')), (Decimal('51000'), Decimal('71000'))])
+        self.assertEqual(movimientos[0].descripcion, 'Transferencia 1')
+        self.assertEqual(movimientos[0].realizado_por, self.usuario)
+        self.assertEqual([f['saldo_nuevo'] for f in resultado['filas']],
+                         [Decimal('51000'), Decimal('30000'), Decimal('71000')])
+
+    def test_errores_no_aplican_nada(self):
+        resultado = importar_recargas(leer_csv(extracto(
+            'T400;;50000;R1',
+            'T999;;1000;R2',
+            'T402;;1000;R3',
+            'T401;CI400;1000;R4',
+            'T401;;abc;R5',
+            'T401;;-5;R6',
+        )))
+
+        self.assertEqual(resultado['aplicadas'], 0)
+        self.assertEqual(resultado['errores'], 5)
+        self.assertEqual([f['linea'] for f in resultado['filas']], [2, 3, 4, 5, 6, 7])
+        self.assertEqual(resultado['filas'][0]['estado'], 'valida')
+        self.assertIn('no encontrado', resultado['filas'][1]['mensaje'])
+        self.assertIn('inactiva', resultado['filas'][2]['mensaje'])
+        self.assertIn('no corresponde', resultado['filas'][3]['mensaje'])
+        self.assertFalse(MovimientoSaldo.objects.exists())
+
+    def test_montos_en_guaranies(self):
+        for texto, esperado in [('50.000', '50000'), ('50,000', '50000'), ('1.250.000', '1250000'),
+                                ('1.250.000,50', '1250000.50'), ('1,250,000.50', '1250000.50'),
+                                ('Gs. 50.000', '50000'), ('50000', '50000'), ('50000,5', '50000.50')]:
+            self.assertEqual(leer_monto(texto), Decimal(esperado), texto)
+        for texto in ('50.00.0', '1.250,000', '1.250.5', '50.0000', '5,0000', '', 'abc'):
+            with self.assertRaisesMessage(ValueError, 'Monto inválido'):
+                leer_monto(texto)
+
+    def test_reimportar_no_acredita_dos_veces(self):
+        archivo = ('T400;;50.000;OP-1', ';CI401;30.000;OP-2')
+        self.assertEqual(importar_recargas(leer_csv(extracto(*archivo)))['aplicadas'], 2)
+
+        resultado = importar_recargas(leer_csv(extracto(*archivo, 'T401;;1.000;OP-3', 'T400;;1.000;OP-3')),
+                                      parcial=True)
+
+        self.assertEqual([f['estado'] for f in resultado['filas']], ['error', 'error', 'aplicada', 'error'])
+        self.assertIn('ya fue importada', resultado['filas'][0]['mensaje'])
+        self.assertIn('repetida', resultado['filas'][3]['mensaje'])
+        self.ana.refresh_from_db()
+        self.assertEqual(self.ana.saldo_tarjeta, Decimal('51000'))
+        self.assertEqual(MovimientoSaldo.objects.get(referencia_banco='OP-1').monto, Decimal('50000'))
+
+    def test_referencia_obligatoria(self):
+        with self.assertRaisesMessage(ValueError, 'columna referencia'):
+            leer_csv(extracto('T400;50000', encabezado='tarjeta;monto'))
+        resultado = importar_recargas(leer_csv(extracto('T400;;50000;')))
+        self.assertEqual(resultado['filas'][0]['mensaje'], 'Falta la referencia del banco')
+
+    def test_importacion_parcial(self):
+        resultado = importar_recargas(leer_csv(extracto('T400;;50000;R1', 'T999;;1000;R2')), parcial=True)
+
+        self.assertEqual(resultado['aplicadas'], 1)
+        self.assertEqual([f['estado'] for f in resultado['filas']], ['aplicada', 'error'])
+        self.ana.refresh_from_db()
+        self.assertEqual(self.ana.saldo_tarjeta, Decimal('51000'))
+
+    def test_simular(self):
+        resultado = importar_recargas(leer_csv(extracto('T400;;50000;R1')), simular=True)
+
+        self.assertEqual(resultado['aplicadas'], 0)
+        self.assertEqual(resultado['filas'][0]['estado'], 'valida')
+        self.assertFalse(MovimientoSaldo.objects.exists())
+
+    def test_encabezado_invalido(self):
+        with self.assertRaisesMessage(ValueError, 'columna monto'):
+            leer_csv(extracto('T400', encabezado='tarjeta'))
+
+    def test_api(self):
+        self.client.force_login(self.usuario)
+        archivo = SimpleUploadedFile('extracto.csv', b'tarjeta,importe,referencia\nT401,15000,OP-1\n')
+
+        respuesta = self.client.post(reverse('ventas:api_importar_recargas'), {'archivo': archivo})
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['aplicadas'], 1)
+        self.beto.refresh_from_db()
+        self.assertEqual(self.beto.saldo_tarjeta, Decimal('15000'))
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        libro.active.append(['Tarjeta', 'Importe', 'Referencia'])
+        libro.active.append(['T400', 12000, 'OP-1'])
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        contenido.seek(0)
+
+        resultado = importar_recargas(list(leer_archivo(contenido, 'extracto.xlsx')), usuario=self.usuario)
+        self.assertEqual(resultado['aplicadas'], 1)
+
+        with self.assertRaisesMessage(ValueError, 'no es válido'):
+            leer_archivo(io.BytesIO(b'no es un xlsx'), 'extracto.xlsx')
+
+    def test_xlsx_sin_openpyxl(self):
+        self.client.force_login(self.usuario)
+        archivo = SimpleUploadedFile('extracto.xlsx', b'PK')
+
+        with mock.patch.dict('sys.modules', {'openpyxl': None}):
+            respuesta = self.client.post(reverse('ventas:api_importar_recargas'), {'archivo': archivo})
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('openpyxl', respuesta.json()['error'])
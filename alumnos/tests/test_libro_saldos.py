@@ -0,0 +1,118 @@
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from alumnos.libro_saldos import generar_saldos_mes, saldo_a_fecha
+from alumnos.models import Alumno, MovimientoSaldo, SaldoMensual
+
+
+def momento(anio, mes, dia, hora=12):
+    return timezone.make_aware(datetime(anio, mes, dia, hora))
+
+
+class LibroSaldosTestCase(TestCase):
+    """Tests del libro de saldos de solo agregado y sus fotos mensuales"""
+
+    def setUp(self):
+        self.alumno = Alumno.objects.create(
+            numero_tarjeta='T300', nombre='Luis', apellido='Benítez', ci='CI300',
+            fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('0')
+        )
+        self.saldo = Decimal('5000')
+        self._registrar('carga', 20000, momento(2026, 1, 10))
+        self._registrar('compra', 3000, momento(2026, 1, 20))
+        self._registrar('compra', 4000, momento(2026, 2, 5))
+        self._registrar('carga', 10000, momento(2026, 3, 1, 8))
+        self._registrar('compra', 2500, momento(2026, 3, 15))
+
+    def _registrar(self, tipo, monto, fecha):
+        monto = Decimal(monto)
+        nuevo = self.saldo + monto if tipo == 'carga' else self.saldo - monto
+        MovimientoSaldo.objects.create(
+            alumno=self.alumno, tipo=tipo, monto=monto, saldo_anterior=self.saldo,
+            saldo_nuevo=nuevo, fecha_movimiento=fecha
+        )
+        self.saldo = nuevo
+
+    def test_movimientos_no_se_modifican(self):
+        movimiento = self.alumno.movimientos.first()
+        movimiento.monto = Decimal('1')
+        with self.assertRaises(ValueError):
+            movimiento.save()
+        with self.assertRaises(ValueError):
+            movimiento.delete()
+        with self.assertRaises(ValueError):
+            MovimientoSaldo.objects.filter(alumno=self.alumno).update(monto=0)
+        with self.assertRaises(ValueError):
+            MovimientoSaldo.objects.filter(alumno=self.alumno).delete()
+
+    def test_eliminar_alumno_borra_su_libro(self):
+        self.alumno.delete()
+        self.assertFalse(MovimientoSaldo.objects.exists())
+
+    def test_generar_saldos_mes(self):
+        self.assertEqual(generar_saldos_mes(date(2026, 1, 1)), 1)
+        foto = SaldoMensual.objects.get(alumno=self.alumno, mes=date(2026, 1, 1))
+
+        self.assertEqual(foto.saldo_inicial, Decimal('5000'))
+        self.assertEqual(foto.saldo_cierre, Decimal('22000'))
+        self.assertEqual(foto.total_cargas, Decimal('20000'))
+        self.assertEqual(foto.total_consumos, Decimal('3000'))
+        self.assertEqual(foto.cantidad_movimientos, 2)
+
+    def test_no_genera_el_mes_en_curso(self):
+        from django.core.management.base import CommandError
+        from django.utils import timezone
+
+        hoy = timezone.localdate()
+        with self.assertRaisesMessage(ValueError, 'todavía no cerró'):
+            generar_saldos_mes(hoy)
+        with self.assertRaisesMessage(ValueError, 'todavía no cerró'):
+            generar_saldos_mes(date(hoy.year + 1, 1, 1))
+        with self.assertRaisesMessage(CommandError, 'mes ya cerrado'):
+            call_command('generar_saldos_mensuales', mes=f'{hoy:%Y-%m}', stdout=StringIO())
+
+    def test_regenerar_reemplaza_la_foto(self):
+        generar_saldos_mes(date(2026, 3, 1))
+        self._registrar('compra', 1000, momento(2026, 3, 20))
+        generar_saldos_mes(date(2026, 3, 1))
+
+        foto = SaldoMensual.objects.get(alumno=self.alumno, mes=date(2026, 3, 1))
+        self.assertEqual(foto.saldo_inicial, Decimal('18000'))
+        self.assertEqual(foto.saldo_cierre, Decimal('24500'))
+        self.assertEqual(foto.cantidad_movimientos, 3)
+
+    def test_saldo_a_fecha_con_y_sin_fotos(self):
+        casos = [
+            (momento(2026, 1, 1), Decimal('5000')),
+            (momento(2026, 1, 15), Decimal('25000')),
+            (momento(2026, 2, 28), Decimal('18000')),
+            (momento(2026, 3, 1, 8), Decimal('28000')),
+            (momento(2026, 4, 1), Decimal('25500')),
+        ]
+        for fecha, esperado in casos:
+            self.assertEqual(saldo_a_fecha(self.alumno.id, fecha), esperado)
+
+        call_command('generar_saldos_mensuales', desde='2026-01', mes='2026-02', stdout=StringIO())
+        self.assertEqual(SaldoMensual.objects.count(), 2)
+        for fecha, esperado in casos:
+            self.assertEqual(saldo_a_fecha(self.alumno.id, fecha), esperado)
+
+    def test_saldo_a_fecha_lee_foto_y_cola(self):
+        generar_saldos_mes(date(2026, 1, 1))
+        generar_saldos_mes(date(2026, 2, 1))
+
+        # Foto de febrero + movimientos de marzo hasta la fecha, sin releer enero
+        with self.assertNumQueries(2):
+            self.assertEqual(saldo_a_fecha(self.alumno.id, momento(2026, 3, 10)), Decimal('28000'))
+
+    def test_alumno_sin_movimientos(self):
+        otro = Alumno.objects.create(
+            numero_tarjeta='T301', nombre='Eva', apellido='Ruiz', ci='CI301',
+            fecha_nacimiento=date(2015, 1, 1)
+        )
+        self.assertEqual(saldo_a_fecha(otro.id), Decimal('0'))
@@ -0,0 +1,102 @@
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from alumnos.consumo import registrar_consumo
+from alumnos.models import Alumno, Padre
+from alumnos.resumen_padre import clave_cache, construir_resumen, resumen_padre
+from alumnos.saldo import acreditar_alumno, debitar_alumno
+
+User = get_user_model()
+
+
+class ResumenPadreTestCase(TestCase):
+    """Tests del resumen cacheado del portal de padres"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(username='padre_portal', password='testpass123',
+                                                tipo_usuario='padre')
+        self.padre = Padre.objects.create(
+            nombre='Marta', apellido='Ruiz', ci='CI800', ruc='RUC800', razon_social='Marta Ruiz',
+            email='marta@example.com', celular='0981000000', usuario=self.usuario
+        )
+        self.hijos = [
+            Alumno.objects.create(
+                numero_tarjeta=f'T80{i}', nombre=f'Hijo{i}', apellido='Ruiz', ci=f'CIA80{i}',
+                fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('50000'),
+                limite_consumo=Decimal('20000'), padre_tutor=self.padre
+            )
+            for i in range(3)
+        ]
+
+    def test_consultas_fijas(self):
+        for hijo in self.hijos:
+            for _ in range(7):
+                debitar_alumno(hijo.id, Decimal('1000'))
+        registrar_consumo(self.hijos[0].id, Decimal('3000'), Decimal('20000'))
+
+        with self.assertNumQueries(2):
+            resumen = construir_resumen(self.padre.pk)
+
+        self.assertEqual(len(resumen['hijos']), 3)
+        primero = resumen['hijos'][0]
+        self.assertEqual(primero['saldo'], '43000.00')
+        self.assertEqual((primero['consumo_hoy'], primero['disponible_hoy']), ('3000.00', '17000.00'))
+        self.assertEqual(len(primero['movimientos_recientes']), 5)
+        self.assertEqual(resumen['hijos'][1]['consumo_hoy'], '0.00')
+
+    def test_cache_e_invalidacion_por_cambio_de_saldo(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio,
+        }}):
+            resumen_padre(self.padre.pk)
+            with self.assertNumQueries(0):
+                resumen_padre(self.padre.pk)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                acreditar_alumno(self.hijos[1].id, Decimal('5000'))
+            self.assertIsNone(cache.get(clave_cache(self.padre.pk)))
+
+            self.assertEqual(resumen_padre(self.padre.pk)['hijos'][1]['saldo'], '55000.00')
+
+    def test_sin_cache_compartida_no_cachea(self):
+        # Con la caché local de cada proceso otro worker no podría invalidarlo
+        resumen_padre(self.padre.pk)
+        self.assertIsNone(cache.get(clave_cache(self.padre.pk)))
+
+        acreditar_alumno(self.hijos[1].id, Decimal('5000'))
+        with self.assertNumQueries(2):
+            self.assertEqual(resumen_padre(self.padre.pk)['hijos'][1]['saldo'], '55000.00')
+
+    def test_api(self):
+        for _ in range(3):
+            debitar_alumno(self.hijos[0].id, Decimal('500'))
+        self.client.force_login(self.usuario)
+
+        respuesta = self.client.get(reverse('alumnos:api_resumen_padre'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([h['nombre'] for h in respuesta.json()['hijos']], ['Hijo0', 'Hijo1', 'Hijo2'])
+
+        url = reverse('alumnos:api_movimientos_alumno', args=[self.hijos[0].id])
+        pagina = self.client.get(url, {'cantidad': 2}).json()
+        self.assertEqual(len(pagina['results']), 2)
+        siguiente = self.client.get(pagina['next']).json()
+        self.assertEqual(len(siguiente['results']), 1)
+        self.assertIsNone(siguiente['next'])
+        self.assertEqual(len({m['id'] for m in pagina['results'] + siguiente['results']}), 3)
+
+        ajeno = Alumno.objects.create(numero_tarjeta='T899', nombre='Ajeno', apellido='X', ci='CIA899',
+                                      fecha_nacimiento=date(2015, 1, 1))
+        url = reverse('alumnos:api_movimientos_alumno', args=[ajeno.id])
+        self.assertEqual(self.client.get(url).json()['results'], [])
+
+    def test_usuario_sin_padre(self):
+        self.client.force_login(User.objects.create_user(username='cajero_portal', password='testpass123',
+                                                         tipo_usuario='cajero'))
+        self.assertEqual(self.client.get(reverse('alumnos:api_resumen_padre')).status_code, 403)
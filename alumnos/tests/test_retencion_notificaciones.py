@@ -0,0 +1,71 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from alumnos.models import Notificacion, NotificacionArchivada
+from alumnos.retencion_notificaciones import eliminar_leidas, marcar_todas_leidas
+
+User = get_user_model()
+
+
+class RetencionNotificacionesTestCase(TestCase):
+    """Tests de la depuración y las operaciones por lotes de notificaciones"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='padre_retencion', password='testpass123',
+                                                tipo_usuario='padre')
+        self.otro = User.objects.create_user(username='otro_retencion', password='testpass123',
+                                             tipo_usuario='padre')
+
+    def crear(self, cantidad, usuario=None, leida=False, dias=0):
+        notificaciones = Notificacion.objects.bulk_create([
+            Notificacion(usuario=usuario or self.usuario, titulo=f'Aviso {i}', mensaje='...',
+                         tipo='transaccion', leida=leida)
+            for i in range(cantidad)
+        ])
+        if dias:
+            Notificacion.objects.filter(pk__in=[n.pk for n in notificaciones]).update(
+                fecha_creacion=timezone.now() - timedelta(days=dias)
+            )
+
+    def test_marcar_todas_por_lotes(self):
+        self.crear(5)
+        self.crear(2, usuario=self.otro)
+
+        self.assertEqual(marcar_todas_leidas(self.usuario.id, lote=2), 5)
+
+        self.assertFalse(Notificacion.objects.filter(usuario=self.usuario, leida=False).exists())
+        self.assertEqual(Notificacion.objects.filter(usuario=self.otro, leida=False).count(), 2)
+
+    def test_eliminar_leidas_por_lotes(self):
+        self.crear(3, leida=True)
+        self.crear(1)
+
+        self.assertEqual(eliminar_leidas(self.usuario.id, lote=2), 3)
+        self.assertEqual(Notificacion.objects.filter(usuario=self.usuario).count(), 1)
+
+    def test_depurar_respeta_retencion_y_no_leidas(self):
+        self.crear(3, leida=True, dias=100)
+        self.crear(2, leida=False, dias=100)
+        self.crear(1, leida=True, dias=10)
+
+        salida = StringIO()
+        call_command('depurar_notificaciones', '--dias', '30', '--lote', '2', stdout=salida)
+
+        self.assertIn('3 notificaciones leídas eliminadas', salida.getvalue())
+        self.assertEqual(Notificacion.objects.count(), 3)
+        self.assertFalse(NotificacionArchivada.objects.exists())
+
+    def test_archivar(self):
+        self.crear(3, leida=True, dias=100)
+
+        call_command('depurar_notificaciones', '--dias', '30', '--archivar', stdout=StringIO())
+
+        self.assertFalse(Notificacion.objects.exists())
+        archivadas = NotificacionArchivada.objects.filter(usuario=self.usuario)
+        self.assertEqual(archivadas.count(), 3)
+        self.assertTrue(all(n.fecha_creacion < timezone.now() - timedelta(days=99) for n in archivadas))
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from unittest import skipIf
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from alumnos.models import Alumno, MovimientoSaldo
+from alumnos.saldo import acreditar_alumno, debitar_tarjeta
+
+
+def crear_alumno(saldo, numero_tarjeta='T100'):
+    return Alumno.objects.create(
+        numero_tarjeta=numero_tarjeta,
+        nombre='Ana',
+        apellido='Giménez',
+        ci=f'CI{numero_tarjeta}',
+        fecha_nacimiento=date(2015, 1, 1),
+        saldo_tarjeta=saldo
+    )
+
+
+class DebitoTarjetaTestCase(TestCase):
+    """Tests del débito atómico de la tarjeta de cantina"""
+
+    def setUp(self):
+        self.alumno = crear_alumno(Decimal('10000.00'))
+
+    def test_debito_registra_movimiento(self):
+        movimiento = debitar_tarjeta('T100', Decimal('2500'), descripcion='Recreo')
+
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('7500.00'))
+        self.assertEqual(movimiento.tipo, 'compra')
+        self.assertEqual(movimiento.saldo_anterior, Decimal('10000.00'))
+        self.assertEqual(movimiento.saldo_nuevo, Decimal('7500.00'))
+
+    def test_saldo_insuficiente(self):
+        with self.assertRaisesMessage(ValueError, 'Saldo insuficiente'):
+            debitar_tarjeta('T100', Decimal('10000.01'))
+
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('10000.00'))
+        self.assertFalse(MovimientoSaldo.objects.exists())
+
+    def test_tarjeta_inactiva_o_inexistente(self):
+        Alumno.objects.filter(pk=self.alumno.pk).update(activo=False)
+        with self.assertRaisesMessage(ValueError, 'inactiva'):
+            debitar_tarjeta('T100', Decimal('100'))
+        with self.assertRaisesMessage(ValueError, 'no encontrada'):
+            debitar_tarjeta('NO-EXISTE', Decimal('100'))
+
+    def test_una_sentencia_de_debito(self):
+        # savepoint + UPDATE ... RETURNING + INSERT del movimiento + INSERT del evento + release
+        with self.assertNumQueries(5):
+            debitar_tarjeta('T100', Decimal('100'))
+
+    def test_acreditacion(self):
+        movimiento = acreditar_alumno(self.alumno.id, Decimal('5000'), descripcion='Recarga')
+
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('15000.00'))
+        self.assertEqual(movimiento.tipo, 'carga')
+        self.assertEqual(movimiento.saldo_anterior, Decimal('10000.00'))
+        with self.assertRaisesMessage(ValueError, 'mayor a cero'):
+            acreditar_alumno(self.alumno.id, Decimal('0'))
+
+    def test_benchmark_no_deja_rastros(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from alumnos.models import EventoNotificacion, VersionDirectorio
+
+        version = VersionDirectorio.estado()
+        salida = StringIO()
+        call_command('benchmark_debito', '--debitos', '20', stdout=salida)
+
+        self.assertIn('Saldo final: 20000', salida.getvalue())
+        self.assertEqual(list(Alumno.objects.all()), [self.alumno])
+        self.assertFalse(MovimientoSaldo.objects.exists())
+        self.assertFalse(EventoNotificacion.objects.exists())
+        self.assertEqual(VersionDirectorio.estado(), version)
+
+
+class DebitoConcurrenteTestCase(TransactionTestCase):
+    """Muchas cajas cobrando a la misma tarjeta a la vez"""
+
+    @skipIf(connection.vendor == 'sqlite', 'SQLite no admite escrituras concurrentes')
+    def test_saldo_nunca_negativo(self):
+        crear_alumno(Decimal('10000.00'))
+        intentos = 40
+
+        def cobrar(_):
+            try:
+                debitar_tarjeta('T100', Decimal('1000'))
+                return True
+            except ValueError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            exitosos = sum(executor.map(cobrar, range(intentos)))
+
+        alumno = Alumno.objects.get(numero_tarjeta='T100')
+        self.assertEqual(exitosos, 10)
+        self.assertEqual(alumno.saldo_tarjeta, Decimal('0.00'))
+
+        # La cadena de movimientos es consistente: cada saldo_nuevo es el anterior del siguiente
+        movimientos = list(MovimientoSaldo.objects.order_by('-saldo_anterior'))
+        self.assertEqual(len(movimientos), 10)
+        for actual, siguiente in zip(movimientos, movimientos[1:]):
+            self.assertEqual(actual.saldo_nuevo, siguiente.saldo_anterior)
@@ -0,0 +1,67 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from alumnos.difusion import procesar_lote
+from alumnos.models import Alumno, EventoNotificacion, Notificacion, Padre
+from alumnos.saldo import acreditar_alumno, debitar_alumno
+from alumnos.saldo_bajo import barrer_saldos_bajos
+
+User = get_user_model()
+
+
+class BarridoSaldoBajoTestCase(TestCase):
+    """Tests del barrido periódico de saldos bajos"""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='padre_saldo_bajo', password='testpass123',
+                                                tipo_usuario='padre')
+        padre = Padre.objects.create(
+            nombre='Luis', apellido='Ortiz', ci='CI950', ruc='RUC950', razon_social='Luis Ortiz',
+            email='luis@example.com', celular='0981000000', usuario=self.usuario
+        )
+        self.alumnos = [
+            Alumno.objects.create(
+                numero_tarjeta=f'T95{i}', nombre=f'Hijo{i}', apellido='Ortiz', ci=f'CIA95{i}',
+                fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal(saldo), padre_tutor=padre
+            )
+            for i, saldo in enumerate(['1000', '4999', '5000', '20000'])
+        ]
+        Alumno.objects.create(
+            numero_tarjeta='T959', nombre='Inactivo', apellido='Ortiz', ci='CIA959',
+            fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('0'), activo=False
+        )
+
+    def test_un_aviso_por_recarga(self):
+        # savepoint + UPDATE ... RETURNING + INSERT del evento + release
+        with self.assertNumQueries(4):
+            avisados = barrer_saldos_bajos(Decimal('5000'))
+
+        self.assertEqual([pk for pk, _ in avisados], [self.alumnos[0].pk, self.alumnos[1].pk])
+        self.assertEqual(EventoNotificacion.objects.get().datos,
+                         {'alumnos': [[self.alumnos[0].pk, '1000.00'], [self.alumnos[1].pk, '4999.00']]})
+
+        # Ya avisados: un nuevo barrido no repite, aunque sigan gastando
+        debitar_alumno(self.alumnos[0].pk, Decimal('500'))
+        self.assertEqual(barrer_saldos_bajos(Decimal('5000')), [])
+
+        # Una recarga vuelve a habilitar el aviso; una devolución no
+        acreditar_alumno(self.alumnos[0].pk, Decimal('1000'))
+        acreditar_alumno(self.alumnos[1].pk, Decimal('1'), tipo='devolucion')
+        self.assertEqual([pk for pk, _ in barrer_saldos_bajos(Decimal('5000'))], [self.alumnos[0].pk])
+
+    def test_notifica_a_los_padres(self):
+        salida = StringIO()
+        call_command('barrer_saldos_bajos', '--umbral', '5000', stdout=salida)
+        self.assertIn('2 alumnos', salida.getvalue())
+
+        procesar_lote()
+
+        mensajes = sorted(Notificacion.objects.filter(usuario=self.usuario, tipo='saldo_bajo')
+                          .values_list('mensaje', flat=True))
+        self.assertEqual(len(mensajes), 2)
+        self.assertIn('El saldo de Hijo0 es ₲1.000', mensajes[0])
@@ -0,0 +1,102 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from alumnos.difusion import procesar_lote
+from alumnos.models import Alumno, MovimientoSaldo, Notificacion, SolicitudRecarga
+from alumnos.solicitudes import procesar_solicitudes
+
+User = get_user_model()
+
+
+class SolicitudesEnBloqueTestCase(TestCase):
+    """Tests de la aprobación en bloque de solicitudes de recarga"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin_recargas', password='testpass123',
+                                              tipo_usuario='administrador')
+        self.padre = User.objects.create_user(username='padre_recargas', password='testpass123',
+                                              tipo_usuario='padre')
+        self.alumnos = [
+            Alumno.objects.create(
+                numero_tarjeta=f'T50{i}', nombre=f'Hijo{i}', apellido='Pérez', ci=f'CI50{i}',
+                fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('1000')
+            )
+            for i in range(3)
+        ]
+        self.solicitudes = [
+            SolicitudRecarga.objects.create(alumno=alumno, padre=self.padre, monto=Decimal(monto))
+            for alumno, monto in [(self.alumnos[0], 20000), (self.alumnos[1], 15000),
+                                  (self.alumnos[0], 5000), (self.alumnos[2], 7000)]
+        ]
+
+    def test_aprobar_en_bloque(self):
+        resultado = procesar_solicitudes(SolicitudRecarga.objects.filter(estado='pendiente'), self.admin)
+        procesar_lote()
+
+        self.assertEqual(resultado['procesadas'], [s.pk for s in self.solicitudes])
+        for alumno, esperado in zip(self.alumnos, ['26000', '16000', '8000']):
+            alumno.refresh_from_db()
+            self.assertEqual(alumno.saldo_tarjeta, Decimal(esperado))
+
+        movimientos = list(self.alumnos[0].movimientos.order_by('saldo_nuevo'))
+        self.assertEqual([(m.saldo_anterior, m.saldo_nuevo) for m in movimientos],
+                         [(Decimal('1000'), Decimal('21000')), (Decimal('21000'), Decimal('26000'))])
+
+        solicitud = SolicitudRecarga.objects.get(pk=self.solicitudes[0].pk)
+        self.assertEqual(solicitud.estado, 'aprobada')
+        self.assertEqual(solicitud.procesado_por, self.admin)
+        self.assertIsNotNone(solicitud.fecha_procesamiento)
+        self.assertEqual(Notificacion.objects.filter(usuario=self.padre, tipo='solicitud').count(), 4)
+
+    def test_consultas_no_crecen_con_la_cantidad(self):
+        ids = [s.pk for s in self.solicitudes]
+        with self.assertNumQueries(10):
+            procesar_solicitudes(ids[:1], self.admin)
+        with self.assertNumQueries(10):
+            procesar_solicitudes(ids[1:], self.admin)
+
+    def test_rechazar_no_toca_saldos(self):
+        resultado = procesar_solicitudes([self.solicitudes[1].pk], self.admin, aprobar=False,
+                                         observaciones='Comprobante ilegible')
+        procesar_lote()
+
+        self.assertEqual(resultado['procesadas'], [self.solicitudes[1].pk])
+        self.assertFalse(MovimientoSaldo.objects.exists())
+        solicitud = SolicitudRecarga.objects.get(pk=self.solicitudes[1].pk)
+        self.assertEqual(solicitud.estado, 'rechazada')
+        self.assertEqual(solicitud.observaciones, 'Comprobante ilegible')
+        self.assertEqual(Notificacion.objects.get(usuario=self.padre).nivel, 'info')
+
+    def test_procesadas_e_inactivos_se_omiten(self):
+        procesar_solicitudes([self.solicitudes[0].pk], self.admin)
+        Alumno.objects.filter(pk=self.alumnos[2].pk).update(activo=False)
+
+        resultado = procesar_solicitudes([s.pk for s in self.solicitudes], self.admin)
+
+        self.assertEqual(resultado['procesadas'], [self.solicitudes[1].pk, self.solicitudes[2].pk])
+        self.assertEqual(resultado['omitidas'], [self.solicitudes[3].pk])
+        self.alumnos[0].refresh_from_db()
+        self.assertEqual(self.alumnos[0].saldo_tarjeta, Decimal('26000'))
+        self.assertEqual(SolicitudRecarga.objects.get(pk=self.solicitudes[3].pk).estado, 'pendiente')
+
+    def test_admin_no_edita_estado_ni_monto(self):
+        """El formulario del admin no puede aprobar ni cambiar el monto: solo las acciones"""
+        User.objects.create_superuser(username='super_recargas', password='testpass123', email='s@example.com')
+        self.client.login(username='super_recargas', password='testpass123')
+        solicitud = self.solicitudes[0]
+
+        self.client.post(reverse('admin:alumnos_solicitudrecarga_change', args=[solicitud.pk]), {
+            'alumno': solicitud.alumno_id, 'padre': self.padre.pk, 'monto': '999999',
+            'estado': 'aprobada', 'procesado_por': self.admin.pk, 'observaciones': 'editada',
+        })
+
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.observaciones, 'editada')
+        self.assertEqual((solicitud.estado, solicitud.monto, solicitud.procesado_por),
+                         ('pendiente', Decimal('20000'), None))
+        self.alumnos[0].refresh_from_db()
+        self.assertEqual(self.alumnos[0].saldo_tarjeta, Decimal('1000'))
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 
 app_name = 'alumnos'
@@ -10,4 +10,5 @@ urlpatterns = [
     path('<int:pk>/ver/', views.ver_alumno, name='ver'),
     path('saldo/', views.consultar_saldo, name='saldo'),
     path('historial/', views.historial_movimientos, name='historial'),
+    path('api/', include('alumnos.api_urls')),
 ]
@@ -11,4 +11,5 @@ urlpatterns = [
     path('<int:notificacion_id>/eliminar/', views.eliminar_notificacion, name='eliminar'),
     path('eliminar-leidas/', views.eliminar_leidas, name='eliminar_leidas'),
     path('contador-no-leidas/', views.contador_no_leidas, name='contador_no_leidas'),
+    path('stream-no-leidas/', views.stream_no_leidas, name='stream_no_leidas'),
 ]
\ No newline at end of file
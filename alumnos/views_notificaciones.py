@@ -1,10 +1,17 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, Http404
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.utils import timezone
 from django.urls import reverse
 from django.core.paginator import Paginator
 
+from . import contador_notificaciones, retencion_notificaciones
 from .models_notificaciones import Notificacion
 
 @login_required
@@ -34,7 +41,7 @@ def lista_notificaciones(request):
         'notificaciones': notificaciones_paginadas,
         'tipo_actual': tipo,
         'estado_actual': estado,
-        'total_no_leidas': Notificacion.objects.filter(usuario=request.user, leida=False).count()
+        'total_no_leidas': contador_notificaciones.no_leidas(request.user.id)
     }
     
     return render(request, 'alumnos/notificaciones/lista.html', context)
@@ -69,15 +76,9 @@ def marcar_leida(request, notificacion_id):
 @login_required
 def marcar_todas_leidas(request):
     """Vista para marcar todas las notificaciones como leídas"""
-    Notificacion.objects.filter(
-        usuario=request.user, 
-        leida=False
-    ).update(
-        leida=True, 
-        fecha_lectura=timezone.now()
-    )
+    marcadas = retencion_notificaciones.marcar_todas_leidas(request.user.id)
     
-    return JsonResponse({'success': True})
+    return JsonResponse({'success': True, 'marcadas': marcadas})
 
 @login_required
 def eliminar_notificacion(request, notificacion_id):
@@ -92,19 +93,83 @@ def eliminar_notificacion(request, notificacion_id):
 @login_required
 def eliminar_leidas(request):
     """Vista para eliminar todas las notificaciones leídas"""
-    Notificacion.objects.filter(
-        usuario=request.user, 
-        leida=True
-    ).delete()
+    eliminadas = retencion_notificaciones.eliminar_leidas(request.user.id)
     
-    return JsonResponse({'success': True})
+    return JsonResponse({'success': True, 'eliminadas': eliminadas})
 
-@login_required
-def contador_no_leidas(request):
-    """Vista para obtener el contador de notificaciones no leídas vía AJAX"""
-    count = Notificacion.objects.filter(
-        usuario=request.user, 
-        leida=False
-    ).count()
-    
-    return JsonResponse({'count': count})
\ No newline at end of file
+async def _usuario_id(request):
+    """Id del usuario autenticado o None; la sesión se lee fuera del event loop"""
+    return await sync_to_async(lambda: request.user.pk if request.user.is_authenticated else None)()
+
+async def contador_no_leidas(request):
+    """
+    Contador de notificaciones no leídas vía AJAX.
+
+    Con ``?desde=N`` funciona como long-poll: responde cuando el contador
+    deja de ser N o al vencer la espera (``NOTIFICACIONES_LONG_POLL``).
+    La vista es asíncrona y mientras espera solo lee la caché. Sin caché
+    compartida no espera: otro proceso no podría avisar el cambio.
+    """
+    usuario_id = await _usuario_id(request)
+    if usuario_id is None:
+        return redirect_to_login(request.get_full_path())
+
+    desde = request.GET.get('desde')
+    if desde is None or not desde.lstrip('-').isdigit() or not contador_notificaciones.cache_compartida():
+        return JsonResponse({'count': await sync_to_async(contador_notificaciones.no_leidas)(usuario_id)})
+
+    count = await contador_notificaciones.esperar_cambio(
+        usuario_id, int(desde), getattr(settings, 'NOTIFICACIONES_LONG_POLL', 25)
+    )
+    return JsonResponse({'count': count})
+
+def _evento(count):
+    return f'event: no_leidas\ndata: {json.dumps({"count": count})}\n\n'
+
+async def _eventos_no_leidas(usuario_id, duracion, intervalo, compartida):
+    """
+    Emite el contador al conectar y cada vez que cambia; cierra al cumplir
+    ``duracion``. Sin caché compartida emite una vez y el navegador se
+    reconecta tras ``NOTIFICACIONES_SSE_REINTENTO`` milisegundos.
+    """
+    # Reconexión automática del EventSource al cerrar el stream
+    reintento = 3000 if compartida else getattr(settings, 'NOTIFICACIONES_SSE_REINTENTO', 30000)
+    yield f'retry: {reintento}\n\n'
+    conocido = await sync_to_async(contador_notificaciones.no_leidas)(usuario_id)
+    yield _evento(conocido)
+    if not compartida:
+        return
+
+    limite = time.monotonic() + duracion
+    while time.monotonic() < limite:
+        count = await contador_notificaciones.esperar_cambio(
+            usuario_id, conocido, limite - time.monotonic(), intervalo
+        )
+        if count != conocido:
+            conocido = count
+            yield _evento(count)
+
+async def stream_no_leidas(request):
+    """
+    Server-Sent Events con el contador de no leídas.
+
+    La vista es asíncrona: bajo ASGI una conexión abierta no ocupa un hilo.
+    Aun así dura ``NOTIFICACIONES_SSE_DURACION`` segundos y el navegador se
+    reconecta.
+    """
+    usuario_id = await _usuario_id(request)
+    if usuario_id is None:
+        return redirect_to_login(request.get_full_path())
+
+    respuesta = StreamingHttpResponse(
+        _eventos_no_leidas(
+            usuario_id,
+            getattr(settings, 'NOTIFICACIONES_SSE_DURACION', 30),
+            getattr(settings, 'NOTIFICACIONES_SSE_INTERVALO', 1.0),
+            contador_notificaciones.cache_compartida(),
+        ),
+        content_type='text/event-stream',
+    )
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
@@ -0,0 +1,147 @@
+"""
+Búsqueda de texto para productos y alumnos.
+
+Los ``icontains`` con comodín inicial no pueden usar los índices B-tree, así
+que en PostgreSQL la búsqueda se apoya en índices GIN de trigramas
+(``pg_trgm``) sobre ``inmutable_unaccent(lower(campo))``; así "Gonzalez"
+encuentra "González" y los resultados se ordenan por similitud.
+
+En otras bases (SQLite en los tests) se usa una implementación en Python
+con la misma semántica.
+
+El backend se elige con ``BUSQUEDA_BACKEND`` (ruta a la clase); por defecto
+se detecta según el motor de la base.
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, CharField, FloatField, Func, Q, Value, When
+from django.db.models.functions import Greatest, Lower
+from django.utils.module_loading import import_string
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar_texto(texto):
+    """Pasa a minúsculas y quita acentos: 'Jugo Limón' -> 'jugo limon'"""
+    if not texto:
+        return ''
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    """Divide un texto ya normalizado en tokens alfanuméricos"""
+    return [token for token in _SEPARADORES.split(texto) if token]
+
+
+class InmutableUnaccent(Func):
+    """Envoltorio IMMUTABLE de unaccent() creado por core/migrations/0002"""
+    function = 'inmutable_unaccent'
+    output_field = CharField()
+
+
+class Similitud(Func):
+    """similarity(a, b) de pg_trgm"""
+    function = 'SIMILARITY'
+    output_field = FloatField()
+
+
+class SimilarTrigrama(Func):
+    """Operador ``a % b`` de pg_trgm (usa el índice GIN)"""
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class BusquedaBase:
+    """Interfaz de los backends de búsqueda"""
+
+    def buscar(self, queryset, texto, campos):
+        """
+        Filtra ``queryset`` por ``texto`` en ``campos`` y lo ordena por relevancia.
+
+        Cada token del texto debe aparecer en alguno de los campos.
+        Retorna siempre un QuerySet.
+        """
+        raise NotImplementedError
+
+
+class BusquedaTrigramas(BusquedaBase):
+    """Backend PostgreSQL: pg_trgm + unaccent con índices GIN"""
+
+    def _expresion(self, campo):
+        return InmutableUnaccent(Lower(campo))
+
+    def buscar(self, queryset, texto, campos):
+        consulta = normalizar_texto(texto).strip()
+        tokens = tokenizar(consulta)
+        if not tokens:
+            return queryset.none()
+
+        # Cada token debe estar contenido en algún campo (LIKE '%token%' usa el índice)
+        queryset = queryset.alias(
+            **{f'_busqueda_{campo}': self._expresion(campo) for campo in campos}
+        )
+        condicion = Q()
+        for token in tokens:
+            por_campo = Q()
+            for campo in campos:
+                por_campo |= Q(**{f'_busqueda_{campo}__contains': token})
+            condicion &= por_campo
+        queryset = queryset.filter(condicion | self._similar(campos, consulta))
+
+        similitudes = [Similitud(self._expresion(campo), Value(consulta)) for campo in campos]
+        relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+        return queryset.annotate(relevancia=relevancia).order_by('-relevancia', 'pk')
+
+    def _similar(self, campos, consulta):
+        """Coincidencias aproximadas (errores de tipeo) por el operador %"""
+        condicion = Q()
+        for campo in campos:
+            condicion |= Q(SimilarTrigrama(self._expresion(campo), Value(consulta)))
+        return condicion
+
+
+class BusquedaPython(BusquedaBase):
+    """Backend genérico: filtra y ordena en Python (SQLite / tests)"""
+
+    def buscar(self, queryset, texto, campos):
+        consulta = normalizar_texto(texto).strip()
+        tokens = tokenizar(consulta)
+        if not tokens:
+            return queryset.none()
+
+        puntajes = {}
+        for fila in queryset.values('pk', *campos):
+            valores = [normalizar_texto(str(fila[campo] or '')) for campo in campos]
+            if not all(any(token in valor for valor in valores) for token in tokens):
+                continue
+            puntajes[fila['pk']] = max(SequenceMatcher(None, consulta, valor).ratio() for valor in valores)
+
+        orden = sorted(puntajes, key=lambda pk: (-puntajes[pk], pk))
+        return queryset.filter(pk__in=orden).annotate(
+            relevancia=Case(
+                *[When(pk=pk, then=Value(puntajes[pk])) for pk in orden],
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        ).order_by('-relevancia', 'pk')
+
+
+def get_backend():
+    """Retorna el backend configurado o el adecuado para la base actual"""
+    ruta = getattr(settings, 'BUSQUEDA_BACKEND', None)
+    if ruta:
+        return import_string(ruta)()
+    if connection.vendor == 'postgresql':
+        return BusquedaTrigramas()
+    return BusquedaPython()
+
+
+def buscar(queryset, texto, campos):
+    """Atajo: ``buscar(Producto.objects.all(), 'gonz', ['nombre', 'codigo'])``"""
+    return get_backend().buscar(queryset, texto, campos)
@@ -0,0 +1,112 @@
+"""
+Claves de idempotencia para las operaciones del POS que mueven dinero.
+
+Cuando la red se corta el POS reintenta la misma solicitud. El cliente
+envía un encabezado ``Idempotency-Key`` (un UUID por cobro) y los
+reintentos con la misma clave reciben la primera respuesta exitosa sin
+volver a ejecutar la vista:
+
+1. La clave se reserva con un INSERT en estado ``pendiente``, en su propia
+   transacción corta, sobre el índice único (usuario, endpoint, clave).
+2. La vista se ejecuta fuera de cualquier transacción externa, con sus
+   propias transacciones (p.ej. los bloques de ``procesar_lote``), así los
+   bloqueos que toma no se extienden por tener clave.
+3. La respuesta exitosa se guarda con un UPDATE de la reserva.
+
+Un reintento que llega mientras la primera solicitud sigue pendiente
+recibe 409 y debe volver a intentar más tarde. Las respuestas con error
+no se guardan (la reserva se borra) y el reintento vuelve a ejecutarse.
+Si el proceso muere a mitad de la vista la clave queda pendiente hasta
+vencer: se prefiere no responder a arriesgar un cobro duplicado.
+
+Las claves vencen a las ``IDEMPOTENCIA_TTL`` segundos (por defecto 24 h) y
+se purgan con ``manage.py purgar_claves_idempotencia``.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import ClaveIdempotencia
+
+ENCABEZADO = 'Idempotency-Key'
+LARGO_MAXIMO = 64
+
+
+def _respuesta_guardada(registro):
+    respuesta = HttpResponse(registro.respuesta, status=registro.estado_http,
+                             content_type='application/json')
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def _reproducir(registro, huella):
+    if registro is not None and registro.huella != huella:
+        return JsonResponse(
+            {'error': 'La clave de idempotencia ya se usó con otra solicitud'}, status=422
+        )
+    if registro is None or registro.estado == 'pendiente':
+        return JsonResponse(
+            {'error': 'La solicitud con esta clave todavía se está procesando; reintente'}, status=409
+        )
+    return _respuesta_guardada(registro)
+
+
+def idempotente(vista):
+    """
+    Decorador para vistas JSON que no deben ejecutarse dos veces.
+
+    Sin encabezado ``Idempotency-Key`` la vista se ejecuta como siempre.
+    """
+    endpoint = f'{vista.__module__}.{vista.__name__}'[-100:]
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        clave = request.headers.get(ENCABEZADO, '').strip()
+        if not clave:
+            return vista(request, *args, **kwargs)
+        if len(clave) > LARGO_MAXIMO:
+            return JsonResponse({'error': f'{ENCABEZADO} admite hasta {LARGO_MAXIMO} caracteres'}, status=400)
+
+        huella = hashlib.sha256(request.body).hexdigest()
+        filtro = {'usuario_id': request.user.pk, 'endpoint': endpoint, 'clave': clave}
+        ahora = timezone.now()
+
+        registro = ClaveIdempotencia.objects.filter(**filtro).first()
+        if registro is not None:
+            if registro.expira > ahora:
+                return _reproducir(registro, huella)
+            registro.delete()
+
+        ttl = getattr(settings, 'IDEMPOTENCIA_TTL', 24 * 60 * 60)
+        try:
+            with transaction.atomic():
+                registro = ClaveIdempotencia.objects.create(
+                    huella=huella, estado='pendiente', expira=ahora + timedelta(seconds=ttl), **filtro
+                )
+        except IntegrityError:
+            # Otro reintento con la misma clave se adelantó
+            return _reproducir(ClaveIdempotencia.objects.filter(**filtro).first(), huella)
+
+        try:
+            respuesta = vista(request, *args, **kwargs)
+        except BaseException:
+            registro.delete()
+            raise
+        if not 200 <= respuesta.status_code < 300:
+            registro.delete()
+            return respuesta
+
+        ClaveIdempotencia.objects.filter(pk=registro.pk).update(
+            estado='completada',
+            estado_http=respuesta.status_code,
+            respuesta=respuesta.content.decode(respuesta.charset),
+            expira=timezone.now() + timedelta(seconds=ttl),
+        )
+        return respuesta
+
+    return envoltura
@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from alumnos.models import Alumno
+from core.busqueda import get_backend
+from productos.models import Categoria, Producto
+
+NOMBRES = ['María', 'José', 'Andrés', 'Sofía', 'Lucía', 'Matías', 'Ramón', 'Inés', 'Tomás', 'Belén']
+APELLIDOS = ['González', 'Benítez', 'Martínez', 'Giménez', 'Núñez', 'Ramírez', 'Fernández', 'Báez']
+PRODUCTOS = ['Empanada', 'Chipá', 'Sándwich', 'Jugo', 'Galletita', 'Alfajor', 'Pizza', 'Gaseosa']
+SABORES = ['de carne', 'de pollo', 'de jamón', 'de limón', 'de frutilla', 'mixto', 'especial']
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda con icontains contra el backend de búsqueda configurado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=50_000)
+        parser.add_argument('--alumnos', type=int, default=10_000)
+        parser.add_argument('--repeticiones', type=int, default=30)
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        self.stdout.write(f'Backend: {backend.__class__.__name__} ({connection.vendor})')
+
+        # Los datos de prueba se descartan al final
+        with transaction.atomic():
+            self._crear_datos(options['productos'], options['alumnos'])
+
+            casos = [
+                ('productos', Producto.objects.all(), ['nombre', 'codigo'], ['empanada', 'sandw', 'B0012']),
+                ('alumnos', Alumno.objects.all(), ['nombre', 'apellido', 'ci', 'numero_tarjeta'],
+                 ['gonzalez', 'nunez', 'maria gim']),
+            ]
+            self.stdout.write('modelo    | consulta   | icontains p50/p95 (ms) | backend p50/p95 (ms)')
+            self.stdout.write('-' * 76)
+            for modelo, queryset, campos, consultas in casos:
+                for consulta in consultas:
+                    base = self._medir(lambda: list(self._icontains(queryset, consulta, campos)[:20]),
+                                       options['repeticiones'])
+                    nuevo = self._medir(lambda: list(backend.buscar(queryset, consulta, campos)[:20]),
+                                        options['repeticiones'])
+                    self.stdout.write(
+                        f'{modelo:9s} | {consulta:10s} | {base[0]:10.2f} / {base[1]:8.2f} | '
+                        f'{nuevo[0]:8.2f} / {nuevo[1]:8.2f}'
+                    )
+
+            transaction.set_rollback(True)
+
+    def _icontains(self, queryset, consulta, campos):
+        condicion = Q()
+        for campo in campos:
+            condicion |= Q(**{f'{campo}__icontains': consulta})
+        return queryset.filter(condicion)
+
+    def _medir(self, funcion, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), statistics.quantiles(tiempos, n=20)[-1]
+
+    def _crear_datos(self, cantidad_productos, cantidad_alumnos):
+        aleatorio = random.Random(42)
+        categoria = Categoria.objects.create(nombre='Benchmark búsqueda')
+        Producto.objects.bulk_create([
+            Producto(
+                codigo=f'B{i:07d}',
+                nombre=f'{aleatorio.choice(PRODUCTOS)} {aleatorio.choice(SABORES)} {i}',
+                categoria=categoria,
+                precio=Decimal('1000'),
+            )
+            for i in range(cantidad_productos)
+        ], batch_size=5000)
+        Alumno.objects.bulk_create([
+            Alumno(
+                numero_tarjeta=f'BT{i:07d}',
+                ci=f'BCI{i:07d}',
+                nombre=aleatorio.choice(NOMBRES),
+                apellido=f'{aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}',
+                fecha_nacimiento=date(2015, 1, 1),
+            )
+            for i in range(cantidad_alumnos)
+        ], batch_size=5000)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE productos_producto')
+                cursor.execute('ANALYZE alumnos_alumno')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ClaveIdempotencia
+
+
+class Command(BaseCommand):
+    help = 'Elimina en lotes las claves de idempotencia vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Claves a eliminar por sentencia')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ahora = timezone.now()
+        vencidas = ClaveIdempotencia.objects.filter(expira__lte=ahora).order_by('expira')
+
+        # Lotes acotados: cada DELETE es corto y no bloquea el cobro
+        total = 0
+        while True:
+            ids = list(vencidas.values_list('id', flat=True)[:lote])
+            if not ids:
+                break
+            eliminadas, _ = ClaveIdempotencia.objects.filter(id__in=ids).delete()
+            total += eliminadas
+
+        self.stdout.write(self.style.SUCCESS(f'{total} claves de idempotencia eliminadas'))
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def crear_extensiones(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() es STABLE; los índices por expresión requieren una función IMMUTABLE
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION inmutable_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+
+
+def eliminar_funcion(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP FUNCTION IF EXISTS inmutable_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_extensiones, eliminar_funcion),
+    ]
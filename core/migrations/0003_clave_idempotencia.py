@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0002_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64)),
+                ('endpoint', models.CharField(max_length=100)),
+                ('huella', models.CharField(help_text='SHA-256 del cuerpo de la solicitud', max_length=64)),
+                ('estado_http', models.PositiveSmallIntegerField()),
+                ('respuesta', models.TextField()),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Clave de idempotencia',
+                'verbose_name_plural': 'Claves de idempotencia',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='claveidempotencia',
+            constraint=models.UniqueConstraint(fields=('usuario', 'endpoint', 'clave'), name='core_idempotencia_clave_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claveidempotencia',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('completada', 'Completada')], default='completada', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='claveidempotencia',
+            name='estado_http',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='claveidempotencia',
+            name='respuesta',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.conf import settings
+from django.db import connection, models
 
 class ConfiguracionSistema(models.Model):
     """Modelo básico para pruebas"""
@@ -12,3 +13,85 @@ class ConfiguracionSistema(models.Model):
     
     def __str__(self):
         return self.clave
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta ya entregada para una clave de idempotencia.
+
+    El POS envía el encabezado ``Idempotency-Key`` al cobrar o recargar; si
+    reintenta con la misma clave se devuelve esta respuesta en lugar de
+    ejecutar de nuevo la operación (ver ``core.idempotencia``). Mientras la
+    vista se ejecuta la clave queda reservada en estado ``pendiente``.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('completada', 'Completada'),
+    ]
+
+    clave = models.CharField(max_length=64)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    endpoint = models.CharField(max_length=100)
+    huella = models.CharField(max_length=64, help_text='SHA-256 del cuerpo de la solicitud')
+    estado = models.CharField(max_length=10, choices=ESTADOS, default='completada')
+    estado_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    respuesta = models.TextField(blank=True)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Clave de idempotencia'
+        verbose_name_plural = 'Claves de idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'endpoint', 'clave'], name='core_idempotencia_clave_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.endpoint} {self.clave}'
+
+
+class ContadorVersion(models.Model):
+    """
+    Contador de versión de fila única (pk=1) para sincronizar datos con el POS.
+
+    ``siguiente()`` incrementa el contador dentro de la transacción en curso
+    y retorna el nuevo valor, con el que se estampan las filas modificadas.
+    La fila del contador queda bloqueada hasta el commit, así que las
+    versiones se confirman en orden: quien leyó la versión N ya puede ver
+    todas las filas estampadas con versiones <= N. Por eso el incremento y
+    la escritura de la fila estampada deben ir en la misma transacción; los
+    modelos versionados envuelven ``save()`` en ``transaction.atomic()``
+    porque en autocommit el pre_save se confirmaría antes que la fila.
+
+    ``ultima_eliminacion`` registra la versión del último borrado físico;
+    un cliente sincronizado antes de esa versión necesita la copia completa.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    ultima_eliminacion = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def actual(cls):
+        """Retorna la versión vigente (0 si aún no hubo cambios)"""
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def estado(cls):
+        """Retorna (version, ultima_eliminacion) en una consulta"""
+        return cls.objects.filter(pk=1).values_list('version', 'ultima_eliminacion').first() or (0, 0)
+
+    @classmethod
+    def siguiente(cls, eliminacion=False):
+        """Incrementa la versión en una sola sentencia y retorna el nuevo valor"""
+        tabla = connection.ops.quote_name(cls._meta.db_table)
+        eliminada = ', ultima_eliminacion = version + 1' if eliminacion else ''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {tabla} SET version = version + 1{eliminada} WHERE id = 1 RETURNING version"
+            )
+            fila = cursor.fetchone()
+        if fila:
+            return fila[0]
+        cls.objects.get_or_create(pk=1)
+        return cls.siguiente(eliminacion)
@@ -1,3 +1,84 @@
+from datetime import date
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from alumnos.models import Alumno
+from core.busqueda import BusquedaPython, BusquedaTrigramas
+from productos.models import Categoria, Producto
+
+
+class BusquedaMixin:
+    """Casos comunes a todos los backends de búsqueda"""
+
+    backend = None
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Snacks')
+        Producto.objects.create(codigo='EMP001', nombre='Empanada de Carne', categoria=categoria,
+                                precio=Decimal('5000'), stock_actual=10)
+        Producto.objects.create(codigo='CHI002', nombre='Chipá Guasu', categoria=categoria,
+                                precio=Decimal('4000'), stock_actual=10)
+        self.maria = Alumno.objects.create(numero_tarjeta='T001', nombre='María', apellido='González',
+                                           ci='1234567', fecha_nacimiento=date(2015, 3, 1))
+        Alumno.objects.create(numero_tarjeta='T002', nombre='Pedro', apellido='Benítez',
+                              ci='7654321', fecha_nacimiento=date(2014, 5, 2))
+
+    def test_ignora_acentos(self):
+        resultados = self.backend.buscar(Alumno.objects.all(), 'gonzalez', ['nombre', 'apellido'])
+        self.assertEqual(list(resultados), [self.maria])
+
+    def test_todos_los_tokens(self):
+        resultados = self.backend.buscar(Alumno.objects.all(), 'maria gonz', ['nombre', 'apellido'])
+        self.assertEqual(list(resultados), [self.maria])
+
+    def test_subcadena_en_codigo(self):
+        resultados = self.backend.buscar(Producto.objects.all(), 'p001', ['nombre', 'codigo'])
+        self.assertEqual([p.codigo for p in resultados], ['EMP001'])
+
+    def test_consulta_vacia(self):
+        self.assertFalse(self.backend.buscar(Producto.objects.all(), '  ', ['nombre']).exists())
+
+
+class BusquedaPythonTestCase(BusquedaMixin, TestCase):
+    backend = BusquedaPython()
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Requiere pg_trgm/unaccent')
+class BusquedaTrigramasTestCase(BusquedaMixin, TestCase):
+    backend = BusquedaTrigramas()
+
+    def test_tolera_errores_de_tipeo(self):
+        resultados = self.backend.buscar(Producto.objects.all(), 'empanda', ['nombre', 'codigo'])
+        self.assertEqual([p.codigo for p in resultados][:1], ['EMP001'])
+
+
+class PurgaIdempotenciaTestCase(TestCase):
+    """El barrido elimina solo las claves vencidas"""
+
+    def test_purga_en_lotes(self):
+        from datetime import timedelta
+        from io import StringIO
+
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+        from django.utils import timezone
+
+        from core.models import ClaveIdempotencia
+
+        usuario = get_user_model().objects.create_user(username='cajero_purga', password='x')
+        ahora = timezone.now()
+        ClaveIdempotencia.objects.bulk_create([
+            ClaveIdempotencia(clave=f'k{i}', usuario=usuario, endpoint='ventas.procesar_venta',
+                              huella='h', estado_http=200, respuesta='{}',
+                              expira=ahora + timedelta(hours=-1 if i < 7 else 1))
+            for i in range(10)
+        ])
+
+        salida = StringIO()
+        call_command('purgar_claves_idempotencia', lote=3, stdout=salida)
+
+        self.assertIn('7 claves', salida.getvalue())
+        self.assertEqual(ClaveIdempotencia.objects.count(), 3)
@@ -35,15 +35,12 @@ def home(request):
         except:
             context['productos_activos'] = 0
         
-        # Estadísticas de Ventas (solo del día actual)
+        # Estadísticas de Ventas (solo del día actual, desde el ReporteCaja)
         try:
-            Venta = apps.get_model('ventas', 'Venta')
-            hoy = timezone.now().date()
-            ventas_hoy = Venta.objects.filter(fecha__date=hoy)
-            context['ventas_hoy'] = ventas_hoy.count()
-            context['total_recaudado'] = ventas_hoy.aggregate(
-                total=Sum('total')
-            )['total'] or 0
+            ReporteCaja = apps.get_model('ventas', 'ReporteCaja')
+            resumen = ReporteCaja.resumen_del_dia()
+            context['ventas_hoy'] = resumen['ventas']
+            context['total_recaudado'] = resumen['monto']
         except:
             context['ventas_hoy'] = 0
             context['total_recaudado'] = 0
@@ -53,9 +50,6 @@ def home(request):
         except:
             context['total_productos'] = 0
         
-        # Ventas del día (placeholder por ahora)
-        context['ventas_hoy'] = 0  # TODO: implementar cuando esté el módulo de ventas
-        
     except Exception as e:
         # En caso de error, usar valores por defecto
         context.update({
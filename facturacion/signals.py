@@ -8,24 +8,22 @@ def crear_factura_automatica(sender, instance, created, **kwargs):
     """
     Crea automáticamente una factura cuando se guarda una venta.
     """
-    if created and instance.estado == 'completada' and instance.cliente:
-        cliente = instance.cliente
+    if created and instance.estado == 'completada' and instance.alumno:
+        cliente = instance.alumno
         
         # Determinar la razón social
-        if hasattr(cliente, 'padre') and cliente.padre:
-            razon_social = cliente.padre.nombre
-            ruc = getattr(cliente.padre, 'ruc', '')
+        if cliente.padre_tutor:
+            razon_social = cliente.padre_tutor.razon_social
+            ruc = cliente.padre_tutor.ruc
         else:
             razon_social = f"{cliente.nombre} {cliente.apellido}"
             ruc = ""
         
         Factura.objects.create(
             venta=instance,
-            numero_factura=f"F{instance.numero_venta}",
-            fecha=instance.fecha,
+            numero=f"F{instance.numero_venta}",
+            fecha_emision=instance.fecha,
             razon_social=razon_social,
             ruc=ruc,
-            subtotal=instance.subtotal,
-            total=instance.total,
-            estado='emitida'
+            total=instance.total
         )
@@ -8,6 +8,7 @@ urlpatterns = [
     path('accounts/', include('django.contrib.auth.urls')),  # URLs de autenticación
     path('', include('core.urls')),
     path('alumnos/', include('alumnos.urls')),
+    path('notificaciones/', include('alumnos.urls_notificaciones')),
     path('productos/', include('productos.urls')),
     path('ventas/', include('ventas.urls')),
     path('reportes/', include('reportes.urls')),
@@ -0,0 +1,224 @@
+"""
+Alertas de stock por cruce de nivel.
+
+Cada producto está en un nivel según su stock y su ``stock_minimo``:
+
+* ``ok``: por encima del mínimo.
+* ``reorden``: en el mínimo o por debajo.
+* ``bajo``: en la mitad del mínimo o por debajo.
+* ``agotado``: sin stock.
+
+Una alerta se emite solo cuando el producto cruza hacia un nivel peor, no
+en cada movimiento: 500 ventas del mismo producto en un recreo generan a
+lo sumo una alerta por nivel cruzado. ``evaluar`` se llama después del
+commit del cobro, de la anulación y de los movimientos manuales:
+
+1. Bloquea las filas de ``EstadoStock`` de los productos y recién
+   entonces lee su stock actual de la base. Los hooks de dos ventas
+   concurrentes corren en el orden de sus commits, no en el del stock: si
+   usaran el stock capturado al vender, el último en correr podría dejar
+   un nivel viejo. Con el bloqueo, el que escribe último leyó el stock
+   más reciente.
+2. Calcula el nivel y el porcentaje sobre el mínimo (tope 100) y hace un
+   upsert sobre ``EstadoStock`` que solo modifica las filas distintas y
+   las devuelve con RETURNING; ``fecha_cambio`` se mueve solo cuando
+   cambia el nivel, así dos cajas que cruzan a la vez no emiten dos
+   alertas. Por encima del mínimo el porcentaje es siempre 100, así que
+   solo se escribe por debajo del mínimo.
+3. Los cruces hacia un nivel peor que el último alertado, o fuera de la
+   ventana ``STOCK_ALERTA_VENTANA`` (segundos), se publican en la bandeja
+   de salida con un único ``bulk_create``. Dentro de la ventana, una
+   reposición seguida de otra caída al mismo nivel no repite el aviso.
+
+No hay atajo en caché para el último nivel conocido: con la caché local
+de cada proceso, un nivel desactualizado salteaba el upsert.
+
+Cada escritura descarta el tablero cacheado (``productos.tablero_stock``).
+``sincronizar`` recalcula el estado de todo el catálogo sin alertar.
+
+Los destinatarios (personal y usuarios con permiso ``change_producto``)
+se cachean si la caché es compartida (``cache_compartida()``): los lee el
+worker de notificaciones y ``productos.signals`` descarta la lista desde
+el proceso web cuando cambian los usuarios, sus grupos o los permisos de
+los grupos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from alumnos.contador_notificaciones import cache_compartida
+
+from .models import EstadoStock, Producto
+
+ORDEN = {'ok': 0, 'reorden': 1, 'bajo': 2, 'agotado': 3}
+ROLES_PERSONAL = ('administrador', 'supervisor')
+CLAVE_DESTINATARIOS = 'alertas_stock:destinatarios'
+
+MENSAJES = {
+    'reorden': ('info', 'Punto de reorden: {nombre} ha alcanzado el nivel mínimo de stock ({stock}).'),
+    'bajo': ('warning', 'Stock crítico: {nombre} está por debajo del 50% del mínimo requerido ({stock}).'),
+    'agotado': ('error', '¡URGENTE! El producto {nombre} se ha agotado.'),
+}
+
+
+def nivel_de(stock, minimo):
+    if stock <= 0:
+        return 'agotado'
+    if stock * 2 <= minimo:
+        return 'bajo'
+    if stock <= minimo:
+        return 'reorden'
+    return 'ok'
+
+
+def porcentaje_de(stock, minimo):
+    """Stock sobre el mínimo, en porcentaje con un decimal y como máximo 100"""
+    if stock <= 0:
+        return 0.0
+    if minimo <= 0:
+        return 100.0
+    return min(round(stock * 100 / minimo, 1), 100.0)
+
+
+def destinatarios():
+    """Ids de los usuarios que reciben alertas de stock (cacheado si la caché es compartida)"""
+    compartida = cache_compartida()
+    ids = cache.get(CLAVE_DESTINATARIOS) if compartida else None
+    if ids is None:
+        ids = sorted(set(get_user_model().objects.filter(
+            Q(is_superuser=True) | Q(tipo_usuario__in=ROLES_PERSONAL)
+            | Q(groups__permissions__codename='change_producto'),
+            is_active=True,
+        ).values_list('pk', flat=True)))
+        if compartida:
+            cache.set(CLAVE_DESTINATARIOS, ids, getattr(settings, 'STOCK_ALERTA_DESTINATARIOS_TTL', 3600))
+    return ids
+
+
+def invalidar_destinatarios():
+    cache.delete(CLAVE_DESTINATARIOS)
+
+
+def _registrar_cambios(estados, ahora):
+    """
+    Upsert de ``{producto_id: (nivel, porcentaje)}``; retorna solo las filas
+    que cambiaron, con ``fecha_cambio`` (igual a ``ahora`` si cambió el nivel).
+    """
+    tabla = connection.ops.quote_name(EstadoStock._meta.db_table)
+    valores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(estados))
+    momento = connection.ops.adapt_datetimefield_value(ahora)
+    parametros = [
+        valor for producto_id, (nivel, porcentaje) in sorted(estados.items())
+        for valor in (producto_id, nivel, porcentaje, momento, '')
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (producto_id, nivel, porcentaje, fecha_cambio, nivel_alertado) VALUES {valores} "
+            f"ON CONFLICT (producto_id) DO UPDATE "
+            f"SET nivel = EXCLUDED.nivel, porcentaje = EXCLUDED.porcentaje, "
+            f"fecha_cambio = CASE WHEN {tabla}.nivel <> EXCLUDED.nivel "
+            f"THEN EXCLUDED.fecha_cambio ELSE {tabla}.fecha_cambio END "
+            f"WHERE {tabla}.nivel <> EXCLUDED.nivel OR {tabla}.porcentaje <> EXCLUDED.porcentaje "
+            f"RETURNING producto_id, nivel, fecha_cambio, nivel_alertado, fecha_alerta",
+            parametros
+        )
+        return cursor.fetchall()
+
+
+def _fecha(valor):
+    if connection.vendor == 'sqlite' and valor is not None:
+        return connection.ops.convert_datetimefield_value(valor, None, connection)
+    return valor
+
+
+def evaluar(producto_ids, alertar=True):
+    """
+    Evalúa el stock actual de ``producto_ids`` tras un cambio de stock y
+    publica las alertas de los cruces. Retorna los ids de los productos
+    alertados. Con ``alertar=False`` solo actualiza el estado.
+    """
+    from alumnos.models import EventoNotificacion
+
+    from .tablero_stock import invalidar as invalidar_tablero
+
+    producto_ids = sorted(set(producto_ids))
+    with transaction.atomic():
+        # Primero el bloqueo, después la lectura: ver el punto 1 del módulo
+        list(EstadoStock.objects.select_for_update().filter(pk__in=producto_ids).order_by('pk').values_list('pk'))
+        productos = {
+            pk: (nombre, stock, minimo)
+            for pk, nombre, stock, minimo in Producto.objects.filter(pk__in=producto_ids).values_list(
+                'pk', 'nombre', 'stock_actual', 'stock_minimo'
+            )
+        }
+        if not productos:
+            return []
+        estados = {
+            producto_id: (nivel_de(stock, minimo), porcentaje_de(stock, minimo))
+            for producto_id, (_, stock, minimo) in productos.items()
+        }
+
+        ahora = timezone.now()
+        ventana = ahora - timedelta(seconds=getattr(settings, 'STOCK_ALERTA_VENTANA', 300))
+        filas = _registrar_cambios(estados, ahora)
+
+        alertas = []
+        for producto_id, nivel, fecha_cambio, nivel_alertado, fecha_alerta in filas:
+            # Un cambio de porcentaje dentro del mismo nivel no es un cruce
+            if not alertar or nivel == 'ok' or _fecha(fecha_cambio) != ahora:
+                continue
+            fecha_alerta = _fecha(fecha_alerta)
+            peor = ORDEN[nivel] > ORDEN.get(nivel_alertado or 'ok', 0)
+            if peor or fecha_alerta is None or fecha_alerta < ventana:
+                alertas.append(EstadoStock(producto_id=producto_id, nivel_alertado=nivel, fecha_alerta=ahora))
+
+        if alertas:
+            EstadoStock.objects.bulk_update(alertas, ['nivel_alertado', 'fecha_alerta'])
+            eventos = []
+            for estado in alertas:
+                nombre, stock, _ = productos[estado.producto_id]
+                nivel_notificacion, mensaje = MENSAJES[estado.nivel_alertado]
+                eventos.append(EventoNotificacion(tipo='stock', datos={
+                    'producto_id': estado.producto_id,
+                    'alerta': estado.nivel_alertado,
+                    'stock': stock,
+                    'nivel': nivel_notificacion,
+                    'titulo': f'Alerta de stock - {nombre}',
+                    'mensaje': mensaje.format(nombre=nombre, stock=stock),
+                }))
+            EventoNotificacion.objects.bulk_create(eventos)
+
+    if filas:
+        invalidar_tablero()
+    return [estado.producto_id for estado in alertas]
+
+
+def sincronizar(tamano=1000):
+    """
+    Recalcula el estado de todos los productos activos sin emitir alertas
+    (carga inicial o tras cambios masivos de stock). Retorna cuántos cambiaron.
+    """
+    productos = Producto.objects.filter(activo=True).order_by('pk').values_list(
+        'pk', 'nombre', 'stock_actual', 'stock_minimo'
+    )
+    cambiados, lote = 0, []
+    for producto in productos.iterator(chunk_size=tamano):
+        lote.append(producto)
+        if len(lote) == tamano:
+            cambiados += _sincronizar_lote(lote)
+            lote = []
+    if lote:
+        cambiados += _sincronizar_lote(lote)
+    return cambiados
+
+
+def _sincronizar_lote(productos):
+    estados = {pk: (nivel_de(stock, minimo), porcentaje_de(stock, minimo)) for pk, _, stock, minimo in productos}
+    with transaction.atomic():
+        filas = _registrar_cambios(estados, timezone.now())
+    return len(filas)
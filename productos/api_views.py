@@ -1,7 +1,9 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Count, Q, Sum, F
+from django.db.models import Count
+from core.busqueda import buscar
+from . import tablero_stock
 from .models import Producto, Categoria, MovimientoStock
 from .serializers import (
     ProductoSerializer, CategoriaSerializer,
@@ -25,13 +27,9 @@ class ProductoViewSet(viewsets.ModelViewSet):
         if categoria:
             queryset = queryset.filter(categoria=categoria)
         if estado:
-            queryset = queryset.filter(estado=estado)
+            queryset = queryset.filter(activo=(estado == 'activo'))
         if busqueda:
-            queryset = queryset.filter(
-                Q(nombre__icontains=busqueda) |
-                Q(codigo__icontains=busqueda) |
-                Q(codigo_barras__icontains=busqueda)
-            )
+            queryset = buscar(queryset, busqueda, ['nombre', 'codigo'])
         
         return queryset
 
@@ -69,32 +67,4 @@ def dashboard_stats(request):
     """
     API endpoint para obtener estadísticas del dashboard.
     """
-    total_productos = Producto.objects.count()
-    productos_activos = Producto.objects.filter(estado='activo').count()
-    valor_inventario = Producto.objects.filter(estado='activo').aggregate(
-        total=Sum(F('cantidad') * F('precio_venta'))
-    )['total'] or 0
-    
-    bajo_stock = Producto.objects.filter(
-        cantidad__lte=F('cantidad_minima'),
-        estado='activo'
-    ).values('id', 'nombre', 'cantidad', 'cantidad_minima')[:5]
-    
-    top_vendidos = MovimientoStock.objects.filter(
-        tipo_movimiento='salida'
-    ).values('producto__nombre').annotate(
-        total=Sum('cantidad')
-    ).order_by('-total')[:5]
-    
-    por_categoria = Categoria.objects.annotate(
-        count=Count('productos')
-    ).values('nombre', 'count').order_by('-count')
-    
-    return Response({
-        'total_productos': total_productos,
-        'productos_activos': productos_activos,
-        'valor_inventario': valor_inventario,
-        'bajo_stock': list(bajo_stock),
-        'top_vendidos': list(top_vendidos),
-        'por_categoria': list(por_categoria)
-    })
\ No newline at end of file
+    return Response(tablero_stock.estadisticas())
@@ -3,10 +3,13 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect, render, get_object_or_404
 from django.urls import reverse
 from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from .codigos_barras import asignar_ean13
 from .models import Producto
-from .utils import generate_ean13, is_valid_ean13
+from .utils import is_valid_ean13
 
 @login_required
+@require_POST
 def generar_ean13(request, producto_id):
     """
     Vista para generar y asignar un código EAN-13 a un producto.
@@ -16,30 +19,28 @@ def generar_ean13(request, producto_id):
     # Si el producto ya tiene un código EAN-13, no generamos uno nuevo
     if producto.ean13:
         messages.warning(request, 'El producto ya tiene un código EAN-13 asignado.')
-        return redirect('productos:detalle', producto_id=producto.id)
+        return redirect('productos:ver', pk=producto.id)
     
-    # Generar un nuevo código EAN-13
-    nuevo_ean13 = generate_ean13()
-    
-    # Asignar el código al producto
-    producto.ean13 = nuevo_ean13
-    producto.save()
+    try:
+        nuevo_ean13 = asignar_ean13([producto.id]).get(producto.id)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('productos:ver', pk=producto.id)
     
     messages.success(request, f'Código EAN-13 {nuevo_ean13} generado y asignado correctamente.')
-    return redirect('productos:detalle', producto_id=producto.id)
+    return redirect('productos:ver', pk=producto.id)
 
 @login_required
+@require_POST
 def generar_ean13_bulk(request):
     """
     Vista para generar códigos EAN-13 para todos los productos que no lo tengan.
     """
-    productos_sin_ean = Producto.objects.filter(ean13__isnull=True)
-    count = 0
-    
-    for producto in productos_sin_ean:
-        producto.ean13 = generate_ean13()
-        producto.save()
-        count += 1
+    try:
+        count = len(asignar_ean13())
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('productos:lista')
     
     if count > 0:
         messages.success(request, f'Se generaron códigos EAN-13 para {count} productos.')
@@ -78,9 +79,9 @@ def procesar_codigo(request):
             'id': producto.id,
             'nombre': producto.nombre,
             'codigo': producto.codigo,
-            'precio_venta': str(producto.precio_venta),
-            'cantidad': producto.cantidad,
-            'url': producto.get_absolute_url()
+            'precio_venta': str(producto.precio),
+            'cantidad': producto.stock_actual,
+            'url': reverse('productos:ver', args=[producto.id])
         })
     except Producto.DoesNotExist:
         return JsonResponse({'error': 'Producto no encontrado'}, status=404)
@@ -0,0 +1,125 @@
+"""
+Catálogo del POS en memoria del proceso.
+
+La búsqueda del POS se ejecuta en cada tecla. En lugar de consultar la base
+con varios ``icontains`` por tecla, cada worker mantiene una instantánea
+del catálogo activo (textos sin acentos, tokens y nombre de categoría ya
+resueltos) y responde desde memoria.
+
+La instantánea está asociada a ``VersionCatalogo``. Cambiar un dato del
+catálogo de un Producto (``Producto.CAMPOS_CATALOGO``), guardar una
+Categoria o eliminar cualquiera de los dos incrementa la versión (ver
+``productos.signals``), y cada worker la consulta como máximo una vez cada
+``CATALOGO_POS_TTL`` segundos; solo reconstruye cuando la versión cambió.
+
+El stock no forma parte de la instantánea: las ventas lo descuentan con un
+``UPDATE`` sin tocar la versión (incrementarla en cada venta haría
+reconstruir el catálogo a todos los workers), así que quedaría viejo. La
+búsqueda resuelve en memoria el texto y el orden, y lee el stock vigente
+solo de la página devuelta con una consulta por clave primaria. La
+validación real sigue ocurriendo al cobrar.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from core.busqueda import normalizar_texto, tokenizar
+from .models import Producto, VersionCatalogo
+
+
+class CatalogoPOS:
+    """Instantánea del catálogo activo, reconstruida solo si cambia la versión"""
+
+    def __init__(self):
+        self.version = None
+        self.entradas = []
+        self._verificado = 0.0
+        self._lock = threading.Lock()
+
+    def invalidar(self):
+        """Fuerza la verificación de versión en la próxima búsqueda"""
+        self._verificado = 0.0
+
+    def _asegurar_vigente(self):
+        ttl = getattr(settings, 'CATALOGO_POS_TTL', 2)
+        if time.monotonic() - self._verificado < ttl:
+            return
+
+        with self._lock:
+            if time.monotonic() - self._verificado < ttl:
+                return
+            version = VersionCatalogo.actual()
+            if version != self.version:
+                self.entradas = self._construir()
+                self.version = version
+            self._verificado = time.monotonic()
+
+    def _construir(self):
+        productos = Producto.objects.filter(activo=True).select_related('categoria').order_by('nombre')
+
+        entradas = []
+        for producto in productos:
+            nombre = normalizar_texto(producto.nombre)
+            codigo = normalizar_texto(producto.codigo)
+            texto = ' '.join([nombre, codigo, normalizar_texto(producto.descripcion)])
+            entradas.append({
+                'codigo_normalizado': codigo,
+                'tokens_nombre': tokenizar(nombre),
+                'texto': texto,
+                'categoria_id': producto.categoria_id,
+                'datos': {
+                    'id': producto.id,
+                    'codigo': producto.codigo,
+                    'nombre': producto.nombre,
+                    'descripcion': producto.descripcion,
+                    'precio_venta': float(producto.precio),
+                    'categoria': producto.categoria.nombre if producto.categoria else '',
+                    'imagen_url': producto.imagen.url if producto.imagen else None,
+                },
+            })
+        return entradas
+
+    def buscar(self, query='', categoria_id=None, limite=20):
+        """
+        Busca productos con stock por nombre, código o descripción.
+
+        Todos los tokens de la consulta deben aparecer (sin importar acentos
+        ni mayúsculas). Se priorizan el código exacto y los nombres que
+        empiezan con lo buscado.
+        """
+        self._asegurar_vigente()
+
+        tokens = tokenizar(normalizar_texto(query))
+        consulta = ' '.join(tokens)
+        categoria_id = int(categoria_id) if categoria_id else None
+
+        candidatos = []
+        for orden, entrada in enumerate(self.entradas):
+            if categoria_id and entrada['categoria_id'] != categoria_id:
+                continue
+            if not all(token in entrada['texto'] for token in tokens):
+                continue
+
+            if consulta and entrada['codigo_normalizado'] == consulta:
+                rango = 0
+            elif tokens and any(t.startswith(tokens[0]) for t in entrada['tokens_nombre']):
+                rango = 1
+            else:
+                rango = 2
+            candidatos.append((rango, orden, entrada['datos']))
+        candidatos.sort(key=lambda candidato: candidato[:2])
+
+        # Stock vigente solo de la página: una consulta por clave primaria. Los
+        # agotados se quitan de la página sin buscar reemplazos (puede volver
+        # con menos de ``limite``; la búsqueda se repite en cada tecla)
+        pagina = [datos for _, _, datos in candidatos[:limite]]
+        stock = dict(Producto.objects.filter(
+            pk__in=[datos['id'] for datos in pagina], activo=True, stock_actual__gt=0
+        ).values_list('id', 'stock_actual'))
+        return [
+            {**datos, 'cantidad_disponible': float(stock[datos['id']])}
+            for datos in pagina if datos['id'] in stock
+        ]
+
+catalogo_pos = CatalogoPOS()
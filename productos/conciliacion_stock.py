@@ -0,0 +1,37 @@
+"""
+Conciliación del stock contra el libro de ``MovimientoStock``.
+
+El stock esperado de un producto es el ``stock_anterior`` de su primer
+movimiento más la suma de ``stock_nuevo - stock_anterior`` de todos sus
+movimientos. No se suma ``cantidad``: las ventas la guardan con signo, pero
+las salidas y ajustes manuales la guardan positiva. Se calcula para todo el catálogo en una sola consulta
+agrupada; los productos sin movimientos no tienen libro y se omiten.
+``manage.py conciliar_stock`` lista los productos cuyo ``stock_actual``
+se desvió del esperado.
+"""
+from django.db.models import F, OuterRef, Subquery, Sum
+
+from .models import MovimientoStock, Producto
+
+
+def diferencias_stock(producto_ids=None):
+    """
+    Productos cuyo ``stock_actual`` no coincide con el libro, con una sola
+    consulta. Retorna dicts con ``stock_esperado`` y ``diferencia``
+    (actual menos esperado).
+    """
+    apertura = MovimientoStock.objects.filter(producto=OuterRef('pk')).order_by(
+        'fecha_movimiento', 'id'
+    ).values('stock_anterior')[:1]
+    productos = Producto.objects.filter(movimientos__isnull=False)
+    if producto_ids is not None:
+        productos = productos.filter(pk__in=producto_ids)
+    productos = productos.annotate(
+        stock_esperado=Subquery(apertura) + Sum(F('movimientos__stock_nuevo') - F('movimientos__stock_anterior')),
+    ).exclude(stock_esperado=F('stock_actual')).order_by('codigo').values(
+        'id', 'codigo', 'nombre', 'stock_actual', 'stock_esperado'
+    )
+    return [
+        {**producto, 'diferencia': producto['stock_actual'] - producto['stock_esperado']}
+        for producto in productos
+    ]
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.codigos_barras import asignar_ean13, prefijo_por_defecto
+
+
+class Command(BaseCommand):
+    help = 'Asigna códigos EAN-13 únicos a todos los productos que no tienen uno'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', help='Prefijo de empresa GS1 (por defecto EAN13_PREFIJO)')
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo'] or prefijo_por_defecto()
+        inicio = time.perf_counter()
+        try:
+            asignados = asignar_ean13(prefijo=prefijo)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(asignados)} códigos EAN-13 asignados con el prefijo {prefijo} '
+            f'en {time.perf_counter() - inicio:.1f} s'
+        ))
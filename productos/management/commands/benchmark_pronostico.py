@@ -0,0 +1,44 @@
+import statistics
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from productos.pronostico_demanda import calcular
+
+
+class Command(BaseCommand):
+    help = 'Mide el pronóstico vectorizado sobre ventas simuladas (no usa la base)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--dias', type=int, default=730)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        cantidad, dias = options['productos'], options['dias']
+        hoy = timezone.localdate()
+        primer_dia = hoy - timedelta(days=dias)
+
+        # Ventas de lunes a viernes, sin ventas en vacaciones (enero y febrero)
+        azar = np.random.default_rng(7)
+        ventas = azar.poisson(azar.uniform(0.5, 30, size=(cantidad, 1)), size=(cantidad, dias)).astype(np.float64)
+        fechas = [primer_dia + timedelta(days=i) for i in range(dias)]
+        ventas[:, [fecha.weekday() >= 5 or fecha.month <= 2 for fecha in fechas]] = 0
+        stock = azar.integers(0, 500, size=cantidad)
+        stock_minimo = azar.integers(5, 50, size=cantidad)
+        entrega = azar.integers(1, 15, size=cantidad)
+        lote = azar.integers(1, 100, size=cantidad)
+
+        tiempos = []
+        for _ in range(options['repeticiones']):
+            inicio = time.perf_counter()
+            calcular(ventas, primer_dia, hoy, stock, stock_minimo, entrega, lote)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{cantidad} productos × {dias} días: p50 {statistics.median(tiempos):.1f} ms, '
+            f'máximo {max(tiempos):.1f} ms'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from productos.conciliacion_stock import diferencias_stock
+
+
+class Command(BaseCommand):
+    help = 'Compara el stock de cada producto con el libro de movimientos y lista las diferencias'
+
+    def handle(self, *args, **options):
+        diferencias = diferencias_stock()
+        for producto in diferencias:
+            self.stdout.write(
+                f"{producto['codigo']} {producto['nombre']}: actual {producto['stock_actual']}, "
+                f"según movimientos {producto['stock_esperado']} ({producto['diferencia']:+d})"
+            )
+        if diferencias:
+            self.stdout.write(self.style.WARNING(f'{len(diferencias)} productos con diferencias'))
+        else:
+            self.stdout.write(self.style.SUCCESS('El stock coincide con el libro de movimientos'))
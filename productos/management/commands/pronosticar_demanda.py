@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from productos.pronostico_demanda import ALFA, DIAS_HISTORIAL, DIAS_REVISION, METODOS, VENTANA, generar_sugerencias
+
+
+class Command(BaseCommand):
+    help = 'Pronostica la demanda de cada producto y actualiza las sugerencias de reposición'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metodo', choices=METODOS, default='exponencial')
+        parser.add_argument('--dias', type=int, default=DIAS_HISTORIAL, help='Días de historial de ventas')
+        parser.add_argument('--alfa', type=float, default=ALFA, help='Suavizado exponencial (0 a 1)')
+        parser.add_argument('--ventana', type=int, default=VENTANA, help='Días de clases de la media móvil')
+        parser.add_argument('--revision', type=int, default=DIAS_REVISION,
+                            help='Días entre pedidos, además del tiempo de entrega')
+
+    def handle(self, *args, **options):
+        if not 0 < options['alfa'] <= 1:
+            raise CommandError(f'Alfa inválido: {options["alfa"]}')
+        try:
+            resultado = generar_sugerencias(
+                dias_historial=options['dias'], metodo=options['metodo'], alfa=options['alfa'],
+                ventana=options['ventana'], revision=options['revision']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['productos']} productos pronosticados, {resultado['a_pedir']} a reponer "
+            f"(cálculo {resultado['segundos_calculo'] * 1000:.0f} ms, total {resultado['segundos']:.1f} s)"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from productos.alertas_stock import sincronizar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el estado de stock de todos los productos sin emitir alertas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Productos por sentencia')
+
+    def handle(self, *args, **options):
+        cambiados = sincronizar(tamano=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{cambiados} estados de stock actualizados'))
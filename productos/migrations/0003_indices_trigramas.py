@@ -0,0 +1,35 @@
+from django.db import migrations
+
+INDICES = {
+    'productos_producto_nombre_trgm': 'nombre',
+    'productos_producto_codigo_trgm': 'codigo',
+}
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, campo in INDICES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON productos_producto '
+            f'USING gin (inmutable_unaccent(lower({campo})) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_busqueda_trigramas'),
+        ('productos', '0002_versioncatalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_indices_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='version_catalogo',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='versioncatalogo',
+            name='ultima_eliminacion',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_version_catalogo_por_producto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoStock',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estado_stock', serialize=False, to='productos.producto')),
+                ('nivel', models.CharField(choices=[('ok', 'Stock suficiente'), ('reorden', 'Punto de reorden'), ('bajo', 'Stock bajo'), ('agotado', 'Agotado')], default='ok', max_length=10)),
+                ('fecha_cambio', models.DateTimeField()),
+                ('nivel_alertado', models.CharField(blank=True, choices=[('ok', 'Stock suficiente'), ('reorden', 'Punto de reorden'), ('bajo', 'Stock bajo'), ('agotado', 'Agotado')], max_length=10)),
+                ('fecha_alerta', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de Stock',
+                'verbose_name_plural': 'Estados de Stock',
+            },
+        ),
+    ]
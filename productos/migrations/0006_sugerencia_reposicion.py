@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proveedores', '0001_initial'),
+        ('productos', '0005_estado_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SugerenciaReposicion',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sugerencia_reposicion', serialize=False, to='productos.producto')),
+                ('demanda_diaria', models.FloatField(help_text='Unidades por día de clases')),
+                ('dias_cobertura', models.FloatField(blank=True, help_text='Días que cubre el stock actual', null=True)),
+                ('cantidad_sugerida', models.IntegerField(default=0)),
+                ('fecha_calculo', models.DateTimeField()),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sugerencias_reposicion', to='proveedores.proveedor')),
+            ],
+            options={
+                'verbose_name': 'Sugerencia de Reposición',
+                'verbose_name_plural': 'Sugerencias de Reposición',
+                'indexes': [models.Index(fields=['cantidad_sugerida'], name='productos_s_cantida_7f645b_idx')],
+            },
+        ),
+    ]
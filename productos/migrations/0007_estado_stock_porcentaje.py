@@ -0,0 +1,31 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_sugerencia_reposicion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estadostock',
+            name='porcentaje',
+            field=models.FloatField(default=100, help_text='Stock sobre el mínimo, hasta 100'),
+        ),
+        migrations.AlterField(
+            model_name='estadostock',
+            name='fecha_cambio',
+            field=models.DateTimeField(help_text='Último cambio de nivel'),
+        ),
+        migrations.AddIndex(
+            model_name='estadostock',
+            index=models.Index(condition=models.Q(('nivel', 'ok'), _negated=True), fields=['porcentaje'], name='productos_estado_alerta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['tipo', 'fecha_movimiento'], name='productos_m_tipo_ade35b_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0007_estado_stock_porcentaje'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='ean13',
+            field=models.CharField(blank=True, max_length=13, null=True, unique=True, verbose_name='Código EAN-13'),
+        ),
+    ]
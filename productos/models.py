@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+from core.models import ContadorVersion
+
 class Categoria(models.Model):
     """Categoría de productos"""
     nombre = models.CharField(max_length=100, unique=True)
@@ -18,9 +20,15 @@ class Categoria(models.Model):
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        # La versión (estampada en post_save) y la fila se confirman juntas
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class Producto(models.Model):
     """Modelo de producto"""
     codigo = models.CharField(max_length=20, unique=True)
+    ean13 = models.CharField(max_length=13, unique=True, null=True, blank=True, verbose_name='Código EAN-13')
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField(blank=True, null=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name='productos')
@@ -36,6 +44,9 @@ class Producto(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     
+    # Versión del catálogo en la que cambió por última vez (sincronización del POS)
+    version_catalogo = models.PositiveBigIntegerField(default=0, db_index=True, editable=False)
+    
     class Meta:
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
@@ -48,6 +59,59 @@ class Producto(models.Model):
     def __str__(self):
         return f"{self.codigo} - {self.nombre}"
     
+    # Lo que ven la instantánea del POS y la sincronización por deltas: solo
+    # un cambio en estos campos incrementa ``VersionCatalogo``
+    CAMPOS_CATALOGO = ('codigo', 'ean13', 'nombre', 'descripcion', 'categoria_id', 'precio', 'imagen', 'activo')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        producto = super().from_db(db, field_names, values)
+        producto._catalogo_guardado = producto._valores_catalogo()
+        return producto
+    
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        guardado = getattr(self, '_catalogo_guardado', None)
+        if fields is None or guardado is not None:
+            actuales = self._valores_catalogo()
+            recargados = actuales if fields is None else {
+                campo: valor for campo, valor in actuales.items()
+                if campo in fields or campo.removesuffix('_id') in fields
+            }
+            self._catalogo_guardado = {**(guardado or {}), **recargados}
+    
+    def _valores_catalogo(self):
+        # Solo los campos cargados (con ``only()`` los diferidos no se guardan)
+        return {
+            campo: getattr(self.__dict__[campo], 'name', self.__dict__[campo])
+            for campo in self.CAMPOS_CATALOGO if campo in self.__dict__
+        }
+    
+    def cambia_catalogo(self, update_fields=None):
+        """
+        ¿Guardar el producto cambia lo que ven los POS? Un alta o una
+        instancia que no vino de la base cuentan como cambio; un guardado
+        que solo toca stock, mínimos o auditoría, no.
+        """
+        guardado = getattr(self, '_catalogo_guardado', None)
+        if self._state.adding or guardado is None:
+            return True
+        actuales = self._valores_catalogo()
+        campos = [
+            campo for campo in actuales
+            if update_fields is None or campo in update_fields or campo.removesuffix('_id') in update_fields
+        ]
+        return any(actuales[campo] != guardado.get(campo) for campo in campos)
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.cambia_catalogo(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'version_catalogo'}
+        # La versión (estampada en pre_save) y la fila se confirman juntas
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._catalogo_guardado = self._valores_catalogo()
+    
     @property
     def stock_bajo(self):
         return self.stock_actual <= self.stock_minimo
@@ -83,10 +147,49 @@ class MovimientoStock(models.Model):
         verbose_name = 'Movimiento de Stock'
         verbose_name_plural = 'Movimientos de Stock'
         ordering = ['-fecha_movimiento']
+        indexes = [
+            models.Index(fields=['tipo', 'fecha_movimiento']),
+        ]
     
     def __str__(self):
         return f"{self.producto.nombre} - {self.get_tipo_display()} - {self.cantidad}"
 
+class EstadoStock(models.Model):
+    """
+    Último nivel de stock conocido de cada producto (ok, reorden, bajo,
+    agotado) y la última alerta emitida.
+
+    ``productos.alertas_stock`` lo actualiza solo cuando el producto cruza
+    de un nivel a otro o, por debajo del mínimo, cuando cambia su
+    porcentaje; así detecta los cruces sin comparar contra el historial de
+    movimientos, y la API de alertas y el dashboard leen el estado ya
+    calculado en lugar de recorrer el catálogo.
+    """
+    NIVELES = [
+        ('ok', 'Stock suficiente'),
+        ('reorden', 'Punto de reorden'),
+        ('bajo', 'Stock bajo'),
+        ('agotado', 'Agotado'),
+    ]
+
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='estado_stock')
+    nivel = models.CharField(max_length=10, choices=NIVELES, default='ok')
+    porcentaje = models.FloatField(default=100, help_text="Stock sobre el mínimo, hasta 100")
+    fecha_cambio = models.DateTimeField(help_text="Último cambio de nivel")
+    nivel_alertado = models.CharField(max_length=10, choices=NIVELES, blank=True)
+    fecha_alerta = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Estado de Stock'
+        verbose_name_plural = 'Estados de Stock'
+        indexes = [
+            models.Index(fields=['porcentaje'], condition=~models.Q(nivel='ok'), name='productos_estado_alerta_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.get_nivel_display()}"
+
 class ProductoProveedor(models.Model):
     """Relación entre productos y proveedores con información específica"""
     producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='proveedores_info')
@@ -111,3 +214,49 @@ class ProductoProveedor(models.Model):
 
     def __str__(self):
         return f"{self.producto.nombre} - {self.proveedor.nombre}"
+
+
+class SugerenciaReposicion(models.Model):
+    """
+    Última sugerencia de pedido de cada producto, calculada por
+    ``productos.pronostico_demanda`` a partir de las ventas diarias.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='sugerencia_reposicion')
+    proveedor = models.ForeignKey('proveedores.Proveedor', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='sugerencias_reposicion')
+    demanda_diaria = models.FloatField(help_text="Unidades por día de clases")
+    dias_cobertura = models.FloatField(null=True, blank=True, help_text="Días que cubre el stock actual")
+    cantidad_sugerida = models.IntegerField(default=0)
+    fecha_calculo = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Sugerencia de Reposición'
+        verbose_name_plural = 'Sugerencias de Reposición'
+        indexes = [
+            models.Index(fields=['cantidad_sugerida']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.cantidad_sugerida}"
+
+
+class VersionCatalogo(ContadorVersion):
+    """
+    Versión global del catálogo (fila única).
+
+    Se incrementa cuando cambia un dato del catálogo de un Producto
+    (``Producto.CAMPOS_CATALOGO``: un guardado que solo toca el stock no
+    bloquea esta fila única) y cuando se guarda o elimina una Categoria o
+    se elimina un Producto (ver ``productos.signals``); cada Producto guarda en
+    ``version_catalogo`` la versión con la que cambió por última vez. Las
+    cachés por proceso del POS y la sincronización por deltas la comparan
+    para saber qué cambió.
+    """
+
+    class Meta:
+        verbose_name = 'Versión de Catálogo'
+        verbose_name_plural = 'Versión de Catálogo'
+
+    def __str__(self):
+        return f"Catálogo v{self.version}"
@@ -3,6 +3,11 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.contrib import messages
 from django.db import models
+from django.template.loader import render_to_string
+
+from alumnos import contador_notificaciones
+from alumnos.models import Notificacion
+
 from .models import Producto
 
 @login_required
@@ -37,16 +42,17 @@ def marcar_notificacion_leida(request, pk):
 @login_required
 def notificaciones_no_leidas(request):
     """API para obtener el conteo y lista de notificaciones no leídas"""
-    notificaciones = StockNotification.objects.filter(
-        destinatarios=request.user
-    ).select_related('producto')[:5]
+    notificaciones = Notificacion.objects.filter(
+        usuario=request.user, leida=False
+    ).order_by('-fecha_creacion')[:5]
     
     html = render_to_string('productos/partials/notificaciones_dropdown.html', {
         'notificaciones': notificaciones
     }, request=request)
     
+    # El conteo sale del contador en caché, no de un COUNT(*) por pedido
     return JsonResponse({
-        'count': notificaciones.count(),
+        'count': contador_notificaciones.no_leidas(request.user.id),
         'html': html
     })
 
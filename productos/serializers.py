@@ -1,5 +1,5 @@
-from django.db.models import F, ExpressionWrapper, FloatField, Case, When, Value
 from rest_framework import serializers
+from . import tablero_stock
 from .models import Producto, Categoria, MovimientoStock
 
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -15,7 +15,7 @@ class ProductoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = [
-            'id', 'nombre', 'codigo', 'codigo_barras', 'descripcion',
+            'id', 'nombre', 'codigo', 'ean13', 'descripcion',
             'precio_venta', 'precio_compra', 'cantidad', 'cantidad_minima',
             'categoria', 'categoria_nombre', 'estado', 'imagen'
         ]
@@ -41,40 +41,7 @@ class StockAlertsSerializer:
         Obtiene los productos con alertas de stock, incluyendo:
         - Productos con stock bajo del mínimo
         - Productos agotados
-        """
-        productos = Producto.objects.filter(
-            estado='activo'
-        ).annotate(
-            porcentaje_stock=ExpressionWrapper(
-                Case(
-                    When(stock_minimo__gt=0, then=F('cantidad') * 100.0 / F('stock_minimo')),
-                    default=Value(100.0)
-                ),
-                output_field=FloatField()
-            )
-        ).filter(
-            porcentaje_stock__lte=100
-        ).order_by(
-            'porcentaje_stock'
-        )
 
-        return [
-            {
-                'id': prod.id,
-                'nombre': prod.nombre,
-                'codigo': prod.codigo,
-                'categoria': prod.categoria.nombre if prod.categoria else 'Sin Categoría',
-                'cantidad': prod.cantidad,
-                'stock_minimo': prod.stock_minimo,
-                'porcentaje_stock': float(prod.porcentaje_stock),
-                'estado': 'agotado' if prod.cantidad == 0 else (
-                    'critico' if prod.porcentaje_stock <= 25 else 
-                    'bajo' if prod.porcentaje_stock <= 50 else 'advertencia'
-                ),
-                'prioridad': 1 if prod.cantidad == 0 else (
-                    2 if prod.porcentaje_stock <= 25 else
-                    3 if prod.porcentaje_stock <= 50 else 4
-                )
-            }
-            for prod in productos
-        ]
\ No newline at end of file
+        Se leen del estado precalculado en ``EstadoStock`` (ver ``productos.tablero_stock``).
+        """
+        return tablero_stock.alertas()
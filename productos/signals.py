@@ -1,74 +1,84 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils.translation import gettext as _
-from django.db import models
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.db import transaction
 
 User = get_user_model()
 
 @receiver(post_save, sender='productos.MovimientoStock')
 def check_stock_level(sender, instance, created, **kwargs):
     """
-    Signal que verifica el nivel de stock después de cada movimiento
-    y crea notificaciones según sea necesario.
+    Evalúa el nivel de stock después de un movimiento manual. Solo se
+    alerta si el producto cruzó de nivel (ver ``productos.alertas_stock``).
     """
     if not created:
         return
-        
-    # Importación lazy para evitar problemas circulares
-    from .models import Producto
-    from .notifications import StockNotification
-    
-    producto = instance.producto
-    cantidad = producto.cantidad
-    cantidad_minima = producto.cantidad_minima
-    
-    # Determinar el tipo y prioridad de la notificación
-    if cantidad == 0:
-        tipo = 'agotado'
-        prioridad = 'critica'
-        mensaje = _(f'¡URGENTE! El producto {producto.nombre} se ha agotado.')
-    elif cantidad <= cantidad_minima * 0.5:
-        tipo = 'stock_bajo'
-        prioridad = 'alta'
-        mensaje = _(f'Stock crítico: {producto.nombre} está por debajo del 50% del mínimo requerido.')
-    elif cantidad <= cantidad_minima:
-        tipo = 'reorden'
-        prioridad = 'media'
-        mensaje = _(f'Punto de reorden: {producto.nombre} ha alcanzado el nivel mínimo de stock.')
-    else:
-        return  # No se necesita notificación
-    
-    # Crear la notificación solo si existe el modelo
-    try:
-        notificacion = StockNotification.objects.create(
-            producto=producto,
-            tipo=tipo,
-            mensaje=mensaje,
-            prioridad=prioridad
-        )
-        
-        # Asignar destinatarios (usuarios con permisos relevantes)
-        usuarios_notificar = User.objects.filter(
-            is_active=True
-        ).filter(
-            models.Q(is_superuser=True) |
-            models.Q(groups__permissions__codename='change_producto')
-        ).distinct()
-        
-        notificacion.destinatarios.set(usuarios_notificar)
-    except Exception:
-        # Si hay problemas con StockNotification, ignorar por ahora
-        pass
+
+    _evaluar_alertas_al_confirmar(instance.producto_id)
+
+def _evaluar_alertas_al_confirmar(producto_id):
+    from .alertas_stock import evaluar
+
+    # robust: un fallo de las alertas se registra en el log sin afectar al guardado ya confirmado
+    transaction.on_commit(lambda: evaluar([producto_id]), robust=True)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def usuario_modificado(sender, update_fields=None, **kwargs):
+    """Rol, estado o alta/baja de un usuario cambian los destinatarios de las alertas de stock"""
+    from .alertas_stock import invalidar_destinatarios
+
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_destinatarios()
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def permisos_modificados(sender, action, **kwargs):
+    """Los destinatarios también incluyen a quienes tienen ``change_producto`` por grupo"""
+    from .alertas_stock import invalidar_destinatarios
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_destinatarios()
+
+def _invalidar_catalogo_al_confirmar():
+    """La instantánea en memoria del POS se verifica al confirmar la transacción"""
+    from .catalogo import catalogo_pos
+
+    transaction.on_commit(catalogo_pos.invalidar)
+
+@receiver(pre_save, sender='productos.Producto')
+def producto_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Estampa el producto con una nueva versión del catálogo si cambió lo que ven los POS"""
+    from .models import VersionCatalogo
+
+    if instance.cambia_catalogo(update_fields):
+        instance.version_catalogo = VersionCatalogo.siguiente()
 
 @receiver(post_save, sender='productos.Producto')
-def producto_post_save(sender, instance, created, **kwargs):
+def producto_post_save(sender, instance, created, update_fields=None, **kwargs):
     """Signal para después de guardar un producto"""
-    if created:
-        # Crear movimiento de stock inicial si es necesario
-        pass
+    if instance.cambia_catalogo(update_fields):
+        _invalidar_catalogo_al_confirmar()
+    _evaluar_alertas_al_confirmar(instance.pk)
 
 @receiver(post_delete, sender='productos.Producto')
 def producto_post_delete(sender, instance, **kwargs):
-    """Signal para después de eliminar un producto"""
-    pass
\ No newline at end of file
+    """Un borrado obliga a los POS desactualizados a pedir la copia completa"""
+    from .models import VersionCatalogo
+
+    VersionCatalogo.siguiente(eliminacion=True)
+    _invalidar_catalogo_al_confirmar()
+
+@receiver(post_save, sender='productos.Categoria')
+@receiver(post_delete, sender='productos.Categoria')
+def categoria_modificada(sender, instance, **kwargs):
+    """El nombre de categoría forma parte del catálogo del POS"""
+    from .models import Producto, VersionCatalogo
+
+    version = VersionCatalogo.siguiente()
+    if instance.pk is not None:
+        Producto.objects.filter(categoria_id=instance.pk).update(version_catalogo=version)
+    _invalidar_catalogo_al_confirmar()
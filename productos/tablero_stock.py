@@ -0,0 +1,132 @@
+"""
+Alertas de stock y estadísticas del dashboard de administración.
+
+El dashboard consulta ambas cosas cada pocos segundos. En lugar de recorrer
+el catálogo en cada llamada, las alertas se leen de ``EstadoStock`` (que
+``productos.alertas_stock`` mantiene al cambiar el stock), solo las filas
+fuera del nivel ``ok`` por el índice parcial ``productos_estado_alerta_idx``,
+y el listado queda en caché solo si la caché es compartida
+(``cache_compartida()``): ``alertas_stock`` lo descarta cada vez que
+escribe un estado, muchas veces desde otro proceso (el worker de un
+comando, ``sincronizar_estado_stock``). Con la caché local de cada
+proceso esa invalidación no llegaría, así que se lee siempre del índice.
+
+El resto de las cifras (valor del inventario, más vendidos, productos
+por categoría) no dependen del estado: se cachean en cualquier caso y se
+renuevan con ``STOCK_TABLERO_CACHE_TTL``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.utils import timezone
+
+from alumnos.contador_notificaciones import cache_compartida
+
+from .models import Categoria, EstadoStock, MovimientoStock, Producto
+
+CLAVE_ALERTAS = 'tablero_stock:alertas'
+CLAVE_CIFRAS = 'tablero_stock:cifras'
+DIAS_MAS_VENDIDOS = 30
+
+
+def _ttl():
+    return getattr(settings, 'STOCK_TABLERO_CACHE_TTL', 60)
+
+
+def _estado_y_prioridad(stock, porcentaje):
+    if stock <= 0:
+        return 'agotado', 1
+    if porcentaje <= 25:
+        return 'critico', 2
+    if porcentaje <= 50:
+        return 'bajo', 3
+    return 'advertencia', 4
+
+
+def alertas():
+    """Productos activos por debajo de su mínimo, del más crítico al menos"""
+    compartida = cache_compartida()
+    resultado = cache.get(CLAVE_ALERTAS) if compartida else None
+    if resultado is not None:
+        return resultado
+
+    resultado = []
+    for estado in EstadoStock.objects.exclude(nivel='ok').filter(producto__activo=True).order_by(
+        'porcentaje', 'producto_id'
+    ).values(
+        'producto_id', 'producto__nombre', 'producto__codigo', 'producto__categoria__nombre',
+        'producto__stock_actual', 'producto__stock_minimo', 'nivel', 'porcentaje', 'fecha_cambio'
+    ):
+        estado_alerta, prioridad = _estado_y_prioridad(estado['producto__stock_actual'], estado['porcentaje'])
+        resultado.append({
+            'id': estado['producto_id'],
+            'nombre': estado['producto__nombre'],
+            'codigo': estado['producto__codigo'],
+            'categoria': estado['producto__categoria__nombre'] or 'Sin Categoría',
+            'cantidad': estado['producto__stock_actual'],
+            'stock_minimo': estado['producto__stock_minimo'],
+            'porcentaje_stock': estado['porcentaje'],
+            'nivel': estado['nivel'],
+            'fecha_cambio': estado['fecha_cambio'],
+            'estado': estado_alerta,
+            'prioridad': prioridad,
+        })
+    if compartida:
+        cache.set(CLAVE_ALERTAS, resultado, _ttl())
+    return resultado
+
+
+def _cifras():
+    """Totales, más vendidos y productos por categoría (cacheado por ``_ttl()``)"""
+    resultado = cache.get(CLAVE_CIFRAS)
+    if resultado is not None:
+        return resultado
+
+    totales = Producto.objects.aggregate(
+        total=Count('id'),
+        activos=Count('id', filter=Q(activo=True)),
+        valor=Sum(F('stock_actual') * F('precio'), filter=Q(activo=True),
+                  output_field=DecimalField(max_digits=16, decimal_places=2)),
+    )
+    desde = timezone.now() - timedelta(days=DIAS_MAS_VENDIDOS)
+    mas_vendidos = MovimientoStock.objects.filter(tipo='venta', fecha_movimiento__gte=desde).values(
+        'producto__nombre'
+    ).annotate(total=-Sum('cantidad')).order_by('-total')[:5]
+    por_categoria = Categoria.objects.annotate(count=Count('productos')).values('nombre', 'count').order_by('-count')
+    resultado = {
+        'total_productos': totales['total'],
+        'productos_activos': totales['activos'],
+        'valor_inventario': totales['valor'] or 0,
+        'top_vendidos': list(mas_vendidos),
+        'por_categoria': list(por_categoria),
+    }
+    cache.set(CLAVE_CIFRAS, resultado, _ttl())
+    return resultado
+
+
+def estadisticas():
+    """Cifras del dashboard de productos"""
+    cifras = _cifras()
+    listado = alertas()
+    por_nivel = {'reorden': 0, 'bajo': 0, 'agotado': 0}
+    for alerta in listado:
+        por_nivel[alerta['nivel']] += 1
+
+    return {
+        'total_productos': cifras['total_productos'],
+        'productos_activos': cifras['productos_activos'],
+        'valor_inventario': cifras['valor_inventario'],
+        'alertas_por_nivel': por_nivel,
+        'bajo_stock': [
+            {'id': a['id'], 'nombre': a['nombre'], 'cantidad': a['cantidad'], 'stock_minimo': a['stock_minimo']}
+            for a in listado[:5]
+        ],
+        'top_vendidos': cifras['top_vendidos'],
+        'por_categoria': cifras['por_categoria'],
+    }
+
+
+def invalidar():
+    cache.delete(CLAVE_ALERTAS)
@@ -1,3 +1,454 @@
-from django.test import TestCase
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from alumnos.models import EventoNotificacion
+
+from core.busqueda import normalizar_texto
+from productos import tablero_stock
+from productos.alertas_stock import destinatarios, evaluar
+from productos.catalogo import CatalogoPOS
+from productos.codigos_barras import asignar_ean13, generar_ean13
+from productos.conciliacion_stock import diferencias_stock
+from productos.models import (
+    Categoria, EstadoStock, MovimientoStock, Producto, ProductoProveedor, SugerenciaReposicion, VersionCatalogo
+)
+from productos.pronostico_demanda import calcular, generar_sugerencias
+from productos.utils import is_valid_ean13
+
+User = get_user_model()
+
+
+@contextmanager
+def cache_compartida():
+    """Una caché que comparten todos los procesos (la local de cada proceso no se cachea)"""
+    with tempfile.TemporaryDirectory() as directorio, override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio,
+    }}):
+        yield
+
+
+@override_settings(CATALOGO_POS_TTL=0)
+class CatalogoPOSTestCase(TestCase):
+    """Tests del catálogo del POS en memoria"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria = Categoria.objects.create(nombre='Bebidas')
+            self.jugo = Producto.objects.create(
+                codigo='JUG01', nombre='Jugo de Limón', categoria=self.categoria,
+                precio=Decimal('3000'), stock_actual=10
+            )
+            self.agua = Producto.objects.create(
+                codigo='AGU01', nombre='Agua Mineral', categoria=self.categoria,
+                precio=Decimal('2500'), stock_actual=0
+            )
+        self.catalogo = CatalogoPOS()
+
+    def test_normalizar_texto(self):
+        self.assertEqual(normalizar_texto('Jugo de LIMÓN'), 'jugo de limon')
+
+    def test_busqueda_sin_acentos(self):
+        resultados = self.catalogo.buscar('limon')
+        self.assertEqual([r['id'] for r in resultados], [self.jugo.id])
+        self.assertEqual(resultados[0]['categoria'], 'Bebidas')
+
+    def test_excluye_sin_stock(self):
+        self.assertEqual(self.catalogo.buscar('agua'), [])
+
+    def test_stock_vigente_sin_cambio_de_version(self):
+        from ventas.checkout import descontar_stock
+
+        self.assertEqual(self.catalogo.buscar('limon')[0]['cantidad_disponible'], 10)
+        # Las ventas descuentan stock sin incrementar la versión del catálogo
+        descontar_stock({self.jugo.id: 10})
+        descontar_stock({self.agua.id: -4})
+        self.assertEqual(self.catalogo.buscar('limon'), [])
+        self.assertEqual(self.catalogo.buscar('agua')[0]['cantidad_disponible'], 4)
+
+    def test_codigo_exacto_primero(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(
+                codigo='X1', nombre='Jugo JUG01 grande', categoria=self.categoria,
+                precio=Decimal('5000'), stock_actual=5
+            )
+        resultados = self.catalogo.buscar('jug01')
+        self.assertEqual(resultados[0]['id'], self.jugo.id)
+
+    def test_no_reconstruye_sin_cambios(self):
+        self.catalogo.buscar('jugo')
+        # Solo se consultan la versión y el stock de los resultados, no el catálogo
+        with self.assertNumQueries(2):
+            self.catalogo.buscar('jugo')
+
+    def test_version_se_confirma_con_la_fila(self):
+        from django.db import IntegrityError
+
+        version = VersionCatalogo.actual()
+        with self.assertRaises(IntegrityError):
+            Producto.objects.create(codigo='JUG01', nombre='Duplicado', categoria=self.categoria,
+                                    precio=Decimal('1000'))
+        # El guardado fallido no deja publicada una versión sin su fila
+        self.assertEqual(VersionCatalogo.actual(), version)
+
+    def test_reconstruye_al_cambiar_version(self):
+        version = VersionCatalogo.actual()
+        self.catalogo.buscar('jugo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jugo.nombre = 'Jugo de Naranja'
+            self.jugo.save()
+
+        self.assertGreater(VersionCatalogo.actual(), version)
+        self.assertEqual(self.catalogo.buscar('limon'), [])
+        self.assertEqual(len(self.catalogo.buscar('naranja')), 1)
+
+    def test_guardar_solo_stock_no_incrementa_version(self):
+        version = VersionCatalogo.actual()
+        jugo = Producto.objects.get(pk=self.jugo.pk)
+        jugo.stock_actual = 3
+        jugo.stock_minimo = 2
+        jugo.save()
+        self.assertEqual(VersionCatalogo.actual(), version)
+
+        jugo.precio = Decimal('3500')
+        jugo.save(update_fields=['precio'])
+        self.assertEqual(VersionCatalogo.actual(), version + 1)
+        self.assertEqual(Producto.objects.get(pk=jugo.pk).version_catalogo, version + 1)
+
+        # Lo ya guardado no vuelve a contar como cambio
+        jugo.stock_actual = 4
+        jugo.save()
+        self.assertEqual(VersionCatalogo.actual(), version + 1)
+
+    def test_stock_de_la_pagina_en_una_consulta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(12):
+                Producto.objects.create(codigo=f'JUG1{i:02}', nombre=f'Jugo {i:02}', categoria=self.categoria,
+                                        precio=Decimal('3000'), stock_actual=i % 3)
+        self.catalogo.buscar('jugo')
+
+        # Versión y stock de la página; los agotados se quitan sin buscar reemplazos
+        with self.assertNumQueries(2):
+            resultados = self.catalogo.buscar('jugo', limite=6)
+        self.assertEqual([r['nombre'] for r in resultados], ['Jugo 01', 'Jugo 02', 'Jugo 04', 'Jugo 05'])
+
+
+class AlertasStockTestCase(TestCase):
+    """Tests de las alertas de stock por cruce de nivel"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin_stock', password='testpass123',
+                                              tipo_usuario='administrador')
+        self.producto = Producto.objects.create(
+            codigo='ALF01', nombre='Alfajor', categoria=Categoria.objects.create(nombre='Golosinas'),
+            precio=Decimal('2000'), stock_actual=500, stock_minimo=10
+        )
+
+    def evaluar(self, stock):
+        Producto.objects.filter(pk=self.producto.pk).update(stock_actual=stock)
+        return evaluar([self.producto.pk])
+
+    def alertas(self):
+        return [evento.datos['alerta'] for evento in EventoNotificacion.objects.filter(tipo='stock').order_by('id')]
+
+    def test_un_cruce_una_alerta(self):
+        self.evaluar(500)
+        cambio = EstadoStock.objects.get(producto=self.producto).fecha_cambio
+        # Por encima del mínimo el estado no cambia: el upsert no escribe
+        for stock in range(499, 10, -1):
+            self.evaluar(stock)
+        self.assertEqual(EstadoStock.objects.get(producto=self.producto).fecha_cambio, cambio)
+        for stock in range(10, 5, -1):
+            self.evaluar(stock)
+        self.assertEqual(self.alertas(), ['reorden'])
+
+        # Consultas fijas: bloqueo, lectura del stock y upsert (más el savepoint)
+        with self.assertNumQueries(5):
+            evaluar([self.producto.pk])
+
+    def test_hooks_fuera_de_orden_leen_el_stock_actual(self):
+        # Dos ventas: la que dejó 8 confirma primero pero su hook corre último
+        with self.captureOnCommitCallbacks() as primera:
+            Producto.objects.filter(pk=self.producto.pk).update(stock_actual=8)
+            MovimientoStock.objects.create(producto=self.producto, tipo='venta', cantidad=-492,
+                                           stock_anterior=500, stock_nuevo=8)
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.filter(pk=self.producto.pk).update(stock_actual=3)
+            MovimientoStock.objects.create(producto=self.producto, tipo='venta', cantidad=-5,
+                                           stock_anterior=8, stock_nuevo=3)
+        for callback in primera:
+            callback()
+
+        estado = EstadoStock.objects.get(producto=self.producto)
+        self.assertEqual((estado.nivel, estado.porcentaje), ('bajo', 30.0))
+        self.assertEqual(self.alertas(), ['bajo'])
+
+    def test_escalamiento(self):
+        for stock in (10, 5, 0):
+            self.evaluar(stock)
+        self.assertEqual(self.alertas(), ['reorden', 'bajo', 'agotado'])
+        estado = EstadoStock.objects.get(producto=self.producto)
+        self.assertEqual((estado.nivel, estado.nivel_alertado), ('agotado', 'agotado'))
+
+    def test_ventana_agrupa_oscilaciones(self):
+        for stock in (8, 11, 8, 11, 8):
+            self.evaluar(stock)
+        self.assertEqual(self.alertas(), ['reorden'])
+
+        EstadoStock.objects.update(fecha_alerta=timezone.now() - timedelta(hours=1))
+        self.evaluar(11)
+        self.evaluar(8)
+        self.assertEqual(self.alertas(), ['reorden', 'reorden'])
+
+    def test_venta_alerta_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.filter(pk=self.producto.pk).update(stock_actual=5)
+            MovimientoStock.objects.create(producto=self.producto, tipo='venta', cantidad=-495,
+                                           stock_anterior=500, stock_nuevo=5)
+        self.assertEqual(self.alertas(), ['bajo'])
+
+    def test_destinatarios_cacheados(self):
+        with cache_compartida():
+            self.assertEqual(destinatarios(), [self.admin.pk])
+            with self.assertNumQueries(0):
+                destinatarios()
+
+            encargado = User.objects.create_user(username='encargado', password='testpass123',
+                                                 tipo_usuario='cajero')
+            grupo = Group.objects.create(name='Depósito')
+            grupo.permissions.add(Permission.objects.get(codename='change_producto'))
+            encargado.groups.add(grupo)
+            self.assertEqual(destinatarios(), sorted([self.admin.pk, encargado.pk]))
+
+            # Un inicio de sesión no descarta la lista
+            self.admin.last_login = timezone.now()
+            self.admin.save(update_fields=['last_login'])
+            with self.assertNumQueries(0):
+                destinatarios()
+
+        # Sin caché compartida la lista se lee siempre: el worker no vería la invalidación
+        with self.assertNumQueries(1):
+            destinatarios()
+
+
+class TableroStockTestCase(TestCase):
+    """Tests de las alertas y estadísticas del dashboard leídas del estado precalculado"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='admin_tablero', password='testpass123',
+                                             tipo_usuario='administrador')
+        categoria = Categoria.objects.create(nombre='Lácteos')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.productos = [
+                Producto.objects.create(codigo=f'L{i}', nombre=f'Yogur {i}', categoria=categoria,
+                                        precio=Decimal('1000'), stock_actual=stock, stock_minimo=20)
+                for i, stock in enumerate((100, 15, 4, 0))
+            ]
+
+    def test_alertas_desde_el_estado(self):
+        self.client.force_login(self.user)
+        respuesta = self.client.get(reverse('productos:api-stock-alerts')).json()
+        self.assertEqual([(a['codigo'], a['porcentaje_stock'], a['estado']) for a in respuesta],
+                         [('L3', 0.0, 'agotado'), ('L2', 20.0, 'critico'), ('L1', 75.0, 'advertencia')])
+
+        # Una venta por debajo del mínimo se ve enseguida, aunque la evalúe otro proceso
+        Producto.objects.filter(pk=self.productos[1].pk).update(stock_actual=9)
+        evaluar([self.productos[1].pk])
+        self.assertEqual(tablero_stock.alertas()[2]['porcentaje_stock'], 45.0)
+        self.assertEqual(EstadoStock.objects.get(pk=self.productos[1].pk).nivel, 'bajo')
+
+    def test_alertas_cacheadas_con_cache_compartida(self):
+        with cache_compartida():
+            tablero_stock.alertas()
+            with self.assertNumQueries(0):
+                tablero_stock.alertas()
+
+            # Escribir un estado descarta la caché
+            Producto.objects.filter(pk=self.productos[1].pk).update(stock_actual=9)
+            evaluar([self.productos[1].pk])
+            self.assertEqual(tablero_stock.alertas()[2]['porcentaje_stock'], 45.0)
+
+    def test_estadisticas(self):
+        self.client.force_login(self.user)
+        datos = self.client.get(reverse('productos:api-dashboard-stats')).json()
+        self.assertEqual((datos['total_productos'], datos['productos_activos']), (4, 4))
+        self.assertEqual(datos['alertas_por_nivel'], {'reorden': 1, 'bajo': 1, 'agotado': 1})
+        self.assertEqual(datos['bajo_stock'][0]['nombre'], 'Yogur 3')
+
+        # Las cifras generales quedan en caché; las alertas se leen del índice
+        with self.assertNumQueries(1):
+            tablero_stock.estadisticas()
+        with cache_compartida():
+            tablero_stock.estadisticas()
+            with self.assertNumQueries(0):
+                tablero_stock.estadisticas()
+
+    def test_sincronizar(self):
+        # Cambios masivos que no pasan por las señales
+        Producto.objects.filter(pk=self.productos[0].pk).update(stock_actual=0)
+        EstadoStock.objects.filter(pk=self.productos[3].pk).delete()
+
+        salida = StringIO()
+        call_command('sincronizar_estado_stock', stdout=salida)
+        self.assertIn('2 estados de stock actualizados', salida.getvalue())
+        self.assertEqual(EstadoStock.objects.filter(nivel='agotado').count(), 2)
+        self.assertFalse(EventoNotificacion.objects.filter(datos__producto_id=self.productos[0].pk).exists())
+
+
+class ConciliacionStockTestCase(TestCase):
+    """Tests de la conciliación del stock contra el libro de movimientos"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        self.productos = [
+            Producto.objects.create(codigo=f'C{i}', nombre=f'Gaseosa {i}', categoria=categoria,
+                                    precio=Decimal('4000'), stock_actual=20)
+            for i in range(3)
+        ]
+        for producto in self.productos[:2]:
+            MovimientoStock.objects.create(producto=producto, tipo='entrada', cantidad=30,
+                                           stock_anterior=0, stock_nuevo=30)
+            MovimientoStock.objects.create(producto=producto, tipo='venta', cantidad=-10,
+                                           stock_anterior=30, stock_nuevo=20)
+
+    def test_reporta_solo_desvios(self):
+        Producto.objects.filter(pk=self.productos[1].pk).update(stock_actual=17)
+
+        with self.assertNumQueries(1):
+            diferencias = diferencias_stock()
+
+        # El tercer producto no tiene libro: no se concilia
+        self.assertEqual([(d['codigo'], d['stock_esperado'], d['diferencia']) for d in diferencias],
+                         [('C1', 20, -3)])
+
+        salida = StringIO()
+        call_command('conciliar_stock', stdout=salida)
+        self.assertIn('C1 Gaseosa 1: actual 17, según movimientos 20 (-3)', salida.getvalue())
+
+    def test_salida_manual_con_cantidad_positiva(self):
+        # Las salidas y ajustes del inventario guardan la cantidad sin signo
+        MovimientoStock.objects.create(producto=self.productos[0], tipo='salida', cantidad=5,
+                                       stock_anterior=20, stock_nuevo=15)
+        MovimientoStock.objects.create(producto=self.productos[0], tipo='ajuste', cantidad=2,
+                                       stock_anterior=15, stock_nuevo=13)
+        Producto.objects.filter(pk=self.productos[0].pk).update(stock_actual=13)
+
+        self.assertEqual(diferencias_stock(), [])
+
+
+class PronosticoDemandaTestCase(TestCase):
+    """Tests del pronóstico de demanda y las sugerencias de reposición"""
+
+    def test_calcular_con_estacionalidad(self):
+        import numpy as np
+
+        # Dos semanas desde un lunes: 10 unidades de lunes a jueves y 20 los viernes
+        primer_dia = date(2026, 3, 2)
+        semana = [10, 10, 10, 10, 20, 0, 0]
+        ventas = np.array([semana * 2, [0] * 14])
+        hoy = date(2026, 3, 16)
+
+        demanda, cobertura, cantidad = calcular(
+            ventas, primer_dia, hoy, stock=[20, 5], stock_seguridad=[10, 0],
+            tiempo_entrega=[3, 1], lote_minimo=[50, 1], metodo='movil', revision=4
+        )
+        self.assertAlmostEqual(demanda[0], 12.0)
+        self.assertAlmostEqual(cobertura[0], 20 / (60 / 7))
+        # Lunes a viernes de la semana: 60 + 10 de seguridad - 20 en stock = 50, igual al lote mínimo
+        self.assertEqual(list(cantidad), [50, 0])
+        self.assertTrue(np.isnan(cobertura[1]))
+
+    def test_generar_sugerencias(self):
+        from proveedores.models import Proveedor
+        from ventas.checkout import procesar_carrito
+        from ventas.models import MetodoPago
+
+        usuario = User.objects.create_user(username='cajero_pronostico', password='testpass123')
+        efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        categoria = Categoria.objects.create(nombre='Snacks')
+        chipa, pan = [
+            Producto.objects.create(codigo=codigo, nombre=codigo, categoria=categoria,
+                                    precio=Decimal('1000'), stock_actual=40, stock_minimo=5)
+            for codigo in ('CHIPA', 'PAN')
+        ]
+        for dias, numero in ((5, '1'), (2, '2')):
+            ProductoProveedor.objects.create(
+                producto=chipa, proveedor=Proveedor.objects.create(nombre=f'Proveedor {numero}', numero_documento=numero),
+                codigo_producto_proveedor='X', precio=Decimal('500'), tiempo_entrega=dias,
+                cantidad_minima_pedido=100
+            )
+        procesar_carrito(usuario, None, [{'producto_id': chipa.id, 'cantidad': 30}],
+                         [{'metodo_pago_id': efectivo.id, 'monto': '30000'}])
+
+        resultado = generar_sugerencias(hoy=timezone.localdate() + timedelta(days=1))
+
+        self.assertEqual((resultado['productos'], resultado['a_pedir']), (2, 1))
+        sugerencia = SugerenciaReposicion.objects.get(producto=chipa)
+        self.assertEqual(sugerencia.proveedor.nombre, 'Proveedor 2')
+        self.assertEqual(sugerencia.demanda_diaria, 30)
+        self.assertEqual(sugerencia.cantidad_sugerida, 100)
+        self.assertEqual(SugerenciaReposicion.objects.get(producto=pan).cantidad_sugerida, 0)
+
+
+class CodigosBarrasTestCase(TestCase):
+    """Tests de la asignación en bloque de códigos EAN-13"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Galletas')
+        self.productos = [
+            Producto.objects.create(codigo=f'G{i}', nombre=f'Galleta {i}', categoria=categoria,
+                                    precio=Decimal('1500'), stock_actual=10)
+            for i in range(50)
+        ]
+
+    def test_generar_sin_colisiones(self):
+        # Un prefijo de 10 dígitos deja 100 códigos: 60 en uso, se piden los 40 restantes
+        existentes = generar_ean13(60, '7840000001', semilla=1)
+        codigos = generar_ean13(40, '7840000001', existentes, semilla=2)
+
+        self.assertEqual(len(set(codigos) | set(existentes)), 100)
+        self.assertTrue(all(c.startswith('7840000001') and is_valid_ean13(c) for c in codigos))
+        with self.assertRaisesMessage(ValueError, 'no tiene 1 códigos libres'):
+            generar_ean13(1, '7840000001', existentes + codigos)
+        with self.assertRaises(ValueError):
+            generar_ean13(1, '78A')
+
+    def test_asignar_en_bloque(self):
+        Producto.objects.filter(pk=self.productos[0].pk).update(ean13='2000000000008')
+        version = VersionCatalogo.actual()
+
+        with self.assertNumQueries(5):
+            asignados = asignar_ean13(prefijo='200')
+
+        self.assertEqual(len(asignados), 49)
+        codigos = list(Producto.objects.values_list('ean13', flat=True))
+        self.assertEqual(len(set(codigos)), 50)
+        self.assertTrue(all(is_valid_ean13(c) for c in codigos))
+        self.assertGreater(VersionCatalogo.actual(), version)
+        self.assertEqual(asignar_ean13(), {})
+
+    def test_indice_unico(self):
+        from django.db import IntegrityError
+
+        Producto.objects.filter(pk=self.productos[0].pk).update(ean13='2000000000008')
+        with self.assertRaises(IntegrityError):
+            Producto.objects.filter(pk=self.productos[1].pk).update(ean13='2000000000008')
+
+    def test_vista_bulk(self):
+        self.client.force_login(User.objects.create_user(username='admin_ean', password='testpass123'))
+        respuesta = self.client.post(reverse('productos:generar_ean13_bulk'))
+        self.assertRedirects(respuesta, reverse('productos:lista'), fetch_redirect_response=False)
+        self.assertFalse(Producto.objects.filter(ean13__isnull=True).exists())
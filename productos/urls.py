@@ -1,5 +1,5 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from . import barcode_views, views
 
 app_name = 'productos'
 
@@ -11,4 +11,9 @@ urlpatterns = [
     path('categorias/', views.lista_categorias, name='categorias'),
     path('stock/', views.control_stock, name='stock'),
     path('precios/', views.actualizar_precios, name='precios'),
+    path('<int:producto_id>/ean13/', barcode_views.generar_ean13, name='generar_ean13'),
+    path('ean13/generar/', barcode_views.generar_ean13_bulk, name='generar_ean13_bulk'),
+    path('ean13/escanear/', barcode_views.escanear_codigo, name='escanear_codigo'),
+    path('ean13/procesar/', barcode_views.procesar_codigo, name='procesar_codigo'),
+    path('api/', include('productos.api_urls')),
 ]
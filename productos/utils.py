@@ -11,11 +11,11 @@ def generate_ean13(seed: Optional[int] = None) -> str:
     Returns:
         Un string con un código EAN-13 válido
     """
-    if seed is not None:
-        random.seed(seed)
+    # Generador propio: no resiembra el ``random`` global
+    rng = random.Random(seed)
     
     # Generar los primeros 12 dígitos
-    digits = [str(random.randint(0, 9)) for _ in range(12)]
+    digits = [str(rng.randint(0, 9)) for _ in range(12)]
     
     # Calcular el dígito de control
     suma = 0
@@ -131,36 +131,32 @@ class ReportesCaja:
     
     @staticmethod
     def reporte_cajas_diario(fecha=None):
-        """Reporte comparativo de cajas del día"""
-        from ventas.models import Caja, Venta, TurnoCajero
+        """Reporte comparativo de cajas del día (desde ReporteCaja)"""
+        from ventas.models import Caja, ReporteCaja, TurnoCajero
         
         if not fecha:
-            fecha = timezone.now().date()
+            fecha = timezone.localdate()
+        
+        # Una fila de ReporteCaja por caja; los turnos abiertos se cuentan aparte
+        reportes = {reporte.caja_id: reporte for reporte in ReporteCaja.objects.filter(fecha=fecha)}
+        turnos_activos = dict(
+            TurnoCajero.objects.filter(
+                fecha_inicio__date=fecha,
+                activa=True,
+                fecha_fin__isnull=True
+            ).values('caja').annotate(cantidad=Count('id')).values_list('caja', 'cantidad')
+        )
         
         cajas_data = []
         for caja in Caja.objects.filter(activa=True):
-            ventas = Venta.objects.filter(
-                fecha__date=fecha,
-                turno_cajero__caja=caja,
-                estado='completada'
-            )
-            
-            data = ventas.aggregate(
-                total_ventas=Sum('total'),
-                cantidad_ventas=Count('id')
-            )
-            
-            turnos = TurnoCajero.objects.filter(
-                caja=caja,
-                fecha_inicio__date=fecha
-            )
-            
+            reporte = reportes.get(caja.id)
+            activos = turnos_activos.get(caja.id, 0)
             cajas_data.append({
                 'caja': caja,
-                'total_ventas': data['total_ventas'] or Decimal('0'),
-                'cantidad_ventas': data['cantidad_ventas'] or 0,
-                'turnos_count': turnos.count(),
-                'turnos_activos': turnos.filter(activa=True).count()
+                'total_ventas': reporte.monto_total if reporte else Decimal('0'),
+                'cantidad_ventas': reporte.ventas_total if reporte else 0,
+                'turnos_count': (reporte.turnos_total if reporte else 0) + activos,
+                'turnos_activos': activos
             })
         
         return {
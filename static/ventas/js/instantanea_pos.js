@@ -0,0 +1,64 @@
+/**
+ * Copia local del catálogo y del directorio de tarjetas del POS.
+ *
+ * La primera carga pide la instantánea completa; las siguientes envían
+ * ?since=<versión> e If-None-Match, y reciben 304 o solo las filas que
+ * cambiaron. La copia se guarda en localStorage entre recargas.
+ */
+const InstantaneaPOS = (function () {
+    const CLAVE = 'pos_instantanea';
+
+    function aObjetos(parte) {
+        return parte.filas.map(fila => Object.fromEntries(parte.campos.map((campo, i) => [campo, fila[i]])));
+    }
+
+    function fusionar(actuales, parte) {
+        const resultado = parte.completo ? {} : Object.assign({}, actuales);
+        aObjetos(parte).forEach(fila => {
+            if (fila.activo) {
+                resultado[fila.id] = fila;
+            } else {
+                delete resultado[fila.id];
+            }
+        });
+        return resultado;
+    }
+
+    function leer() {
+        try {
+            return JSON.parse(localStorage.getItem(CLAVE));
+        } catch (e) {
+            return null;
+        }
+    }
+
+    async function sincronizar(url) {
+        const guardada = leer();
+        const opciones = {credentials: 'same-origin', headers: {}};
+        let destino = url;
+        if (guardada) {
+            destino += '?since=' + encodeURIComponent(guardada.version);
+            opciones.headers['If-None-Match'] = guardada.etag;
+        }
+
+        const respuesta = await fetch(destino, opciones);
+        if (respuesta.status === 304 && guardada) {
+            return guardada;
+        }
+        if (!respuesta.ok) {
+            throw new Error('No se pudo sincronizar el POS (' + respuesta.status + ')');
+        }
+
+        const datos = await respuesta.json();
+        const nueva = {
+            version: datos.version,
+            etag: respuesta.headers.get('ETag'),
+            productos: fusionar(guardada ? guardada.productos : {}, datos.catalogo),
+            alumnos: fusionar(guardada ? guardada.alumnos : {}, datos.directorio),
+        };
+        localStorage.setItem(CLAVE, JSON.stringify(nueva));
+        return nueva;
+    }
+
+    return {sincronizar: sincronizar};
+})();
@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('pos/instantanea/', views.instantanea_pos, name='api_instantanea_pos'),
+    path('productos/buscar/', views.buscar_productos, name='api_buscar_productos'),
+    path('clientes/buscar/', views.buscar_clientes, name='api_buscar_clientes'),
+    path('venta/procesar/', views.procesar_venta, name='api_procesar_venta'),
+    path('venta/lote/', views.procesar_lote_ventas, name='api_procesar_lote_ventas'),
+    path('venta/<int:venta_id>/anular/', views.anular_venta_api, name='api_anular_venta'),
+    path('tarjeta/recargar/', views.recargar_tarjeta, name='api_recargar_tarjeta'),
+    path('tarjeta/importar/', views.importar_recargas_api, name='api_importar_recargas'),
+    path('metodos-pago/', views.listar_metodos_pago, name='api_metodos_pago'),
+    path('caja/estado/', views.estado_caja_actual, name='api_estado_caja'),
+]
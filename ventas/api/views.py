@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
@@ -10,8 +12,16 @@ from decimal import Decimal
 import logging
 
 from ..models import Venta, DetalleVenta, PagoVenta, TurnoCajero, MetodoPago
+from ..checkout import anular_venta, procesar_carrito, procesar_lote
+from .. import sincronizacion
 from productos.models import Producto
+from productos.catalogo import catalogo_pos
+from alumnos.consumo import disponibles_del_dia
+from alumnos.importacion_recargas import importar_recargas, leer_archivo
 from alumnos.models import Alumno
+from alumnos.saldo import acreditar_alumno, acreditar_tarjeta
+from core.busqueda import buscar
+from core.idempotencia import idempotente
 
 logger = logging.getLogger(__name__)
 
@@ -22,37 +32,35 @@ def buscar_productos(request):
     query = request.GET.get('q', '').strip()
     categoria_id = request.GET.get('categoria')
     
-    productos = Producto.objects.filter(
-        estado='activo',
-        cantidad__gt=0
-    )
-    
-    if query:
-        productos = productos.filter(
-            Q(nombre__icontains=query) |
-            Q(codigo__icontains=query) |
-            Q(descripcion__icontains=query)
-        )
+    # Se responde desde la instantánea del catálogo en memoria del worker
+    try:
+        data = catalogo_pos.buscar(query, categoria_id=categoria_id, limite=20)
+    except ValueError:
+        return JsonResponse({'error': 'Categoría inválida'}, status=400)
     
-    if categoria_id:
-        productos = productos.filter(categoria_id=categoria_id)
+    return JsonResponse({'productos': data})
+
+@login_required
+@require_http_methods(["GET"])
+def instantanea_pos(request):
+    """API con el catálogo y el directorio de tarjetas para el POS (ETag + deltas)"""
+    version = sincronizacion.version_actual()
+    etag = sincronizacion.etag(version[0][0], version[1][0])
     
-    productos = productos[:20]  # Limitar resultados
+    # Sin cambios desde la copia del POS: 304 sin armar nada
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        return no_modificado
     
-    data = []
-    for producto in productos:
-        data.append({
-            'id': producto.id,
-            'codigo': producto.codigo,
-            'nombre': producto.nombre,
-            'descripcion': producto.descripcion,
-            'precio_venta': float(producto.precio_venta),
-            'cantidad_disponible': float(producto.cantidad),
-            'categoria': producto.categoria.nombre if producto.categoria else '',
-            'imagen_url': producto.imagen.url if producto.imagen else None,
-        })
+    try:
+        data = sincronizacion.construir_instantanea(request.GET.get('since'), version=version)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    return JsonResponse({'productos': data})
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 @require_http_methods(["GET"])
@@ -63,20 +71,26 @@ def buscar_clientes(request):
     if not query or len(query) < 2:
         return JsonResponse({'clientes': []})
     
-    clientes = Alumno.objects.filter(
-        Q(nombre__icontains=query) |
-        Q(apellido__icontains=query) |
-        Q(numero_telefono__icontains=query),
-        activo=True
+    # Trigramas + unaccent en PostgreSQL ("Gonzalez" encuentra "González")
+    clientes = buscar(
+        Alumno.objects.filter(activo=True),
+        query,
+        ['nombre', 'apellido', 'ci', 'numero_tarjeta']
     )[:10]
+    clientes = list(clientes)
+    disponibles = disponibles_del_dia(clientes)
     
     data = []
     for cliente in clientes:
+        disponible = disponibles[cliente.id]
         data.append({
             'id': cliente.id,
             'nombre': f"{cliente.nombre} {cliente.apellido}",
-            'telefono': cliente.numero_telefono,
-            'email': cliente.email,
+            'ci': cliente.ci,
+            'numero_tarjeta': cliente.numero_tarjeta,
+            'saldo_tarjeta': float(cliente.saldo_tarjeta),
+            'limite_consumo': float(cliente.limite_consumo or 0),
+            'disponible_hoy': None if disponible is None else float(disponible),
         })
     
     return JsonResponse({'clientes': data})
@@ -84,6 +98,7 @@ def buscar_clientes(request):
 @login_required
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotente
 def procesar_venta(request):
     """API para procesar una venta completa"""
     try:
@@ -106,127 +121,210 @@ def procesar_venta(request):
         if not turno_activo:
             return JsonResponse({'error': 'No tienes un turno activo'}, status=400)
         
-        with transaction.atomic():
-            # Crear venta
-            cliente_id = data.get('cliente_id')
-            cliente = None
-            if cliente_id:
-                try:
-                    cliente = Alumno.objects.get(id=cliente_id, activo=True)
-                except Alumno.DoesNotExist:
-                    return JsonResponse({'error': 'Cliente no encontrado'}, status=400)
-            
-            venta = Venta.objects.create(
-                cajero=request.user,
-                turno_cajero=turno_activo,
-                cliente=cliente,
-                descuento=Decimal(str(data.get('descuento', 0))),
-                observaciones=data.get('observaciones', '')
-            )
-            
-            # Validar y agregar items
-            total_items = Decimal('0')
-            items_data = data.get('items', [])
-            
-            for item_data in items_data:
-                try:
-                    producto = Producto.objects.select_for_update().get(
-                        id=item_data['producto_id'],
-                        estado='activo'
-                    )
-                    cantidad = Decimal(str(item_data['cantidad']))
-                    precio_unitario = Decimal(str(item_data.get('precio_unitario', producto.precio_venta)))
-                    
-                    # Validaciones
-                    if cantidad <= 0:
-                        raise ValueError(f'Cantidad inválida para {producto.nombre}')
-                    
-                    if precio_unitario <= 0:
-                        raise ValueError(f'Precio inválido para {producto.nombre}')
-                    
-                    # Verificar stock con bloqueo
-                    if producto.cantidad < cantidad:
-                        raise ValueError(f'Stock insuficiente para {producto.nombre}. Disponible: {producto.cantidad}')
-                    
-                    # Crear detalle
-                    detalle = DetalleVenta.objects.create(
-                        venta=venta,
-                        producto=producto,
-                        cantidad=cantidad,
-                        precio_unitario=precio_unitario,
-                        descuento_item=Decimal(str(item_data.get('descuento_item', 0)))
-                    )
-                    
-                    total_items += detalle.subtotal
-                    
-                    # Actualizar stock
-                    producto.cantidad = F('cantidad') - cantidad
-                    producto.save(update_fields=['cantidad'])
-                    
-                except Producto.DoesNotExist:
-                    raise ValueError(f'Producto no encontrado: {item_data.get("producto_id")}')
-                except (ValueError, TypeError) as e:
-                    raise ValueError(f'Error en item: {str(e)}')
-            
-            # Validar y procesar pagos
-            total_pagos = Decimal('0')
-            pagos_data = data.get('pagos', [])
-            
-            for pago_data in pagos_data:
-                try:
-                    metodo_pago = MetodoPago.objects.get(
-                        id=pago_data['metodo_pago_id'],
-                        activo=True
-                    )
-                    monto = Decimal(str(pago_data['monto']))
-                    
-                    if monto <= 0:
-                        raise ValueError(f'Monto inválido para {metodo_pago.nombre}')
-                    
-                    # Validar referencia si es requerida
-                    referencia = pago_data.get('referencia', '')
-                    if metodo_pago.requiere_referencia and not referencia:
-                        raise ValueError(f'Se requiere referencia para {metodo_pago.nombre}')
-                    
-                    PagoVenta.objects.create(
-                        venta=venta,
-                        metodo_pago=metodo_pago,
-                        metodo=pago_data.get('metodo', 'EFECTIVO'),
-                        monto=monto,
-                        referencia=referencia,
-                        observacion=pago_data.get('observacion', '')
-                    )
-                    
-                    total_pagos += monto
-                    
-                except MetodoPago.DoesNotExist:
-                    raise ValueError(f'Método de pago no encontrado: {pago_data.get("metodo_pago_id")}')
-            
-            # Calcular totales
-            venta.calcular_totales()
-            
-            # Validar que los pagos cubran el total
-            if total_pagos < venta.total:
-                raise ValueError(f'Los pagos ({total_pagos}) no cubren el total ({venta.total})')
-            
-            # Procesar venta
-            venta.procesar_venta()
-            
-            logger.info(f"Venta {venta.numero_venta} procesada exitosamente por {request.user}")
+        cliente = None
+        cliente_id = data.get('cliente_id')
+        if cliente_id:
+            try:
+                cliente = Alumno.objects.get(id=cliente_id, activo=True)
+            except Alumno.DoesNotExist:
+                return JsonResponse({'error': 'Cliente no encontrado'}, status=400)
+        
+        # Bloqueo de productos, validación y escritura por conjuntos
+        venta = procesar_carrito(
+            usuario=request.user,
+            turno=turno_activo,
+            items=data['items'],
+            pagos=data['pagos'],
+            alumno=cliente,
+            descuento=Decimal(str(data.get('descuento', 0))),
+            notas=data.get('observaciones', '')
+        )
+        
+        logger.info(f"Venta {venta.numero_venta} procesada exitosamente por {request.user}")
+        
+        return JsonResponse({
+            'success': True,
+            'venta_id': venta.id,
+            'numero_venta': venta.numero_venta,
+            'total': float(venta.total),
+            'cambio': float(venta.cambio)
+        })
             
-            return JsonResponse({
-                'success': True,
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Datos JSON inválidos'}, status=400)
+    except Exception as e:
+        logger.error(f"Error procesando venta: {str(e)}", exc_info=True)
+        return JsonResponse({'error': str(e)}, status=400)
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotente
+def procesar_lote_ventas(request):
+    """API para subir las ventas que un POS encoló mientras estuvo sin conexión"""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Datos JSON inválidos'}, status=400)
+    
+    ventas = data.get('ventas')
+    if not isinstance(ventas, list) or not ventas:
+        return JsonResponse({'error': 'No hay ventas en el lote'}, status=400)
+    
+    maximo = getattr(settings, 'VENTAS_LOTE_MAXIMO', 500)
+    if len(ventas) > maximo:
+        return JsonResponse({'error': f'El lote admite hasta {maximo} ventas'}, status=400)
+    
+    turno_activo = TurnoCajero.objects.filter(
+        cajero=request.user,
+        activa=True,
+        fecha_fin__isnull=True
+    ).first()
+    
+    if not turno_activo:
+        return JsonResponse({'error': 'No tienes un turno activo'}, status=400)
+    
+    resultados = procesar_lote(request.user, turno_activo, ventas)
+    
+    data = []
+    for resultado in resultados:
+        if resultado['ok']:
+            venta = resultado['venta']
+            data.append({
+                'id_local': resultado['id_local'],
+                'ok': True,
                 'venta_id': venta.id,
                 'numero_venta': venta.numero_venta,
                 'total': float(venta.total),
-                'cambio': float(total_pagos - venta.total) if total_pagos > venta.total else 0
+                'cambio': float(venta.cambio)
             })
-            
+        else:
+            data.append({
+                'id_local': resultado['id_local'],
+                'ok': False,
+                'error': resultado['error']
+            })
+    
+    procesadas = sum(1 for resultado in resultados if resultado['ok'])
+    logger.info(f"Lote de {len(resultados)} ventas de {request.user}: {procesadas} procesadas")
+    
+    return JsonResponse({
+        'success': True,
+        'procesadas': procesadas,
+        'conflictos': len(resultados) - procesadas,
+        'resultados': data
+    })
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def anular_venta_api(request, venta_id):
+    """API para anular una venta completada (administradores y supervisores)"""
+    if getattr(request.user, 'tipo_usuario', None) not in ('administrador', 'supervisor'):
+        return JsonResponse({'error': 'No tiene permisos para anular ventas'}, status=403)
+    
+    try:
+        data = json.loads(request.body or '{}')
+        venta = anular_venta(venta_id, usuario=request.user, motivo=data.get('motivo', ''))
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Datos JSON inválidos'}, status=400)
-    except Exception as e:
-        logger.error(f"Error procesando venta: {str(e)}", exc_info=True)
+    except Venta.DoesNotExist:
+        return JsonResponse({'error': 'Venta no encontrada'}, status=404)
+    except ValueError as e:
         return JsonResponse({'error': str(e)}, status=400)
+    
+    logger.info(f"Venta {venta.numero_venta} anulada por {request.user}")
+    
+    return JsonResponse({
+        'success': True,
+        'venta_id': venta.id,
+        'numero_venta': venta.numero_venta,
+        'estado': venta.estado
+    })
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotente
+def recargar_tarjeta(request):
+    """API para cargar saldo a la tarjeta de cantina desde la caja"""
+    if not (request.user.is_superuser
+            or getattr(request.user, 'tipo_usuario', None) in ('administrador', 'supervisor', 'cajero')):
+        return JsonResponse({'error': 'No tiene permisos para recargar tarjetas'}, status=403)
+    
+    try:
+        data = json.loads(request.body)
+        monto = Decimal(str(data.get('monto', 0)))
+        descripcion = f'Recarga en caja por {request.user.get_full_name() or request.user.username}'
+        
+        if data.get('alumno_id'):
+            try:
+                alumno_id = int(data['alumno_id'])
+            except (TypeError, ValueError):
+                return JsonResponse({'error': f'Alumno inválido: {data["alumno_id"]}'}, status=400)
+            movimiento = acreditar_alumno(alumno_id, monto, usuario=request.user, descripcion=descripcion)
+        elif data.get('numero_tarjeta'):
+            movimiento = acreditar_tarjeta(data['numero_tarjeta'], monto, usuario=request.user, descripcion=descripcion)
+        else:
+            return JsonResponse({'error': 'Debe indicar el alumno o el número de tarjeta'}, status=400)
+        
+        logger.info(f"Recarga de {monto} al alumno {movimiento.alumno_id} por {request.user}")
+        
+        return JsonResponse({
+            'success': True,
+            'movimiento_id': movimiento.id,
+            'alumno_id': movimiento.alumno_id,
+            'monto': float(movimiento.monto),
+            'saldo_nuevo': float(movimiento.saldo_nuevo)
+        })
+    
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Datos JSON inválidos'}, status=400)
+    except (ValueError, ArithmeticError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotente
+def importar_recargas_api(request):
+    """API para importar recargas desde el extracto bancario (CSV o XLSX)"""
+    if getattr(request.user, 'tipo_usuario', None) not in ('administrador', 'supervisor'):
+        return JsonResponse({'error': 'No tiene permisos para importar recargas'}, status=403)
+    
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return JsonResponse({'error': 'Debe adjuntar el archivo'}, status=400)
+    
+    try:
+        resultado = importar_recargas(
+            leer_archivo(archivo, archivo.name),
+            usuario=request.user,
+            parcial=request.POST.get('parcial') in ('1', 'true'),
+            simular=request.POST.get('simular') in ('1', 'true'),
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    logger.info(
+        f"Importación de recargas por {request.user}: {resultado['aplicadas']} aplicadas, "
+        f"{resultado['errores']} errores"
+    )
+    
+    return JsonResponse({
+        'success': resultado['aplicadas'] > 0 or not resultado['errores'],
+        'aplicadas': resultado['aplicadas'],
+        'errores': resultado['errores'],
+        'monto_total': float(resultado['monto_total']),
+        'filas': [
+            {
+                **fila,
+                'monto': str(fila['monto']),
+                'saldo_nuevo': float(fila['saldo_nuevo']) if fila['saldo_nuevo'] is not None else None,
+            }
+            for fila in resultado['filas']
+        ]
+    }, status=200 if resultado['aplicadas'] or not resultado['errores'] else 400)
 
 @login_required
 @csrf_exempt
@@ -328,7 +426,8 @@ def listar_metodos_pago(request):
 @require_http_methods(["GET"])
 def estado_caja_actual(request):
     """API para obtener estado de la caja actual"""
-    turno = TurnoCajero.objects.filter(
+    # Los totales son contadores del turno: una sola fila, sin agregaciones
+    turno = TurnoCajero.objects.select_related('caja').filter(
         cajero=request.user,
         activa=True,
         fecha_fin__isnull=True
@@ -348,6 +447,9 @@ def estado_caja_actual(request):
         'monto_inicial': float(turno.monto_inicial),
         'total_ventas': float(turno.total_ventas),
         'cantidad_ventas': turno.cantidad_ventas,
+        'totales_por_metodo': {
+            metodo: float(monto) for metodo, monto in turno.totales_por_metodo.items()
+        },
     })
 
 # Agregar estas nuevas funciones:
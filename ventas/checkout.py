@@ -0,0 +1,600 @@
+"""
+Motor de cobro del POS basado en operaciones por conjuntos.
+
+Un carrito se procesa con un número fijo de consultas, sin importar
+cuántos productos o pagos tenga:
+
+1. Un único ``SELECT ... FOR UPDATE`` ordenado por id que bloquea todos los
+   productos del carrito (el orden evita interbloqueos entre cajas).
+2. Validación de stock y precios en memoria.
+3. ``bulk_create`` de los detalles y de los pagos.
+4. Un único ``UPDATE ... SET stock_actual = CASE ... END`` para el stock y
+   un ``bulk_create`` de sus ``MovimientoStock``, con el stock anterior y
+   nuevo tomados de los valores bloqueados.
+5. Un único ``UPDATE`` con F() sobre los contadores del turno de caja y un
+   ``INSERT ... ON CONFLICT`` sobre el ReporteCaja del día.
+
+Los pagos con tarjeta de cantina se debitan con ``alumnos.saldo`` y se
+controlan contra el límite diario del alumno con ``alumnos.consumo``.
+
+El número de venta (``SecuenciaVenta``, una fila por día que comparten
+todas las cajas) se reserva después de actualizar stock, turno y reporte,
+justo antes de los INSERT de la venta y sus filas, para que ese bloqueo
+dure lo mínimo.
+
+Así el tiempo que se mantienen los bloqueos no crece con el tamaño de la
+bandeja y los cajeros no se serializan durante el recreo.
+
+``procesar_lote`` aplica de una vez las ventas que un POS encoló mientras
+estuvo sin conexión: bloquea los productos de todo el lote con un solo
+SELECT ... FOR UPDATE y registra cada venta en su propio savepoint, de
+modo que una venta en conflicto (sin stock, sin saldo) no descarta las demás.
+
+``anular_venta`` revierte una venta completada: repone stock, devuelve el
+saldo de la tarjeta y descuenta la venta de los contadores y del reporte.
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from alumnos.consumo import registrar_consumo, revertir_consumo
+from alumnos.models import Alumno
+from alumnos.saldo import acreditar_alumno, debitar_alumno
+from productos.alertas_stock import evaluar as evaluar_alertas_stock
+from productos.models import MovimientoStock, Producto
+from .models import DetalleVenta, MetodoPago, PagoVenta, ReporteCaja, TurnoCajero, Venta
+
+logger = logging.getLogger(__name__)
+
+
+def _decimal(valor, campo):
+    try:
+        return Decimal(str(valor))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f'Valor inválido para {campo}: {valor}')
+
+
+def normalizar_items(items):
+    """
+    Convierte los items recibidos del POS en un dict producto_id -> línea.
+
+    Los productos repetidos se agrupan en una sola línea porque
+    DetalleVenta es único por (venta, producto).
+    """
+    lineas = {}
+    for item in items:
+        try:
+            producto_id = int(item['producto_id'])
+            cantidad = int(item['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Item inválido: {item}')
+
+        if cantidad <= 0:
+            raise ValueError(f'Cantidad inválida para el producto {producto_id}')
+
+        precio = item.get('precio_unitario')
+        precio = _decimal(precio, 'precio_unitario') if precio not in (None, '') else None
+
+        linea = lineas.setdefault(producto_id, {'cantidad': 0, 'precio_unitario': precio})
+        linea['cantidad'] += cantidad
+    return lineas
+
+
+def normalizar_pagos(pagos):
+    """Valida la estructura de los pagos y convierte los montos a Decimal"""
+    resultado = []
+    for pago in pagos:
+        try:
+            metodo_pago_id = int(pago['metodo_pago_id'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Pago inválido: {pago}')
+
+        monto = _decimal(pago.get('monto'), 'monto')
+        if monto <= 0:
+            raise ValueError(f'Monto inválido para el método de pago {metodo_pago_id}')
+
+        resultado.append({
+            'metodo_pago_id': metodo_pago_id,
+            'monto': monto,
+            'metodo': pago.get('metodo'),
+            'referencia': pago.get('referencia', ''),
+            'observacion': pago.get('observacion', ''),
+        })
+    return resultado
+
+
+def bloquear_productos(producto_ids):
+    """
+    Bloquea todos los productos indicados con un único SELECT ... FOR UPDATE.
+
+    Retorna un dict id -> Producto. Los ids se bloquean en orden ascendente
+    para que dos cajas que venden los mismos productos no se interbloqueen.
+    """
+    productos = Producto.objects.select_for_update().filter(
+        id__in=producto_ids,
+        activo=True
+    ).order_by('id')
+    return {producto.id: producto for producto in productos}
+
+
+def cargar_metodos_pago(metodo_pago_ids):
+    """Carga los métodos de pago activos en una sola consulta"""
+    return MetodoPago.objects.filter(activo=True).in_bulk(set(metodo_pago_ids))
+
+
+def descontar_stock(descuentos):
+    """
+    Descuenta stock de varios productos con un único UPDATE ... CASE.
+
+    ``descuentos`` es un dict producto_id -> cantidad a restar.
+    """
+    if not descuentos:
+        return 0
+    return Producto.objects.filter(id__in=descuentos.keys()).update(
+        stock_actual=Case(
+            *[
+                When(id=producto_id, then=F('stock_actual') - Value(cantidad))
+                for producto_id, cantidad in descuentos.items()
+            ],
+            default=F('stock_actual'),
+            output_field=IntegerField()
+        )
+    )
+
+
+def registrar_movimientos_stock(productos, cambios, tipo, usuario, motivo):
+    """
+    Escribe en el libro de stock los cambios de una venta o anulación con un
+    único ``bulk_create``.
+
+    ``productos`` es el dict id -> Producto bloqueado, con ``stock_actual``
+    ya actualizado en memoria; ``cambios`` es producto_id -> cantidad con
+    signo (negativa para las salidas).
+    """
+    return MovimientoStock.objects.bulk_create([
+        MovimientoStock(
+            producto_id=producto_id,
+            tipo=tipo,
+            cantidad=cantidad,
+            stock_anterior=productos[producto_id].stock_actual - cantidad,
+            stock_nuevo=productos[producto_id].stock_actual,
+            motivo=motivo,
+            creado_por=usuario
+        )
+        for producto_id, cantidad in cambios.items()
+    ])
+
+
+def evaluar_alertas_al_confirmar(productos):
+    """
+    Las alertas de stock se evalúan después del commit, fuera de los
+    bloqueos del cobro, con el stock que haya en ese momento. Con ``robust=True`` un error al evaluarlas se
+    registra en el log y no convierte en error una venta ya confirmada.
+    """
+    producto_ids = [producto.id for producto in productos]
+    transaction.on_commit(lambda: evaluar_alertas_stock(producto_ids), robust=True)
+
+
+def acumular_venta(venta, pagos, signo=1):
+    """
+    Suma (o resta, con ``signo=-1``) una venta a los contadores de su turno
+    y al ReporteCaja de su día. ``pagos`` es una lista de (metodo, monto).
+    """
+    if venta.turno_cajero_id is None:
+        return
+
+    pagos_por_metodo = {}
+    for metodo, monto in pagos:
+        pagos_por_metodo[metodo] = pagos_por_metodo.get(metodo, 0) + signo * monto
+    TurnoCajero.acumular(venta.turno_cajero_id, signo * venta.total, pagos_por_metodo, cantidad=signo)
+
+    ReporteCaja.acumular(
+        timezone.localdate(venta.fecha), venta.turno_cajero.caja_id,
+        ventas=signo, monto=signo * venta.total
+    )
+
+
+def registrar_venta(usuario, turno, lineas, pagos, productos, metodos,
+                    alumno=None, descuento=Decimal('0.00'), notas='', fecha=None):
+    """
+    Valida en memoria y escribe una venta cuyos productos ya están bloqueados.
+
+    ``fecha`` es el momento en que se realizó la venta (ventas encoladas sin
+    conexión); por defecto, ahora.
+
+    ``productos`` debe venir de ``bloquear_productos`` y se actualiza en
+    memoria con el stock resultante, de modo que varias ventas de un mismo
+    lote (ver ingesta por lotes) se validen contra el stock correcto.
+    Debe llamarse dentro de ``transaction.atomic``.
+    """
+    # Validar stock y precios en memoria
+    detalles = []
+    subtotal = Decimal('0.00')
+    for producto_id, linea in lineas.items():
+        producto = productos.get(producto_id)
+        if producto is None:
+            raise ValueError(f'Producto no encontrado: {producto_id}')
+
+        cantidad = linea['cantidad']
+        precio_unitario = linea['precio_unitario'] or producto.precio
+        if precio_unitario <= 0:
+            raise ValueError(f'Precio inválido para {producto.nombre}')
+
+        if producto.stock_actual < cantidad:
+            raise ValueError(
+                f'Stock insuficiente para {producto.nombre}. Disponible: {producto.stock_actual}'
+            )
+
+        detalle = DetalleVenta(
+            producto=producto,
+            cantidad=cantidad,
+            precio_unitario=precio_unitario,
+            subtotal=cantidad * precio_unitario
+        )
+        subtotal += detalle.subtotal
+        detalles.append(detalle)
+
+    descuento = descuento or Decimal('0.00')
+    if descuento < 0 or descuento > subtotal:
+        raise ValueError(f'Descuento inválido: {descuento}')
+    total = subtotal - descuento
+
+    # Validar pagos en memoria
+    pagos_venta = []
+    total_pagos = Decimal('0.00')
+    monto_tarjeta_cantina = Decimal('0.00')
+    for pago in pagos:
+        metodo_pago = metodos.get(pago['metodo_pago_id'])
+        if metodo_pago is None:
+            raise ValueError(f'Método de pago no encontrado: {pago["metodo_pago_id"]}')
+
+        if metodo_pago.requiere_referencia and not pago['referencia']:
+            raise ValueError(f'Se requiere referencia para {metodo_pago.nombre}')
+
+        if metodo_pago.es_tarjeta_cantina:
+            metodo = 'SALDO'
+            monto_tarjeta_cantina += pago['monto']
+        else:
+            metodo = pago['metodo'] or 'EFECTIVO'
+
+        pago_venta = PagoVenta(
+            metodo_pago=metodo_pago,
+            metodo=metodo,
+            monto=pago['monto'],
+            referencia=pago['referencia'],
+            observacion=pago['observacion']
+        )
+        pago_venta.calcular_comision()
+        pagos_venta.append(pago_venta)
+        total_pagos += pago['monto']
+
+    if total_pagos < total:
+        raise ValueError(f'Los pagos ({total_pagos}) no cubren el total ({total})')
+
+    if monto_tarjeta_cantina > total:
+        raise ValueError('El pago con tarjeta de cantina no puede superar el total')
+
+    if monto_tarjeta_cantina and alumno is None:
+        raise ValueError('El pago con tarjeta de cantina requiere indicar el alumno')
+
+    # Escribir: venta, detalles, pagos y stock en un número fijo de consultas
+    venta = Venta(
+        usuario=usuario,
+        turno_cajero=turno,
+        alumno=alumno,
+        subtotal=subtotal,
+        descuento=descuento,
+        total=total,
+        monto_tarjeta_cantina=monto_tarjeta_cantina,
+        monto_otros_medios=total - monto_tarjeta_cantina,
+        estado='completada',
+        notas=notas or None,
+        fecha=fecha or timezone.now()
+    )
+
+    # Primero las filas que otras ventas también actualizan (límite diario,
+    # stock, turno y reporte de la caja); si algo falla aquí la venta se
+    # revierte sin haber tomado número
+    if monto_tarjeta_cantina:
+        registrar_consumo(alumno.id, monto_tarjeta_cantina, alumno.limite_consumo,
+                          fecha=timezone.localdate(venta.fecha))
+
+    descuentos = {detalle.producto_id: detalle.cantidad for detalle in detalles}
+    descontar_stock(descuentos)
+    for producto_id, cantidad in descuentos.items():
+        productos[producto_id].stock_actual -= cantidad
+
+    acumular_venta(venta, [(pago.metodo, pago.monto) for pago in pagos_venta])
+
+    # El número se reserva al final: la fila de SecuenciaVenta, compartida
+    # por todas las cajas, queda bloqueada solo durante los INSERT restantes
+    venta.numero_venta = venta.generar_numero_venta()
+    venta.save()
+
+    # Débito atómico del saldo: si falla, se revierte toda la venta (y su número)
+    if monto_tarjeta_cantina:
+        debitar_alumno(
+            alumno.id, monto_tarjeta_cantina, usuario=usuario,
+            descripcion=f'Venta {venta.numero_venta}'
+        )
+
+    for detalle in detalles:
+        detalle.venta = venta
+    DetalleVenta.objects.bulk_create(detalles)
+
+    for pago_venta in pagos_venta:
+        pago_venta.venta = venta
+    PagoVenta.objects.bulk_create(pagos_venta)
+
+    registrar_movimientos_stock(
+        productos, {producto_id: -cantidad for producto_id, cantidad in descuentos.items()},
+        'venta', usuario, f'Venta {venta.numero_venta}'
+    )
+    evaluar_alertas_al_confirmar([productos[producto_id] for producto_id in descuentos])
+
+    venta.cambio = total_pagos - total
+    return venta
+
+
+def anular_venta(venta_id, usuario=None, motivo=''):
+    """
+    Anula una venta completada en una transacción.
+
+    Repone el stock de sus productos, devuelve a la tarjeta lo cobrado con
+    saldo (movimiento 'devolucion') y descuenta la venta de los contadores
+    del turno y del ReporteCaja. Lanza ValueError si la venta no está
+    completada.
+    """
+    with transaction.atomic():
+        venta = Venta.objects.select_for_update(of=('self',)).select_related('turno_cajero').get(pk=venta_id)
+        if venta.estado != 'completada':
+            raise ValueError(f'La venta {venta.numero_venta} no está completada')
+
+        reposiciones = dict(venta.detalles.values_list('producto_id', 'cantidad'))
+        pagos = list(venta.pagos.values_list('metodo', 'monto'))
+
+        notas = '\n'.join(filter(None, [venta.notas, f'Anulada: {motivo}' if motivo else 'Anulada']))
+        Venta.objects.filter(pk=venta.pk).update(
+            estado='cancelada', notas=notas, fecha_actualizacion=timezone.now()
+        )
+        venta.estado = 'cancelada'
+        venta.notas = notas
+
+        # Mismo orden de bloqueo que el cobro para no interbloquearse con las cajas
+        repuestos = list(
+            Producto.objects.select_for_update().filter(id__in=reposiciones).order_by('id')
+            .only('id', 'nombre', 'stock_actual', 'stock_minimo')
+        )
+        descontar_stock({producto_id: -cantidad for producto_id, cantidad in reposiciones.items()})
+        for producto in repuestos:
+            producto.stock_actual += reposiciones[producto.id]
+        registrar_movimientos_stock(
+            {producto.id: producto for producto in repuestos}, reposiciones,
+            'devolucion', usuario, f'Anulación venta {venta.numero_venta}'
+        )
+        evaluar_alertas_al_confirmar(repuestos)
+
+        if venta.monto_tarjeta_cantina and venta.alumno_id:
+            acreditar_alumno(
+                venta.alumno_id, venta.monto_tarjeta_cantina, usuario=usuario,
+                descripcion=f'Anulación venta {venta.numero_venta}', tipo='devolucion'
+            )
+            revertir_consumo(venta.alumno_id, venta.monto_tarjeta_cantina, timezone.localdate(venta.fecha))
+
+        acumular_venta(venta, pagos, signo=-1)
+        return venta
+
+
+def procesar_carrito(usuario, turno, items, pagos, alumno=None,
+                     descuento=Decimal('0.00'), notas=''):
+    """
+    Procesa un carrito completo del POS en una transacción.
+
+    Lanza ValueError si algún item o pago no es válido; en ese caso no se
+    escribe nada. Retorna la Venta creada (con el atributo ``cambio``).
+    """
+    lineas = normalizar_items(items)
+    pagos = normalizar_pagos(pagos)
+    if not lineas:
+        raise ValueError('No hay productos en la venta')
+    if not pagos:
+        raise ValueError('No se especificaron métodos de pago')
+
+    # Los métodos de pago se leen antes de tomar bloqueos
+    metodos = cargar_metodos_pago(pago['metodo_pago_id'] for pago in pagos)
+
+    with transaction.atomic():
+        productos = bloquear_productos(lineas.keys())
+        return registrar_venta(
+            usuario, turno, lineas, pagos, productos, metodos,
+            alumno=alumno, descuento=descuento, notas=notas
+        )
+
+
+def _normalizar_venta_lote(venta):
+    """Valida la estructura de una venta encolada; no consulta la base"""
+    if not isinstance(venta, dict):
+        raise ValueError(f'Venta inválida: {venta}')
+    lineas = normalizar_items(venta.get('items') or [])
+    pagos = normalizar_pagos(venta.get('pagos') or [])
+    if not lineas:
+        raise ValueError('No hay productos en la venta')
+    if not pagos:
+        raise ValueError('No se especificaron métodos de pago')
+    cliente_id = venta.get('cliente_id')
+    turno_id = venta.get('turno_id')
+    try:
+        turno_id = int(turno_id) if turno_id else None
+    except (TypeError, ValueError):
+        raise ValueError(f'Turno inválido: {turno_id}')
+    return {
+        'lineas': lineas,
+        'pagos': pagos,
+        'cliente_id': int(cliente_id) if cliente_id else None,
+        'turno_id': turno_id,
+        'descuento': _decimal(venta.get('descuento', 0), 'descuento'),
+        'notas': venta.get('observaciones', ''),
+        'fecha': _fecha_lote(venta.get('fecha')),
+    }
+
+
+def _fecha_lote(valor):
+    """
+    Momento en que el POS registró la venta (ISO 8601, sin zona = hora
+    local). Una fecha futura por desfase del reloj del POS se lleva a ahora.
+    """
+    if not valor:
+        return None
+    fecha = parse_datetime(valor) if isinstance(valor, str) else None
+    if fecha is None:
+        raise ValueError(f'Fecha inválida: {valor}')
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return min(fecha, timezone.now())
+
+
+def _cargar_turnos_lote(usuario, turno, ventas):
+    """
+    Turnos del cajero a los que pueden pertenecer las ventas del lote, en
+    una sola consulta: los que el POS indicó y los que seguían abiertos en
+    la fecha más antigua del lote.
+    """
+    turnos = {turno.pk: turno} if turno else {}
+    turno_ids = {venta['turno_id'] for venta in ventas if venta['turno_id']}
+    fechas = [venta['fecha'] for venta in ventas if venta['fecha'] and not venta['turno_id']]
+    if not turno_ids and not fechas:
+        return turnos
+    filtro = Q(pk__in=turno_ids)
+    if fechas:
+        filtro |= Q(fecha_inicio__lte=max(fechas)) & (
+            Q(fecha_fin__isnull=True) | Q(fecha_fin__gt=min(fechas))
+        )
+    turnos.update(
+        (t.pk, t) for t in TurnoCajero.objects.filter(filtro, cajero=usuario).order_by('fecha_inicio')
+    )
+    return turnos
+
+
+def _turno_de_la_venta(venta, turnos, turno):
+    """
+    Turno al que corresponde una venta encolada: el que indicó el POS o,
+    si no, el del cajero que estaba abierto a la hora de la venta. Sin
+    ninguno de los dos datos, el turno activo.
+
+    Lanza ValueError si el turno ya se cerró: sus totales ya se rindieron
+    y la venta debe revisarse a mano.
+    """
+    if venta['turno_id']:
+        encontrado = turnos.get(venta['turno_id'])
+        if encontrado is None:
+            raise ValueError(f'Turno no encontrado: {venta["turno_id"]}')
+    elif venta['fecha']:
+        encontrado = next((
+            t for t in turnos.values()
+            if t.fecha_inicio <= venta['fecha'] and (t.fecha_fin is None or venta['fecha'] < t.fecha_fin)
+        ), None)
+        if encontrado is None:
+            raise ValueError('No hay un turno del cajero a la hora de la venta')
+    else:
+        encontrado = turno
+    if encontrado is None:
+        raise ValueError('No tienes un turno activo')
+    if encontrado.fecha_fin is not None or not encontrado.activa:
+        raise ValueError(f'El turno {encontrado.pk} ya está cerrado')
+    return encontrado
+
+
+def procesar_lote(usuario, turno, ventas, tamano_bloque=None):
+    """
+    Registra un lote de ventas encoladas por un POS sin conexión.
+
+    Cada venta tiene la forma de ``procesar_carrito`` (``items``, ``pagos``,
+    ``cliente_id``, ``descuento``, ``observaciones``) más un ``id_local``
+    opcional con el que el POS reconoce el resultado y la ``fecha`` en que
+    se hizo la venta (por defecto, la de la ingesta).
+
+    Cada venta se imputa al ``turno_id`` que envía el POS o, si no lo
+    envía, al turno del cajero abierto a la hora de la venta; ``turno``
+    (el turno activo) se usa solo para las ventas sin fecha. Las ventas de
+    un turno ya cerrado se rechazan.
+
+    Las ventas se aplican en orden, en bloques de ``tamano_bloque`` ventas
+    por transacción (``VENTAS_LOTE_BLOQUE``; 0 = todo el lote en una sola).
+    En cada bloque los productos se bloquean una única vez. Una venta que
+    falla (validación o error de la base) se revierte en su savepoint y se
+    informa como rechazada sin afectar a las demás.
+
+    Retorna una lista con un resultado por venta, en el mismo orden:
+    ``{'id_local', 'ok': True, 'venta'}`` o ``{'id_local', 'ok': False, 'error'}``.
+    """
+    if tamano_bloque is None:
+        tamano_bloque = getattr(settings, 'VENTAS_LOTE_BLOQUE', 0)
+
+    resultados = []
+    validas = []
+    for venta in ventas:
+        resultado = {'id_local': venta.get('id_local') if isinstance(venta, dict) else None}
+        resultados.append(resultado)
+        try:
+            validas.append((resultado, _normalizar_venta_lote(venta)))
+        except ValueError as e:
+            resultado.update(ok=False, error=str(e))
+
+    # Métodos de pago y alumnos de todo el lote en una consulta cada uno
+    metodos = cargar_metodos_pago(
+        pago['metodo_pago_id'] for _, venta in validas for pago in venta['pagos']
+    )
+    alumnos = Alumno.objects.filter(activo=True).in_bulk(
+        {venta['cliente_id'] for _, venta in validas if venta['cliente_id']}
+    )
+    turnos = _cargar_turnos_lote(usuario, turno, [venta for _, venta in validas])
+
+    tamano_bloque = tamano_bloque or len(validas) or 1
+    for inicio in range(0, len(validas), tamano_bloque):
+        bloque = validas[inicio:inicio + tamano_bloque]
+        with transaction.atomic():
+            productos = bloquear_productos(
+                {producto_id for _, venta in bloque for producto_id in venta['lineas']}
+            )
+            for resultado, venta in bloque:
+                alumno = None
+                if venta['cliente_id']:
+                    alumno = alumnos.get(venta['cliente_id'])
+                    if alumno is None:
+                        resultado.update(ok=False, error=f'Cliente no encontrado: {venta["cliente_id"]}')
+                        continue
+                try:
+                    turno_venta = _turno_de_la_venta(venta, turnos, turno)
+                except ValueError as e:
+                    resultado.update(ok=False, error=str(e))
+                    continue
+                # registrar_venta descuenta el stock en memoria; si la venta se
+                # revierte, las siguientes deben validarse contra el anterior
+                stock_previo = {
+                    producto_id: productos[producto_id].stock_actual
+                    for producto_id in venta['lineas'] if producto_id in productos
+                }
+                try:
+                    with transaction.atomic():
+                        resultado['venta'] = registrar_venta(
+                            usuario, turno_venta, venta['lineas'], venta['pagos'], productos, metodos,
+                            alumno=alumno, descuento=venta['descuento'], notas=venta['notas'],
+                            fecha=venta['fecha']
+                        )
+                    resultado['ok'] = True
+                    continue
+                except ValueError as e:
+                    error = str(e)
+                except DatabaseError:
+                    logger.exception('Error de base de datos en la venta %s del lote', resultado['id_local'])
+                    error = 'Error de base de datos al registrar la venta'
+                for producto_id, stock in stock_previo.items():
+                    productos[producto_id].stock_actual = stock
+                resultado.update(ok=False, error=error)
+
+    return resultados
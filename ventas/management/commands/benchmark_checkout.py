@@ -0,0 +1,105 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from productos.models import Categoria, Producto
+from ventas.checkout import procesar_carrito, procesar_lote
+from ventas.models import Caja, MetodoPago, TurnoCajero
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y latencia (p50/p95) del motor de cobro por tamaño de carrito'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='1,4,12,24',
+                            help='Tamaños de carrito separados por coma')
+        parser.add_argument('--iteraciones', type=int, default=50,
+                            help='Ventas a procesar por tamaño de carrito')
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Ventas encoladas a subir de una vez (0 para omitir)')
+
+    def handle(self, *args, **options):
+        tamanos = [int(t) for t in options['tamanos'].split(',')]
+        iteraciones = options['iteraciones']
+
+        # Todos los datos de prueba se crean y descartan dentro de una transacción
+        with transaction.atomic():
+            usuario, turno, productos, metodo = self._crear_datos(max(tamanos))
+
+            self.stdout.write('items | consultas | p50 (ms) | p95 (ms)')
+            self.stdout.write('-' * 42)
+            for tamano in tamanos:
+                items = [{'producto_id': p.id, 'cantidad': 1} for p in productos[:tamano]]
+                total = sum((p.precio for p in productos[:tamano]), Decimal('0'))
+                pagos = [{'metodo_pago_id': metodo.id, 'monto': str(total)}]
+
+                tiempos = []
+                consultas = 0
+                for _ in range(iteraciones):
+                    with CaptureQueriesContext(connection) as contexto:
+                        inicio = time.perf_counter()
+                        procesar_carrito(usuario, turno, items, pagos)
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                    consultas = len(contexto.captured_queries)
+
+                p50 = statistics.median(tiempos)
+                p95 = statistics.quantiles(tiempos, n=20)[-1] if len(tiempos) > 1 else tiempos[0]
+                self.stdout.write(f'{tamano:5d} | {consultas:9d} | {p50:8.2f} | {p95:8.2f}')
+
+            if options['lote']:
+                self._medir_lote(usuario, turno, productos, metodo, options['lote'])
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark completado (datos de prueba descartados)'))
+
+    def _medir_lote(self, usuario, turno, productos, metodo, cantidad):
+        """Compara subir ventas encoladas de a una contra procesar_lote"""
+        ventas = [
+            {
+                'id_local': i,
+                'items': [{'producto_id': p.id, 'cantidad': 1} for p in productos[i % 4:i % 4 + 4]],
+                'pagos': [{'metodo_pago_id': metodo.id, 'monto': '20000'}],
+            }
+            for i in range(cantidad)
+        ]
+
+        inicio = time.perf_counter()
+        for venta in ventas:
+            procesar_carrito(usuario, turno, venta['items'], venta['pagos'])
+        de_a_una = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resultados = procesar_lote(usuario, turno, ventas)
+        en_lote = time.perf_counter() - inicio
+
+        procesadas = sum(1 for resultado in resultados if resultado['ok'])
+        self.stdout.write('')
+        self.stdout.write(f'Lote de {cantidad} ventas ({procesadas} procesadas):')
+        self.stdout.write(f'  de a una:      {de_a_una * 1000:9.1f} ms')
+        self.stdout.write(f'  procesar_lote: {en_lote * 1000:9.1f} ms')
+
+    def _crear_datos(self, cantidad_productos):
+        User = get_user_model()
+        usuario = User.objects.create_user(username='benchmark_checkout', password='benchmark')
+        caja = Caja.objects.create(numero=9999, nombre='Caja Benchmark')
+        turno = TurnoCajero.objects.create(cajero=usuario, caja=caja, monto_inicial=Decimal('0'))
+        metodo = MetodoPago.objects.create(nombre='Efectivo Benchmark')
+        categoria = Categoria.objects.create(nombre='Benchmark')
+        Producto.objects.bulk_create([
+            Producto(
+                codigo=f'BENCH{i:05d}',
+                nombre=f'Producto benchmark {i}',
+                categoria=categoria,
+                precio=Decimal('5000'),
+                stock_actual=1_000_000
+            )
+            for i in range(cantidad_productos)
+        ])
+        productos = list(Producto.objects.filter(categoria=categoria).order_by('id'))
+        return usuario, turno, productos, metodo
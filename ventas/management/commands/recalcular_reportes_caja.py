@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ventas.models import ReporteCaja, TurnoCajero, Venta
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los ReporteCaja diarios desde Venta y TurnoCajero'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a reconstruir (AAAA-MM-DD); por defecto, todo')
+        parser.add_argument('--hasta', help='Último día a reconstruir (AAAA-MM-DD); por defecto, hoy')
+
+    def _fecha(self, valor, opcion):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'--{opcion} debe tener el formato AAAA-MM-DD')
+
+    def handle(self, *args, **options):
+        hasta = self._fecha(options['hasta'], 'hasta') if options['hasta'] else timezone.localdate()
+        desde = self._fecha(options['desde'], 'desde') if options['desde'] else None
+
+        ventas = Venta.objects.filter(estado='completada', turno_cajero__isnull=False)
+        turnos = TurnoCajero.objects.filter(fecha_fin__isnull=False)
+        reportes = ReporteCaja.objects.filter(fecha__lte=hasta)
+        fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+        ventas = ventas.filter(fecha__lt=fin)
+        turnos = turnos.filter(fecha_inicio__lt=fin)
+        if desde:
+            inicio = timezone.make_aware(datetime.combine(desde, datetime.min.time()))
+            ventas = ventas.filter(fecha__gte=inicio)
+            turnos = turnos.filter(fecha_inicio__gte=inicio)
+            reportes = reportes.filter(fecha__gte=desde)
+
+        filas = {}
+
+        def fila(fecha, caja_id):
+            return filas.setdefault((fecha, caja_id), ReporteCaja(fecha=fecha, caja_id=caja_id))
+
+        por_dia = ventas.annotate(dia=TruncDate('fecha')).values('dia', 'turno_cajero__caja').annotate(
+            cantidad=Count('id'), monto=Sum('total')
+        ).order_by()
+        for datos in por_dia:
+            reporte = fila(datos['dia'], datos['turno_cajero__caja'])
+            reporte.ventas_total = datos['cantidad']
+            reporte.monto_total = datos['monto']
+
+        diferencia = ExpressionWrapper(
+            F('monto_final') - F('monto_inicial') - F('total_ventas'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+        cierres = turnos.annotate(dia=TruncDate('fecha_inicio')).values('dia', 'caja').annotate(
+            cantidad=Count('id'), diferencias=Sum(diferencia)
+        ).order_by()
+        for datos in cierres:
+            reporte = fila(datos['dia'], datos['caja'])
+            reporte.turnos_total = datos['cantidad']
+            reporte.diferencias_total = datos['diferencias'] or 0
+
+        with transaction.atomic():
+            eliminados, _ = reportes.delete()
+            ReporteCaja.objects.bulk_create(filas.values(), batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(filas)} reportes de caja reconstruidos ({eliminados} reemplazados)'
+        ))
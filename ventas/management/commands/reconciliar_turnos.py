@@ -0,0 +1,72 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from ventas.models import PagoVenta, TurnoCajero, Venta
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de los turnos desde Venta/PagoVenta y reporta diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turno', type=int, help='Reconciliar solo este turno')
+        parser.add_argument('--desde', help='Turnos iniciados desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--solo-reportar', action='store_true',
+                            help='Reportar las diferencias sin corregirlas')
+
+    def handle(self, *args, **options):
+        turnos = TurnoCajero.objects.order_by('id')
+        if options['turno']:
+            turnos = turnos.filter(pk=options['turno'])
+        if options['desde']:
+            try:
+                desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--desde debe tener el formato AAAA-MM-DD')
+            turnos = turnos.filter(fecha_inicio__date__gte=desde)
+
+        campos = TurnoCajero.CAMPOS_CONTADORES
+        esperados = self._calcular(turnos)
+
+        con_diferencias = 0
+        with transaction.atomic():
+            for turno in turnos.select_for_update().only('id', *campos):
+                esperado = esperados.get(turno.id, {})
+                correccion = {}
+                for campo in campos:
+                    valor = esperado.get(campo, 0)
+                    if getattr(turno, campo) != valor:
+                        correccion[campo] = valor
+                        self.stdout.write(f'Turno {turno.id}: {campo} {getattr(turno, campo)} -> {valor}')
+
+                if correccion:
+                    con_diferencias += 1
+                    if not options['solo_reportar']:
+                        TurnoCajero.objects.filter(pk=turno.id).update(**correccion)
+
+        accion = 'con diferencias' if options['solo_reportar'] else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(f'{con_diferencias} turnos {accion}'))
+
+    def _calcular(self, turnos):
+        """Contadores esperados por turno, con dos consultas agrupadas"""
+        esperados = {}
+        ventas = Venta.objects.filter(estado='completada', turno_cajero__in=turnos).values(
+            'turno_cajero'
+        ).annotate(total=Sum('total'), cantidad=Count('id')).order_by()
+        for fila in ventas:
+            esperados[fila['turno_cajero']] = {
+                'total_ventas': fila['total'] or Decimal('0.00'),
+                'cantidad_ventas': fila['cantidad'],
+            }
+
+        pagos = PagoVenta.objects.filter(
+            venta__estado='completada', venta__turno_cajero__in=turnos
+        ).values('venta__turno_cajero', 'metodo').annotate(total=Sum('monto')).order_by()
+        for fila in pagos:
+            campo = TurnoCajero.CAMPOS_POR_METODO.get(fila['metodo'], 'total_otro')
+            esperado = esperados.setdefault(fila['venta__turno_cajero'], {})
+            esperado[campo] = esperado.get(campo, 0) + fila['total']
+        return esperados
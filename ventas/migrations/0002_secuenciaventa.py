@@ -0,0 +1,44 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:37
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def inicializar_secuencia_hoy(apps, schema_editor):
+    """Continúa la numeración de las ventas ya emitidas hoy con el esquema anterior"""
+    Venta = apps.get_model('ventas', 'Venta')
+    SecuenciaVenta = apps.get_model('ventas', 'SecuenciaVenta')
+    hoy = timezone.localdate()
+    prefijo = f"V{hoy.strftime('%Y%m%d')}"
+    numeros = Venta.objects.filter(numero_venta__startswith=prefijo).values_list('numero_venta', flat=True)
+    ultimo = max((int(n[len(prefijo):]) for n in numeros if n[len(prefijo):].isdigit()), default=0)
+    if ultimo:
+        SecuenciaVenta.objects.create(fecha=hoy, caja=0, ultimo_numero=ultimo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('caja', models.PositiveIntegerField(default=0, help_text='Número de caja, o 0 para la secuencia general del día')),
+                ('ultimo_numero', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Venta',
+                'verbose_name_plural': 'Secuencias de Venta',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='secuenciaventa',
+            constraint=models.UniqueConstraint(fields=('fecha', 'caja'), name='ventas_secuencia_fecha_caja_uniq'),
+        ),
+        migrations.RunPython(inicializar_secuencia_hoy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:51
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+CAMPOS_POR_METODO = {
+    'EFECTIVO': 'total_efectivo',
+    'TARJETA_CREDITO': 'total_tarjeta_credito',
+    'TARJETA_DEBITO': 'total_tarjeta_debito',
+    'TRANSFERENCIA': 'total_transferencia',
+    'QR_WALLET': 'total_qr_wallet',
+    'SALDO': 'total_saldo',
+    'CHEQUE': 'total_cheque',
+    'OTRO': 'total_otro',
+}
+
+
+def calcular_contadores(apps, schema_editor):
+    """Inicializa los contadores de los turnos existentes"""
+    TurnoCajero = apps.get_model('ventas', 'TurnoCajero')
+    Venta = apps.get_model('ventas', 'Venta')
+    PagoVenta = apps.get_model('ventas', 'PagoVenta')
+
+    contadores = {}
+    ventas = Venta.objects.filter(estado='completada', turno_cajero__isnull=False).values(
+        'turno_cajero'
+    ).annotate(total=Sum('total'), cantidad=Count('id')).order_by()
+    for fila in ventas:
+        contadores[fila['turno_cajero']] = {'total_ventas': fila['total'], 'cantidad_ventas': fila['cantidad']}
+
+    pagos = PagoVenta.objects.filter(venta__estado='completada', venta__turno_cajero__isnull=False).values(
+        'venta__turno_cajero', 'metodo'
+    ).annotate(total=Sum('monto')).order_by()
+    for fila in pagos:
+        campo = CAMPOS_POR_METODO.get(fila['metodo'], 'total_otro')
+        contador = contadores.setdefault(fila['venta__turno_cajero'], {})
+        contador[campo] = contador.get(campo, 0) + fila['total']
+
+    for turno_id, valores in contadores.items():
+        TurnoCajero.objects.filter(pk=turno_id).update(**valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0002_secuenciaventa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turnocajero',
+            name='cantidad_ventas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_cheque',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_efectivo',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_otro',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_qr_wallet',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_saldo',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_tarjeta_credito',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_tarjeta_debito',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_transferencia',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='turnocajero',
+            name='total_ventas',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
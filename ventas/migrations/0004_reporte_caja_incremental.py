@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0003_contadores_turno'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportecaja',
+            name='alumnos_atendidos',
+            field=models.PositiveIntegerField(default=0, help_text='Alumnos distintos atendidos en la caja'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['alumno', 'fecha'], name='ventas_vent_alumno__bfe97d_idx'),
+        ),
+    ]
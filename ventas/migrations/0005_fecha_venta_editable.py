@@ -0,0 +1,19 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0004_reporte_caja_incremental'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
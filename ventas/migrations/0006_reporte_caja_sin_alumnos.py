@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0005_fecha_venta_editable'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reportecaja',
+            name='alumnos_atendidos',
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.16 on 2026-10-18 19:05
+
+import re
+from datetime import datetime
+
+from django.db import migrations
+
+NUMERO_VENTA = re.compile(r'^V(\d{8})(?:-(\d+)-)?(\d+)$')
+
+
+def inicializar_secuencias_anteriores(apps, schema_editor):
+    """
+    Continúa la numeración de todos los días con ventas, no solo la de hoy:
+    una venta sin conexión con fecha pasada reserva en la secuencia de su
+    día y no debe repetir un numero_venta ya emitido.
+    """
+    Venta = apps.get_model('ventas', 'Venta')
+    SecuenciaVenta = apps.get_model('ventas', 'SecuenciaVenta')
+
+    ultimos = {}
+    for numero_venta in Venta.objects.values_list('numero_venta', flat=True).iterator():
+        coincidencia = NUMERO_VENTA.match(numero_venta or '')
+        if not coincidencia:
+            continue
+        dia, caja, numero = coincidencia.groups()
+        try:
+            clave = (datetime.strptime(dia, '%Y%m%d').date(), int(caja or 0))
+        except ValueError:
+            continue
+        ultimos[clave] = max(ultimos.get(clave, 0), int(numero))
+
+    existentes = {(s.fecha, s.caja): s for s in SecuenciaVenta.objects.all()}
+    nuevas = []
+    for (fecha, caja), ultimo in ultimos.items():
+        secuencia = existentes.get((fecha, caja))
+        if secuencia is None:
+            nuevas.append(SecuenciaVenta(fecha=fecha, caja=caja, ultimo_numero=ultimo))
+        elif secuencia.ultimo_numero < ultimo:
+            secuencia.ultimo_numero = ultimo
+            secuencia.save(update_fields=['ultimo_numero'])
+    SecuenciaVenta.objects.bulk_create(nuevas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0006_reporte_caja_sin_alumnos'),
+    ]
+
+    operations = [
+        migrations.RunPython(inicializar_secuencias_anteriores, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models, transaction
+from django.conf import settings
+from django.db import connection, models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 from usuarios.models import CustomUser
 from alumnos.models import Alumno
@@ -73,6 +75,43 @@ class TurnoCajero(models.Model):
     observaciones_cierre = models.TextField(blank=True, null=True)
     activa = models.BooleanField(default=True)
     
+    # Contadores acumulados por el cobro (ventas completadas del turno).
+    # Se actualizan con F() en la misma transacción de la venta; el comando
+    # reconciliar_turnos los recalcula desde Venta/PagoVenta.
+    total_ventas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cantidad_ventas = models.PositiveIntegerField(default=0)
+    total_efectivo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_tarjeta_credito = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_tarjeta_debito = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_transferencia = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_qr_wallet = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_saldo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_cheque = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_otro = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # PagoVenta.metodo -> campo acumulador
+    CAMPOS_POR_METODO = {
+        'EFECTIVO': 'total_efectivo',
+        'TARJETA_CREDITO': 'total_tarjeta_credito',
+        'TARJETA_DEBITO': 'total_tarjeta_debito',
+        'TRANSFERENCIA': 'total_transferencia',
+        'QR_WALLET': 'total_qr_wallet',
+        'SALDO': 'total_saldo',
+        'CHEQUE': 'total_cheque',
+        'OTRO': 'total_otro',
+    }
+    CAMPOS_CONTADORES = ('total_ventas', 'cantidad_ventas', *CAMPOS_POR_METODO.values())
+    
+    def save(self, *args, **kwargs):
+        # Los contadores solo cambian con acumular(): guardar una instancia
+        # leída antes de otras ventas no debe pisarlos
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_CONTADORES
+            ]
+        super().save(*args, **kwargs)
+    
     def clean(self):
         # Validar que no haya otro turno activo para la misma caja
         if self.activa and self.fecha_fin is None:  # Cambiar 'activo' por 'activa'
@@ -85,17 +124,31 @@ class TurnoCajero(models.Model):
             if turnos_activos.exists():
                 raise ValidationError(f'Ya hay un turno activo en la {self.caja}')
     
-    @property
-    def total_ventas(self):
-        """Calcula el total de ventas durante este turno"""
-        return self.ventas.filter(estado='completada').aggregate(
-            total=models.Sum('total')
-        )['total'] or Decimal('0.00')
+    @classmethod
+    def acumular(cls, turno_id, total, pagos_por_metodo, cantidad=1):
+        """
+        Suma una venta a los contadores del turno con un único UPDATE.
+        
+        ``pagos_por_metodo`` es un dict PagoVenta.metodo -> monto. Para
+        revertir una venta se pasan montos negativos y ``cantidad=-1``.
+        """
+        cambios = {
+            'total_ventas': models.F('total_ventas') + total,
+            'cantidad_ventas': models.F('cantidad_ventas') + cantidad,
+        }
+        for metodo, monto in pagos_por_metodo.items():
+            campo = cls.CAMPOS_POR_METODO.get(metodo, 'total_otro')
+            cambios[campo] = cambios.get(campo, models.F(campo)) + monto
+        return cls.objects.filter(pk=turno_id).update(**cambios)
     
     @property
-    def cantidad_ventas(self):
-        """Cantidad de ventas realizadas en el turno"""
-        return self.ventas.filter(estado='completada').count()
+    def totales_por_metodo(self):
+        """Montos cobrados por método de pago (solo los que tienen movimiento)"""
+        return {
+            metodo: getattr(self, campo)
+            for metodo, campo in self.CAMPOS_POR_METODO.items()
+            if getattr(self, campo)
+        }
     
     @property
     def diferencia(self):
@@ -112,12 +165,27 @@ class TurnoCajero(models.Model):
         return fin - self.fecha_inicio
     
     def cerrar_turno(self, monto_final, observaciones_cierre=""):
-        """Cierra el turno del cajero"""
-        self.monto_final = monto_final
-        self.fecha_fin = timezone.now()
-        self.observaciones_cierre = observaciones_cierre
-        self.activa = False  # Cambiar 'activo' por 'activa'
-        self.save()
+        """Cierra el turno del cajero y lo suma al ReporteCaja del día"""
+        with transaction.atomic():
+            # Contadores vigentes (y bloqueo) para calcular la diferencia una sola vez
+            actual = TurnoCajero.objects.select_for_update().only(
+                'fecha_fin', *self.CAMPOS_CONTADORES
+            ).get(pk=self.pk)
+            if actual.fecha_fin is not None:
+                raise ValueError('El turno ya está cerrado')
+            for campo in self.CAMPOS_CONTADORES:
+                setattr(self, campo, getattr(actual, campo))
+            
+            self.monto_final = Decimal(str(monto_final))
+            self.fecha_fin = timezone.now()
+            self.observaciones_cierre = observaciones_cierre
+            self.activa = False  # Cambiar 'activo' por 'activa'
+            self.save()
+            
+            ReporteCaja.acumular(
+                timezone.localdate(self.fecha_inicio), self.caja_id,
+                turnos=1, diferencias=self.diferencia
+            )
     
     def __str__(self):
         return f"{self.cajero.get_full_name()} - {self.caja} ({self.fecha_inicio.strftime('%d/%m/%Y %H:%M')})"
@@ -127,6 +195,76 @@ class TurnoCajero(models.Model):
         verbose_name_plural = "Turnos de Cajeros"
         ordering = ['-fecha_inicio']
 
+class SecuenciaVenta(models.Model):
+    """
+    Contador de números de venta por día (y opcionalmente por caja).
+
+    Reemplaza al count()+1 sobre las ventas del día: cada asignación es un
+    único INSERT ... ON CONFLICT DO UPDATE ... RETURNING sobre una fila, por
+    lo que cuesta O(1) y dos cajas nunca obtienen el mismo número. Como la
+    fila queda bloqueada hasta el commit de la venta, una venta revertida
+    también revierte su número y la numeración no tiene huecos; por eso
+    conviene reservar al final de la transacción (ver
+    ``ventas.checkout.registrar_venta``).
+    """
+    CAJA_GENERAL = 0
+
+    fecha = models.DateField()
+    caja = models.PositiveIntegerField(
+        default=CAJA_GENERAL,
+        help_text="Número de caja, o 0 para la secuencia general del día"
+    )
+    ultimo_numero = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Secuencia de Venta"
+        verbose_name_plural = "Secuencias de Venta"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'caja'], name='ventas_secuencia_fecha_caja_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - caja {self.caja}: {self.ultimo_numero}"
+
+    @classmethod
+    def reservar(cls, fecha, caja=CAJA_GENERAL, cantidad=1):
+        """
+        Reserva ``cantidad`` números consecutivos y retorna el rango reservado.
+
+        Debe llamarse dentro de la misma transacción que inserta las ventas
+        para que la numeración sea continua.
+        """
+        tabla = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tabla} (fecha, caja, ultimo_numero) VALUES (%s, %s, %s) "
+                f"ON CONFLICT (fecha, caja) DO UPDATE "
+                f"SET ultimo_numero = {tabla}.ultimo_numero + EXCLUDED.ultimo_numero "
+                f"RETURNING ultimo_numero",
+                [connection.ops.adapt_datefield_value(fecha), caja, cantidad]
+            )
+            ultimo = cursor.fetchone()[0]
+        return range(ultimo - cantidad + 1, ultimo + 1)
+
+    @staticmethod
+    def formatear(fecha, numero, caja=CAJA_GENERAL):
+        """Arma el numero_venta: V202501010001 o, por caja, V20250101-02-0001"""
+        if caja == SecuenciaVenta.CAJA_GENERAL:
+            return f"V{fecha.strftime('%Y%m%d')}{numero:04d}"
+        return f"V{fecha.strftime('%Y%m%d')}-{caja:02d}-{numero:04d}"
+
+    @classmethod
+    def reservar_bloque(cls, caja, cantidad, fecha=None):
+        """
+        Pre-asigna un bloque de números para una caja (p.ej. ingesta por lotes).
+
+        Los números no usados del bloque quedan como huecos, por eso solo
+        conviene pedir bloques del tamaño del lote a procesar.
+        """
+        fecha = fecha or timezone.localdate()
+        return [cls.formatear(fecha, numero, caja) for numero in cls.reservar(fecha, caja, cantidad)]
+
+
 class Venta(models.Model):
     """Modelo para registrar ventas con lógica de facturación diferenciada"""
     ESTADO_CHOICES = [
@@ -144,7 +282,8 @@ class Venta(models.Model):
     
     # Campos básicos
     numero_venta = models.CharField(max_length=20, unique=True)
-    fecha = models.DateTimeField(auto_now_add=True)
+    # Por defecto el momento del alta; las ventas encoladas sin conexión traen la suya
+    fecha = models.DateTimeField(default=timezone.now)
     usuario = models.ForeignKey('usuarios.CustomUser', on_delete=models.PROTECT, related_name='ventas')
     alumno = models.ForeignKey('alumnos.Alumno', on_delete=models.PROTECT, related_name='compras', null=True, blank=True)
     turno_cajero = models.ForeignKey(TurnoCajero, on_delete=models.PROTECT, related_name='ventas', null=True, blank=True)
@@ -204,6 +343,7 @@ class Venta(models.Model):
             models.Index(fields=['fecha']),
             models.Index(fields=['estado']),
             models.Index(fields=['usuario']),
+            models.Index(fields=['alumno', 'fecha']),
         ]
 
     def __str__(self):
@@ -260,18 +400,27 @@ class Venta(models.Model):
             )
     
     def save(self, *args, **kwargs):
-        if not self.numero_venta:
-            # Generar número de venta automáticamente
-            from django.utils import timezone
-            today = timezone.now()
-            count = Venta.objects.filter(fecha__date=today.date()).count() + 1
-            self.numero_venta = f"V{today.strftime('%Y%m%d')}{count:04d}"
-        
         # Determinar el tipo de comprobante automáticamente
         if not self.tipo_comprobante:
             self.tipo_comprobante = self.determinar_tipo_comprobante()
         
-        super().save(*args, **kwargs)
+        if self.numero_venta:
+            super().save(*args, **kwargs)
+            return
+        
+        # Generar número de venta en la misma transacción que el INSERT
+        with transaction.atomic():
+            self.numero_venta = self.generar_numero_venta()
+            super().save(*args, **kwargs)
+    
+    def generar_numero_venta(self):
+        """Obtiene el siguiente número del día de la venta desde SecuenciaVenta"""
+        hoy = timezone.localdate(self.fecha)
+        caja = SecuenciaVenta.CAJA_GENERAL
+        if getattr(settings, 'VENTAS_NUMERACION_POR_CAJA', False) and self.turno_cajero_id:
+            caja = self.turno_cajero.caja.numero
+        numero = SecuenciaVenta.reservar(hoy, caja)[0]
+        return SecuenciaVenta.formatear(hoy, numero, caja)
 
 
 class PagoVenta(models.Model):
@@ -376,10 +525,11 @@ class PagoVenta(models.Model):
     fecha = models.DateTimeField(default=timezone.now)
     aprobado = models.BooleanField(default=True)
     
-    def save(self, *args, **kwargs):
+    def calcular_comision(self):
+        """Asigna tasa y monto_final según el método (también usado antes de bulk_create)"""
         if self.monto <= 0:
             raise ValueError("El monto debe ser mayor a cero.")
-        
+
         # Calcular tasa según método de pago
         if self.metodo == 'TARJETA_CREDITO':
             self.tasa = Decimal('5.0')
@@ -389,9 +539,12 @@ class PagoVenta(models.Model):
             self.tasa = Decimal('1.5')
         else:
             self.tasa = Decimal('0.0')
-        
+
         # Calcular monto final con comisión
         self.monto_final = self.monto + (self.monto * self.tasa / 100)
+
+    def save(self, *args, **kwargs):
+        self.calcular_comision()
         super().save(*args, **kwargs)
     
     def clean(self):
@@ -446,6 +599,16 @@ class AuthorizationCode(models.Model):
 class ReporteCaja(models.Model):
     """
     Reporte consolidado de caja por día/turno.
+    
+    Se mantiene de forma incremental: el cobro y la anulación de ventas
+    suman/restan ventas y monto, y el cierre de turno suma turnos y
+    diferencias (ver ``acumular``). El comando ``recalcular_reportes_caja``
+    lo reconstruye desde Venta/TurnoCajero.
+    
+    Los alumnos atendidos no se guardan por caja: la suma entre cajas
+    contaría dos veces al alumno que compró en dos, y llevarlos al día
+    costaba una consulta por venta con tarjeta. ``resumen_del_dia`` los
+    cuenta una vez para todo el día.
     """
     fecha = models.DateField()
     caja = models.ForeignKey(Caja, on_delete=models.PROTECT)
@@ -455,6 +618,62 @@ class ReporteCaja(models.Model):
     diferencias_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     generado_el = models.DateTimeField(auto_now_add=True)
     
+    @classmethod
+    def acumular(cls, fecha, caja_id, ventas=0, monto=0, turnos=0, diferencias=0):
+        """
+        Suma los valores indicados al reporte (fecha, caja) con un único
+        INSERT ... ON CONFLICT DO UPDATE; crea la fila si no existe.
+        
+        Para revertir se pasan valores negativos; en ese caso la fila ya
+        existe y basta un UPDATE (el INSERT violaría los CHECK >= 0).
+        """
+        if min(ventas, turnos) < 0:
+            return cls.objects.filter(fecha=fecha, caja_id=caja_id).update(
+                ventas_total=models.F('ventas_total') + ventas,
+                monto_total=models.F('monto_total') + monto,
+                turnos_total=models.F('turnos_total') + turnos,
+                diferencias_total=models.F('diferencias_total') + diferencias,
+            )
+        
+        tabla = connection.ops.quote_name(cls._meta.db_table)
+        columnas = ['turnos_total', 'ventas_total', 'monto_total', 'diferencias_total']
+        incrementos = ', '.join(f'{columna} = {tabla}.{columna} + EXCLUDED.{columna}' for columna in columnas)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tabla} (fecha, caja_id, {', '.join(columnas)}, generado_el) "
+                f"VALUES (%s, %s, %s, %s, %s, %s, %s) "
+                f"ON CONFLICT (fecha, caja_id) DO UPDATE SET {incrementos}",
+                [
+                    connection.ops.adapt_datefield_value(fecha), caja_id,
+                    turnos, ventas, connection.ops.adapt_decimalfield_value(Decimal(monto), 12, 2),
+                    connection.ops.adapt_decimalfield_value(Decimal(diferencias), 10, 2),
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                ]
+            )
+    
+    @classmethod
+    def resumen_del_dia(cls, fecha=None):
+        """
+        Totales del día de todas las cajas (dos consultas): ventas y monto de
+        los reportes, y los alumnos distintos atendidos en cualquier caja
+        (índice de Venta por fecha).
+        """
+        fecha = fecha or timezone.localdate()
+        resumen = cls.objects.filter(fecha=fecha).aggregate(
+            ventas=models.Sum('ventas_total'),
+            monto=models.Sum('monto_total'),
+        )
+        inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+        alumnos = Venta.objects.filter(
+            estado='completada', alumno__isnull=False,
+            fecha__gte=inicio, fecha__lt=inicio + timedelta(days=1),
+        ).aggregate(alumnos=models.Count('alumno', distinct=True))['alumnos']
+        return {
+            'ventas': resumen['ventas'] or 0,
+            'monto': resumen['monto'] or Decimal('0.00'),
+            'alumnos': alumnos,
+        }
+    
     def __str__(self):
         return f"Reporte {self.caja} - {self.fecha}"
     
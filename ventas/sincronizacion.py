@@ -0,0 +1,105 @@
+"""
+Instantánea del POS (catálogo + directorio de tarjetas) con sincronización por deltas.
+
+En lugar de incrustar todos los productos y alumnos en el HTML de cada
+carga del POS, el navegador pide una vez la instantánea en JSON y luego
+solo los cambios:
+
+* La versión es ``"<catálogo>.<directorio>"``, tomada de ``VersionCatalogo``
+  y ``VersionDirectorio``; también es el ETag, por lo que una consulta sin
+  cambios se responde con 304 tras leer dos filas.
+* ``?since=<versión>`` devuelve solo las filas estampadas con una versión
+  mayor (incluidas las desactivadas, para que el POS las quite). Si hubo un
+  borrado físico posterior a ``since`` se devuelve la parte completa.
+
+Las filas van como listas en el orden de ``campos`` para que la respuesta
+sea compacta. El stock y el saldo no forman parte de la instantánea: cambian
+con cada venta y se validan al cobrar.
+"""
+from alumnos.models import Alumno, VersionDirectorio
+from productos.models import Producto, VersionCatalogo
+
+CAMPOS_PRODUCTO = ['id', 'codigo', 'nombre', 'precio', 'categoria_id', 'categoria', 'imagen', 'activo']
+CAMPOS_ALUMNO = ['id', 'numero_tarjeta', 'nombre', 'apellido', 'ci', 'grado', 'seccion', 'activo']
+
+
+def version_actual():
+    """Retorna ((catálogo, eliminación), (directorio, eliminación))"""
+    return VersionCatalogo.estado(), VersionDirectorio.estado()
+
+
+def formatear_version(catalogo, directorio):
+    return f'{catalogo}.{directorio}'
+
+
+def etag(catalogo, directorio):
+    return f'"pos-{catalogo}-{directorio}"'
+
+
+def interpretar_version(valor):
+    """'12.40' -> (12, 40); lanza ValueError si el formato no es válido"""
+    try:
+        catalogo, directorio = (int(parte) for parte in valor.split('.'))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f'Versión inválida: {valor}')
+    if catalogo < 0 or directorio < 0:
+        raise ValueError(f'Versión inválida: {valor}')
+    return catalogo, directorio
+
+
+def _es_completa(desde, version, ultima_eliminacion):
+    return not desde or desde > version or desde < ultima_eliminacion
+
+
+def _productos(desde, completa):
+    productos = Producto.objects.select_related('categoria').order_by('id')
+    if completa:
+        productos = productos.filter(activo=True)
+    else:
+        productos = productos.filter(version_catalogo__gt=desde)
+
+    return [
+        [
+            producto.id, producto.codigo, producto.nombre, float(producto.precio),
+            producto.categoria_id, producto.categoria.nombre,
+            producto.imagen.url if producto.imagen else None, producto.activo,
+        ]
+        for producto in productos
+    ]
+
+
+def _alumnos(desde, completa):
+    alumnos = Alumno.objects.order_by('id')
+    if completa:
+        alumnos = alumnos.filter(activo=True)
+    else:
+        alumnos = alumnos.filter(version_directorio__gt=desde)
+    return [list(fila) for fila in alumnos.values_list(*CAMPOS_ALUMNO)]
+
+
+def construir_instantanea(since=None, version=None):
+    """
+    Arma la instantánea completa o, con ``since``, solo los cambios.
+
+    ``version`` permite reutilizar la versión ya leída para el ETag.
+    Lanza ValueError si ``since`` no es una versión válida.
+    """
+    (catalogo, eliminacion_catalogo), (directorio, eliminacion_directorio) = version or version_actual()
+    desde_catalogo, desde_directorio = interpretar_version(since) if since else (0, 0)
+
+    catalogo_completo = _es_completa(desde_catalogo, catalogo, eliminacion_catalogo)
+    directorio_completo = _es_completa(desde_directorio, directorio, eliminacion_directorio)
+
+    return {
+        'version': formatear_version(catalogo, directorio),
+        'catalogo': {
+            'completo': catalogo_completo,
+            'campos': CAMPOS_PRODUCTO,
+            'filas': _productos(desde_catalogo, catalogo_completo),
+        },
+        'directorio': {
+            'completo': directorio_completo,
+            'campos': CAMPOS_ALUMNO,
+            'filas': _alumnos(desde_directorio, directorio_completo),
+        },
+    }
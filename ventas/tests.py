@@ -1,4 +1,7 @@
-from django.test import TestCase
+from unittest import skipIf
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from .models import Venta, DetalleVenta, PagoVenta, Caja, TurnoCajero, MetodoPago
@@ -100,3 +103,858 @@ class VentaTestCase(TestCase):
         
         self.assertEqual(pago.monto, Decimal('20.00'))
         self.assertEqual(pago.metodo_pago, self.metodo_pago)
+
+
+class CheckoutTestCase(TestCase):
+    """Tests del motor de cobro por conjuntos (ventas.checkout)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cajero_checkout', password='testpass123')
+        self.caja = Caja.objects.create(numero=1, nombre='Caja Test')
+        self.turno = TurnoCajero.objects.create(
+            cajero=self.user,
+            caja=self.caja,
+            monto_inicial=Decimal('0.00')
+        )
+        self.efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+        self.productos = [
+            Producto.objects.create(
+                codigo=f'P{i:03d}',
+                nombre=f'Producto {i}',
+                categoria=self.categoria,
+                precio=Decimal('1000.00'),
+                stock_actual=10
+            )
+            for i in range(12)
+        ]
+
+    def _carrito(self, cantidad_items):
+        items = [{'producto_id': p.id, 'cantidad': 2} for p in self.productos[:cantidad_items]]
+        pagos = [{'metodo_pago_id': self.efectivo.id, 'monto': str(2000 * cantidad_items)}]
+        return items, pagos
+
+    def test_procesar_carrito(self):
+        """Crea detalles, pagos y descuenta stock"""
+        from .checkout import procesar_carrito
+
+        items, pagos = self._carrito(3)
+        pagos[0]['monto'] = '10000'
+        venta = procesar_carrito(self.user, self.turno, items, pagos)
+
+        self.assertEqual(venta.estado, 'completada')
+        self.assertEqual(venta.total, Decimal('6000.00'))
+        self.assertEqual(venta.cambio, Decimal('4000.00'))
+        self.assertEqual(venta.detalles.count(), 3)
+        self.assertEqual(venta.pagos.count(), 1)
+        for producto in self.productos[:3]:
+            producto.refresh_from_db()
+            self.assertEqual(producto.stock_actual, 8)
+        self.productos[3].refresh_from_db()
+        self.assertEqual(self.productos[3].stock_actual, 10)
+
+    def test_consultas_constantes(self):
+        """El número de consultas no depende del tamaño del carrito"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .checkout import procesar_carrito
+
+        conteos = []
+        for cantidad_items in (1, 12):
+            items, pagos = self._carrito(cantidad_items)
+            with CaptureQueriesContext(connection) as contexto:
+                procesar_carrito(self.user, self.turno, items, pagos)
+            conteos.append(len(contexto.captured_queries))
+
+        self.assertEqual(conteos[0], conteos[1])
+
+    def test_numero_se_reserva_despues_de_las_filas_compartidas(self):
+        """La secuencia del día se bloquea recién después de stock, turno y reporte"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .checkout import procesar_carrito
+        from .models import ReporteCaja, SecuenciaVenta
+
+        items, pagos = self._carrito(2)
+        with CaptureQueriesContext(connection) as contexto:
+            procesar_carrito(self.user, self.turno, items, pagos)
+
+        def primera(modelo):
+            tabla = modelo._meta.db_table
+            return next(i for i, q in enumerate(contexto.captured_queries)
+                        if tabla in q['sql'] and not q['sql'].startswith('SELECT'))
+
+        secuencia = primera(SecuenciaVenta)
+        for modelo in (Producto, TurnoCajero, ReporteCaja):
+            self.assertLess(primera(modelo), secuencia)
+        self.assertGreater(primera(DetalleVenta), secuencia)
+
+    def test_error_en_alertas_no_afecta_la_venta(self):
+        """Un fallo al evaluar las alertas después del commit solo queda en el log"""
+        from unittest import mock
+        from django.db import DatabaseError
+        from .checkout import procesar_carrito
+
+        items, pagos = self._carrito(1)
+        with mock.patch('ventas.checkout.evaluar_alertas_stock', side_effect=DatabaseError('caída')), \
+                self.assertLogs('django', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            venta = procesar_carrito(self.user, self.turno, items, pagos)
+
+        self.assertEqual(venta.estado, 'completada')
+        self.assertTrue(Venta.objects.filter(pk=venta.pk).exists())
+
+    def test_libro_de_stock(self):
+        """Cada venta y su anulación quedan en MovimientoStock con el stock bloqueado"""
+        from productos.conciliacion_stock import diferencias_stock
+        from productos.models import MovimientoStock
+        from .checkout import anular_venta, procesar_carrito
+
+        items, pagos = self._carrito(2)
+        procesar_carrito(self.user, self.turno, items, pagos)
+        venta = procesar_carrito(self.user, self.turno, items, pagos)
+        anular_venta(venta.id, usuario=self.user)
+
+        movimientos = MovimientoStock.objects.filter(producto=self.productos[0]).order_by('id')
+        self.assertEqual(
+            [(m.tipo, m.cantidad, m.stock_anterior, m.stock_nuevo) for m in movimientos],
+            [('venta', -2, 10, 8), ('venta', -2, 8, 6), ('devolucion', 2, 6, 8)]
+        )
+        self.assertEqual(movimientos[1].motivo, f'Venta {venta.numero_venta}')
+        self.assertEqual(diferencias_stock(), [])
+
+    def test_stock_insuficiente_revierte(self):
+        """Si un item no tiene stock no se escribe nada"""
+        from .checkout import procesar_carrito
+
+        items, pagos = self._carrito(2)
+        items[1]['cantidad'] = 50
+        with self.assertRaises(ValueError):
+            procesar_carrito(self.user, self.turno, items, pagos)
+
+        self.assertFalse(Venta.objects.exists())
+        self.productos[0].refresh_from_db()
+        self.assertEqual(self.productos[0].stock_actual, 10)
+
+    def test_pago_con_tarjeta_cantina(self):
+        """El pago con tarjeta de cantina debita el saldo del alumno en la misma venta"""
+        from datetime import date
+        from .checkout import procesar_carrito
+
+        tarjeta = MetodoPago.objects.create(nombre='Tarjeta Cantina', es_tarjeta_cantina=True)
+        alumno = Alumno.objects.create(
+            numero_tarjeta='T500', nombre='Ana', apellido='Báez', ci='500',
+            fecha_nacimiento=date(2015, 1, 1), saldo_tarjeta=Decimal('3000.00')
+        )
+        items = [{'producto_id': self.productos[0].id, 'cantidad': 2}]
+
+        venta = procesar_carrito(
+            self.user, self.turno, items,
+            [{'metodo_pago_id': tarjeta.id, 'monto': '2000'}], alumno=alumno
+        )
+        alumno.refresh_from_db()
+        self.assertEqual(venta.monto_tarjeta_cantina, Decimal('2000.00'))
+        self.assertEqual(venta.tipo_comprobante, 'comprobante_interno')
+        self.assertEqual(alumno.saldo_tarjeta, Decimal('1000.00'))
+
+        # Sin saldo suficiente no se registra la venta ni se toca el stock
+        with self.assertRaisesMessage(ValueError, 'Saldo insuficiente'):
+            procesar_carrito(
+                self.user, self.turno, items,
+                [{'metodo_pago_id': tarjeta.id, 'monto': '2000'}], alumno=alumno
+            )
+        self.assertEqual(Venta.objects.count(), 1)
+        self.productos[0].refresh_from_db()
+        self.assertEqual(self.productos[0].stock_actual, 8)
+
+
+class SecuenciaVentaTestCase(TestCase):
+    """Tests de la numeración de ventas por día/caja"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cajero_numeracion', password='testpass123')
+        self.caja = Caja.objects.create(numero=3, nombre='Caja 3')
+        self.turno = TurnoCajero.objects.create(
+            cajero=self.user,
+            caja=self.caja,
+            monto_inicial=Decimal('0.00')
+        )
+
+    def test_numeracion_consecutiva(self):
+        from django.utils import timezone
+
+        ventas = [Venta.objects.create(usuario=self.user) for _ in range(3)]
+        prefijo = f"V{timezone.localdate().strftime('%Y%m%d')}"
+        self.assertEqual(
+            [v.numero_venta for v in ventas],
+            [f'{prefijo}0001', f'{prefijo}0002', f'{prefijo}0003']
+        )
+
+    def test_numeracion_por_caja(self):
+        from django.test import override_settings
+
+        with override_settings(VENTAS_NUMERACION_POR_CAJA=True):
+            venta = Venta.objects.create(usuario=self.user, turno_cajero=self.turno)
+        self.assertTrue(venta.numero_venta.endswith('-03-0001'))
+
+    def test_reservar_bloque(self):
+        from .models import SecuenciaVenta
+
+        primero = SecuenciaVenta.reservar_bloque(caja=3, cantidad=5)
+        segundo = SecuenciaVenta.reservar_bloque(caja=3, cantidad=2)
+        self.assertEqual(len(set(primero + segundo)), 7)
+        self.assertTrue(primero[0].endswith('-03-0001'))
+        self.assertTrue(segundo[-1].endswith('-03-0007'))
+
+    def test_migracion_continua_dias_anteriores(self):
+        import importlib
+        from datetime import date
+        from django.apps import apps
+        from .models import SecuenciaVenta
+
+        migracion = importlib.import_module('ventas.migrations.0007_secuencias_dias_anteriores')
+        for numero in ('V202603020007', 'V202603020012', 'V20260302-03-0004', 'V202603030002', 'manual'):
+            Venta.objects.create(usuario=self.user, numero_venta=numero)
+        SecuenciaVenta.objects.create(fecha=date(2026, 3, 3), caja=0, ultimo_numero=5)
+
+        migracion.inicializar_secuencias_anteriores(apps, None)
+
+        self.assertEqual(list(SecuenciaVenta.reservar(date(2026, 3, 2))), [13])
+        self.assertEqual(list(SecuenciaVenta.reservar(date(2026, 3, 2), caja=3)), [5])
+        self.assertEqual(list(SecuenciaVenta.reservar(date(2026, 3, 3))), [6])
+
+
+class SecuenciaVentaConcurrenciaTestCase(TransactionTestCase):
+    """Varias cajas emitiendo ventas en paralelo no colisionan ni dejan huecos"""
+
+    CAJEROS = 8
+    VENTAS_POR_CAJERO = 10
+
+    @skipIf(connection.vendor == 'sqlite', 'SQLite no admite escrituras concurrentes')
+    def test_cajeros_en_paralelo(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        usuarios = [
+            User.objects.create_user(username=f'cajero_paralelo_{i}', password='testpass123')
+            for i in range(self.CAJEROS)
+        ]
+
+        def emitir_ventas(usuario):
+            try:
+                for _ in range(self.VENTAS_POR_CAJERO):
+                    Venta.objects.create(usuario=usuario)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.CAJEROS) as executor:
+            list(executor.map(emitir_ventas, usuarios))
+
+        total = self.CAJEROS * self.VENTAS_POR_CAJERO
+        sufijos = sorted(int(n[-4:]) for n in Venta.objects.values_list('numero_venta', flat=True))
+        self.assertEqual(sufijos, list(range(1, total + 1)))
+
+
+class IdempotenciaVentaTestCase(TestCase):
+    """Los reintentos del POS con la misma clave no duplican la venta ni la recarga"""
+
+    def setUp(self):
+        from datetime import date
+
+        self.user = User.objects.create_user(username='cajero_reintento', password='testpass123')
+        self.client.force_login(self.user)
+        caja = Caja.objects.create(numero=1, nombre='Caja Test')
+        TurnoCajero.objects.create(cajero=self.user, caja=caja, monto_inicial=Decimal('0.00'))
+        self.efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        self.producto = Producto.objects.create(
+            codigo='AGUA', nombre='Agua', categoria=categoria,
+            precio=Decimal('3000.00'), stock_actual=10
+        )
+        self.alumno = Alumno.objects.create(
+            numero_tarjeta='T700', nombre='Luis', apellido='Ortiz', ci='700',
+            fecha_nacimiento=date(2014, 2, 2), saldo_tarjeta=Decimal('0.00')
+        )
+
+    def _cobrar(self, clave, cantidad=1):
+        import json
+        from django.urls import reverse
+
+        cuerpo = {
+            'items': [{'producto_id': self.producto.id, 'cantidad': cantidad}],
+            'pagos': [{'metodo_pago_id': self.efectivo.id, 'monto': str(3000 * cantidad)}],
+        }
+        return self.client.post(reverse('ventas:api_procesar_venta'), json.dumps(cuerpo),
+                                content_type='application/json', HTTP_IDEMPOTENCY_KEY=clave)
+
+    def test_reintento_devuelve_la_misma_venta(self):
+        primera = self._cobrar('pos-1-0001')
+        # Sesión, usuario y la búsqueda de la clave: el cobro no se vuelve a ejecutar
+        with self.assertNumQueries(3):
+            segunda = self._cobrar('pos-1-0001')
+
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Venta.objects.count(), 1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 9)
+
+        # Otra clave es otro cobro
+        self._cobrar('pos-1-0002')
+        self.assertEqual(Venta.objects.count(), 2)
+
+    def test_clave_reutilizada_con_otro_carrito(self):
+        self._cobrar('pos-1-0003')
+        respuesta = self._cobrar('pos-1-0003', cantidad=2)
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_error_no_se_guarda(self):
+        """Un cobro rechazado puede reintentarse con la misma clave"""
+        self.assertEqual(self._cobrar('pos-1-0004', cantidad=20).status_code, 400)
+        self.producto.stock_actual = 100
+        self.producto.save()
+        self.assertEqual(self._cobrar('pos-1-0004', cantidad=20).status_code, 200)
+
+    def test_clave_pendiente_y_sin_transaccion_externa(self):
+        """La vista corre fuera de la reserva de la clave; un reintento concurrente recibe 409"""
+        from unittest import mock
+        from django.db import connection
+        from core.models import ClaveIdempotencia
+        from . import checkout
+
+        profundidad, reintentos = [], []
+        original = checkout.procesar_carrito
+
+        def cobrar(*args, **kwargs):
+            profundidad.append(len(connection.atomic_blocks))
+            clave = ClaveIdempotencia.objects.filter(clave='pos-1-0005').first()
+            if clave is not None:
+                # Mientras se cobra, la clave está reservada y un reintento no vuelve a cobrar
+                self.assertEqual(clave.estado, 'pendiente')
+                reintentos.append(self._cobrar('pos-1-0005').status_code)
+            return original(*args, **kwargs)
+
+        with mock.patch('ventas.api.views.procesar_carrito', side_effect=cobrar):
+            self._cobrar('')
+            self._cobrar('pos-1-0005')
+
+        # Con clave, el cobro no queda anidado en una transacción externa
+        self.assertEqual(profundidad[0], profundidad[1])
+        self.assertEqual(reintentos, [409])
+        self.assertEqual(ClaveIdempotencia.objects.get(clave='pos-1-0005').estado, 'completada')
+        self.assertEqual(Venta.objects.count(), 2)
+
+    def test_recarga_idempotente(self):
+        import json
+        from django.urls import reverse
+
+        cuerpo = json.dumps({'numero_tarjeta': 'T700', 'monto': '20000'})
+        for _ in range(2):
+            respuesta = self.client.post(reverse('ventas:api_recargar_tarjeta'), cuerpo,
+                                         content_type='application/json', HTTP_IDEMPOTENCY_KEY='rec-1')
+            self.assertEqual(respuesta.json()['saldo_nuevo'], 20000.0)
+
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('20000.00'))
+        self.assertEqual(self.alumno.movimientos.count(), 1)
+
+    def test_recarga_requiere_rol_de_caja(self):
+        import json
+        from django.urls import reverse
+
+        url = reverse('ventas:api_recargar_tarjeta')
+        respuesta = self.client.post(url, json.dumps({'alumno_id': 'abc', 'monto': '1000'}),
+                                     content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+
+        self.client.force_login(User.objects.create_user(username='padre_recarga', password='testpass123',
+                                                         tipo_usuario='padre'))
+        respuesta = self.client.post(url, json.dumps({'numero_tarjeta': 'T700', 'monto': 1000000}),
+                                     content_type='application/json')
+        self.assertEqual(respuesta.status_code, 403)
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('0.00'))
+
+
+class LoteVentasTestCase(TestCase):
+    """Tests de la ingesta de ventas encoladas sin conexión"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cajero_lote', password='testpass123')
+        caja = Caja.objects.create(numero=1, nombre='Caja Test')
+        self.turno = TurnoCajero.objects.create(cajero=self.user, caja=caja, monto_inicial=Decimal('0.00'))
+        self.efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        categoria = Categoria.objects.create(nombre='Snacks')
+        self.productos = [
+            Producto.objects.create(codigo=f'L{i}', nombre=f'Snack {i}', categoria=categoria,
+                                    precio=Decimal('1000.00'), stock_actual=5)
+            for i in range(3)
+        ]
+
+    def _venta(self, id_local, producto, cantidad=1):
+        return {
+            'id_local': id_local,
+            'items': [{'producto_id': producto.id, 'cantidad': cantidad}],
+            'pagos': [{'metodo_pago_id': self.efectivo.id, 'monto': str(1000 * cantidad)}],
+        }
+
+    def test_conflicto_no_descarta_el_resto(self):
+        from .checkout import procesar_lote
+
+        ventas = [self._venta(f'local-{i}', self.productos[0], cantidad=2) for i in range(3)]
+        ventas.append(self._venta('local-3', self.productos[1]))
+        ventas.append({'id_local': 'local-4', 'items': []})
+
+        resultados = procesar_lote(self.user, self.turno, ventas)
+
+        self.assertEqual([r['ok'] for r in resultados], [True, True, False, True, False])
+        self.assertIn('Stock insuficiente', resultados[2]['error'])
+        self.assertEqual(resultados[3]['id_local'], 'local-3')
+        self.assertEqual(Venta.objects.count(), 3)
+        self.productos[0].refresh_from_db()
+        self.assertEqual(self.productos[0].stock_actual, 1)
+
+    def test_error_de_base_rechaza_solo_esa_venta(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from productos.conciliacion_stock import diferencias_stock
+        from . import checkout
+
+        original = checkout.registrar_movimientos_stock
+        llamadas = []
+
+        def fallar_la_primera(*args, **kwargs):
+            llamadas.append(1)
+            if len(llamadas) == 1:
+                raise IntegrityError('conflicto')
+            return original(*args, **kwargs)
+
+        ventas = [self._venta(f'local-{i}', self.productos[0], cantidad=2) for i in range(3)]
+        with mock.patch('ventas.checkout.registrar_movimientos_stock', side_effect=fallar_la_primera), \
+                self.assertLogs('ventas.checkout', 'ERROR'):
+            resultados = checkout.procesar_lote(self.user, self.turno, ventas)
+
+        # La venta revertida devuelve su stock también en memoria: las otras dos entran
+        self.assertEqual([r['ok'] for r in resultados], [False, True, True])
+        self.assertIn('base de datos', resultados[0]['error'])
+        self.productos[0].refresh_from_db()
+        self.assertEqual(self.productos[0].stock_actual, 1)
+        self.assertEqual(diferencias_stock(), [])
+
+    def test_conserva_la_fecha_del_pos(self):
+        from datetime import datetime, timedelta
+        from django.utils import timezone
+        from .checkout import procesar_lote
+
+        venta = self._venta('local-0', self.productos[0])
+        venta['fecha'] = '2026-03-02T10:15:00'
+        futura = self._venta('local-1', self.productos[1])
+        futura['fecha'] = (timezone.now() + timedelta(hours=1)).isoformat()
+        invalida = self._venta('local-2', self.productos[2])
+        invalida['fecha'] = 'ayer'
+        TurnoCajero.objects.filter(pk=self.turno.pk).update(fecha_inicio=timezone.make_aware(datetime(2026, 3, 2, 7)))
+        self.turno.refresh_from_db()
+
+        resultados = procesar_lote(self.user, self.turno, [venta, futura, invalida])
+
+        registrada = resultados[0]['venta']
+        registrada.refresh_from_db()
+        self.assertEqual(registrada.fecha, timezone.make_aware(datetime(2026, 3, 2, 10, 15)))
+        self.assertTrue(registrada.numero_venta.startswith('V20260302'))
+        self.assertLessEqual(resultados[1]['venta'].fecha, timezone.now())
+        self.assertEqual(resultados[2], {'id_local': 'local-2', 'ok': False, 'error': 'Fecha inválida: ayer'})
+
+    def test_imputa_cada_venta_a_su_turno(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .checkout import procesar_lote
+
+        ahora = timezone.now()
+        cerrado = TurnoCajero.objects.create(cajero=self.user, caja=self.turno.caja, monto_inicial=Decimal('0.00'),
+                                             fecha_fin=ahora - timedelta(hours=2), activa=False)
+        TurnoCajero.objects.filter(pk=cerrado.pk).update(fecha_inicio=ahora - timedelta(hours=5))
+        TurnoCajero.objects.filter(pk=self.turno.pk).update(fecha_inicio=ahora - timedelta(hours=1))
+        self.turno.refresh_from_db()
+
+        del_turno_cerrado = self._venta('local-0', self.productos[0])
+        del_turno_cerrado['fecha'] = (ahora - timedelta(hours=3)).isoformat()
+        del_turno_activo = self._venta('local-1', self.productos[1])
+        del_turno_activo['fecha'] = (ahora - timedelta(minutes=30)).isoformat()
+        entre_turnos = self._venta('local-2', self.productos[2])
+        entre_turnos['fecha'] = (ahora - timedelta(hours=1, minutes=30)).isoformat()
+        con_turno = self._venta('local-3', self.productos[0])
+        con_turno['turno_id'] = cerrado.pk
+        ajeno = TurnoCajero.objects.create(cajero=User.objects.create_user(username='otro_cajero', password='x'),
+                                           caja=self.turno.caja, monto_inicial=Decimal('0.00'))
+        de_otro_cajero = self._venta('local-4', self.productos[1])
+        de_otro_cajero['turno_id'] = ajeno.pk
+
+        resultados = procesar_lote(
+            self.user, self.turno, [del_turno_cerrado, del_turno_activo, entre_turnos, con_turno, de_otro_cajero]
+        )
+
+        self.assertEqual([r['ok'] for r in resultados], [False, True, False, False, False])
+        self.assertEqual(resultados[0]['error'], f'El turno {cerrado.pk} ya está cerrado')
+        self.assertEqual(resultados[1]['venta'].turno_cajero, self.turno)
+        self.assertEqual(resultados[2]['error'], 'No hay un turno del cajero a la hora de la venta')
+        self.assertEqual(resultados[3]['error'], f'El turno {cerrado.pk} ya está cerrado')
+        self.assertEqual(resultados[4]['error'], f'Turno no encontrado: {ajeno.pk}')
+        cerrado.refresh_from_db()
+        self.assertEqual(cerrado.total_ventas, 0)
+
+    def test_productos_bloqueados_una_vez_por_bloque(self):
+        from django.test.utils import CaptureQueriesContext
+        from .checkout import procesar_lote
+
+        ventas = [self._venta(i, self.productos[i % 3]) for i in range(6)]
+        with CaptureQueriesContext(connection) as contexto:
+            resultados = procesar_lote(self.user, self.turno, ventas, tamano_bloque=2)
+
+        self.assertTrue(all(r['ok'] for r in resultados))
+        bloqueos = [q for q in contexto.captured_queries if 'FROM "productos_producto"' in q['sql']]
+        self.assertEqual(len(bloqueos), 3)
+
+    def test_api_lote(self):
+        import json
+        from django.urls import reverse
+
+        self.client.force_login(self.user)
+        cuerpo = {'ventas': [self._venta('a', self.productos[0]), self._venta('b', self.productos[2], 9)]}
+        respuesta = self.client.post(reverse('ventas:api_procesar_lote_ventas'), json.dumps(cuerpo),
+                                     content_type='application/json')
+
+        data = respuesta.json()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((data['procesadas'], data['conflictos']), (1, 1))
+        self.assertEqual(data['resultados'][0]['id_local'], 'a')
+        self.assertFalse(data['resultados'][1]['ok'])
+
+
+class ContadoresTurnoTestCase(TestCase):
+    """Tests de los contadores acumulados del turno de caja"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cajero_contadores', password='testpass123')
+        caja = Caja.objects.create(numero=1, nombre='Caja Test')
+        self.turno = TurnoCajero.objects.create(cajero=self.user, caja=caja, monto_inicial=Decimal('0.00'))
+        self.efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        categoria = Categoria.objects.create(nombre='Bebidas')
+        self.producto = Producto.objects.create(codigo='JUGO', nombre='Jugo', categoria=categoria,
+                                                precio=Decimal('4000.00'), stock_actual=50)
+
+    def _cobrar(self, pagos):
+        from .checkout import procesar_carrito
+
+        return procesar_carrito(self.user, self.turno,
+                                [{'producto_id': self.producto.id, 'cantidad': 1}], pagos)
+
+    def test_cobro_actualiza_contadores(self):
+        # Instancia leída antes de cobrar: guardarla no debe pisar los contadores
+        turno_desactualizado = TurnoCajero.objects.get(pk=self.turno.pk)
+
+        self._cobrar([{'metodo_pago_id': self.efectivo.id, 'monto': '4000'}])
+        self._cobrar([
+            {'metodo_pago_id': self.efectivo.id, 'monto': '1000'},
+            {'metodo_pago_id': self.efectivo.id, 'metodo': 'TRANSFERENCIA', 'monto': '3000'},
+        ])
+        turno_desactualizado.observaciones_apertura = 'Fondo contado'
+        turno_desactualizado.save()
+
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.cantidad_ventas, 2)
+        self.assertEqual(self.turno.total_ventas, Decimal('8000.00'))
+        self.assertEqual(self.turno.totales_por_metodo, {
+            'EFECTIVO': Decimal('5000.00'),
+            'TRANSFERENCIA': Decimal('3000.00'),
+        })
+        self.assertEqual(self.turno.observaciones_apertura, 'Fondo contado')
+
+    def test_estado_caja_una_consulta(self):
+        from django.urls import reverse
+
+        self._cobrar([{'metodo_pago_id': self.efectivo.id, 'monto': '4000'}])
+        self.client.force_login(self.user)
+        # Sesión, usuario y el turno con su caja
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(reverse('ventas:api_estado_caja'))
+        self.assertEqual(respuesta.json()['total_ventas'], 4000.0)
+        self.assertEqual(respuesta.json()['totales_por_metodo'], {'EFECTIVO': 4000.0})
+
+    def test_reconciliacion_corrige_diferencias(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        venta = self._cobrar([{'metodo_pago_id': self.efectivo.id, 'monto': '4000'}])
+        # Una venta anulada por fuera del cobro deja los contadores desfasados
+        Venta.objects.filter(pk=venta.pk).update(estado='cancelada')
+
+        salida = StringIO()
+        call_command('reconciliar_turnos', '--solo-reportar', stdout=salida)
+        self.assertIn(f'Turno {self.turno.id}: cantidad_ventas 1 -> 0', salida.getvalue())
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.cantidad_ventas, 1)
+
+        call_command('reconciliar_turnos', stdout=StringIO())
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.cantidad_ventas, 0)
+        self.assertEqual(self.turno.total_efectivo, Decimal('0.00'))
+
+
+class ReporteCajaTestCase(TestCase):
+    """El ReporteCaja diario se mantiene al cobrar, anular y cerrar turnos"""
+
+    def setUp(self):
+        from datetime import date
+
+        self.user = User.objects.create_user(username='cajero_reporte', password='testpass123')
+        self.caja = Caja.objects.create(numero=1, nombre='Caja Test')
+        self.turno = TurnoCajero.objects.create(cajero=self.user, caja=self.caja, monto_inicial=Decimal('50000.00'))
+        self.efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        self.tarjeta = MetodoPago.objects.create(nombre='Tarjeta Cantina', es_tarjeta_cantina=True)
+        categoria = Categoria.objects.create(nombre='Snacks')
+        self.producto = Producto.objects.create(codigo='ALF', nombre='Alfajor', categoria=categoria,
+                                                precio=Decimal('2000.00'), stock_actual=20)
+        self.alumno = Alumno.objects.create(
+            numero_tarjeta='T900', nombre='Sofía', apellido='Rojas', ci='900',
+            fecha_nacimiento=date(2013, 4, 4), saldo_tarjeta=Decimal('10000.00')
+        )
+
+    def _cobrar(self, cantidad=1, alumno=None, turno=None):
+        from .checkout import procesar_carrito
+
+        metodo = self.tarjeta if alumno else self.efectivo
+        return procesar_carrito(
+            self.user, turno or self.turno, [{'producto_id': self.producto.id, 'cantidad': cantidad}],
+            [{'metodo_pago_id': metodo.id, 'monto': str(2000 * cantidad)}], alumno=alumno
+        )
+
+    def _reporte(self):
+        from django.utils import timezone
+        from .models import ReporteCaja
+
+        return ReporteCaja.objects.get(fecha=timezone.localdate(), caja=self.caja)
+
+    def test_cobro_y_anulacion(self):
+        from .checkout import anular_venta
+
+        self._cobrar(2)
+        primera = self._cobrar(1, alumno=self.alumno)
+        self._cobrar(1, alumno=self.alumno)
+
+        reporte = self._reporte()
+        self.assertEqual((reporte.ventas_total, reporte.monto_total), (3, Decimal('8000.00')))
+
+        anular_venta(primera.id, usuario=self.user, motivo='Error de cobro')
+
+        reporte = self._reporte()
+        self.assertEqual((reporte.ventas_total, reporte.monto_total), (2, Decimal('6000.00')))
+        self.producto.refresh_from_db()
+        self.alumno.refresh_from_db()
+        self.turno.refresh_from_db()
+        self.assertEqual(self.producto.stock_actual, 17)
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('8000.00'))
+        self.assertEqual(self.alumno.movimientos.filter(tipo='devolucion').count(), 1)
+        self.assertEqual(self.turno.total_saldo, Decimal('2000.00'))
+        with self.assertRaisesMessage(ValueError, 'no está completada'):
+            anular_venta(primera.id)
+
+    def test_alumnos_distintos_entre_cajas(self):
+        from .checkout import anular_venta
+        from .models import ReporteCaja
+
+        otra_caja = Caja.objects.create(numero=2, nombre='Caja 2')
+        otro_turno = TurnoCajero.objects.create(cajero=self.user, caja=otra_caja, monto_inicial=Decimal('0.00'))
+        self._cobrar(1, alumno=self.alumno)
+        self._cobrar(1, alumno=self.alumno, turno=otro_turno)
+        anulada = self._cobrar(1, alumno=Alumno.objects.create(
+            numero_tarjeta='T901', nombre='Tomás', apellido='Rojas', ci='901',
+            fecha_nacimiento=self.alumno.fecha_nacimiento, saldo_tarjeta=Decimal('10000.00')
+        ))
+        self._cobrar(2)
+        anular_venta(anulada.id)
+
+        # El alumno que compró en las dos cajas cuenta una vez; la venta anulada no cuenta
+        with self.assertNumQueries(2):
+            resumen = ReporteCaja.resumen_del_dia()
+        self.assertEqual((resumen['ventas'], resumen['alumnos']), (3, 1))
+
+    def test_cierre_de_turno(self):
+        self._cobrar(3)
+        turno = TurnoCajero.objects.get(pk=self.turno.pk)
+        turno.cerrar_turno(Decimal('55000.00'), 'Faltan 1000')
+
+        reporte = self._reporte()
+        self.assertEqual(reporte.turnos_total, 1)
+        self.assertEqual(reporte.diferencias_total, Decimal('-1000.00'))
+        with self.assertRaisesMessage(ValueError, 'ya está cerrado'):
+            self.turno.cerrar_turno(Decimal('55000.00'))
+
+    def test_recalcular_coincide_con_lo_incremental(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .checkout import anular_venta
+        from .models import ReporteCaja
+
+        self._cobrar(1, alumno=self.alumno)
+        anular_venta(self._cobrar(2).id)
+        self._cobrar(1)
+        self.turno.cerrar_turno(Decimal('54000.00'))
+        campos = ('fecha', 'caja_id', 'turnos_total', 'ventas_total', 'monto_total', 'diferencias_total')
+        incremental = list(ReporteCaja.objects.values_list(*campos))
+
+        call_command('recalcular_reportes_caja', stdout=StringIO())
+
+        self.assertEqual(list(ReporteCaja.objects.values_list(*campos)), incremental)
+
+    def test_reporte_cajas_diario(self):
+        from reportes.reports import ReportesCaja
+
+        self._cobrar(2)
+        with self.assertNumQueries(3):
+            datos = ReportesCaja.reporte_cajas_diario()
+        caja = datos['cajas'][0]
+        self.assertEqual((caja['cantidad_ventas'], caja['total_ventas']), (1, Decimal('4000.00')))
+        self.assertEqual((caja['turnos_count'], caja['turnos_activos']), (1, 1))
+
+
+class InstantaneaPOSTestCase(TestCase):
+    """Instantánea del POS con ETag y sincronización por deltas"""
+
+    def setUp(self):
+        from datetime import date
+
+        self.user = User.objects.create_user(username='cajero_instantanea', password='testpass123')
+        self.client.force_login(self.user)
+        self.categoria = Categoria.objects.create(nombre='Bebidas')
+        self.productos = [
+            Producto.objects.create(codigo=f'B{i}', nombre=f'Bebida {i}', categoria=self.categoria,
+                                    precio=Decimal('3000.00'), stock_actual=10)
+            for i in range(3)
+        ]
+        self.alumnos = [
+            Alumno.objects.create(numero_tarjeta=f'T{i}', nombre=f'Alumno {i}', apellido='Paz', ci=f'{i}',
+                                  fecha_nacimiento=date(2014, 1, 1), saldo_tarjeta=Decimal('5000.00'))
+            for i in range(2)
+        ]
+
+    def _pedir(self, since=None, etag=None):
+        from django.urls import reverse
+
+        parametros = {'since': since} if since else {}
+        encabezados = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('ventas:api_instantanea_pos'), parametros, **encabezados)
+
+    def test_instantanea_completa_y_304(self):
+        respuesta = self._pedir()
+        data = respuesta.json()
+
+        self.assertTrue(data['catalogo']['completo'])
+        self.assertEqual(len(data['catalogo']['filas']), 3)
+        self.assertEqual(len(data['directorio']['filas']), 2)
+        self.assertIn('numero_tarjeta', data['directorio']['campos'])
+
+        self.assertEqual(self._pedir(etag=respuesta['ETag']).status_code, 304)
+
+    def test_delta_solo_filas_modificadas(self):
+        from alumnos.saldo import debitar_alumno
+
+        inicial = self._pedir().json()['version']
+        self.productos[1].precio = Decimal('3500.00')
+        self.productos[1].save()
+        self.productos[2].activo = False
+        self.productos[2].save()
+        # Los débitos de saldo no cambian el directorio
+        debitar_alumno(self.alumnos[0].id, Decimal('1000'))
+
+        data = self._pedir(since=inicial).json()
+
+        self.assertFalse(data['catalogo']['completo'])
+        filas = {fila[0]: fila for fila in data['catalogo']['filas']}
+        self.assertEqual(set(filas), {self.productos[1].id, self.productos[2].id})
+        self.assertEqual(filas[self.productos[1].id][3], 3500.0)
+        self.assertFalse(filas[self.productos[2].id][-1])
+        self.assertEqual(data['directorio']['filas'], [])
+
+    def test_cambio_de_categoria_y_borrado(self):
+        inicial = self._pedir().json()['version']
+        self.categoria.nombre = 'Refrescos'
+        self.categoria.save()
+
+        data = self._pedir(since=inicial).json()
+        self.assertEqual(len(data['catalogo']['filas']), 3)
+        self.assertEqual(data['catalogo']['filas'][0][5], 'Refrescos')
+
+        self.alumnos[1].delete()
+        data = self._pedir(since=data['version']).json()
+        self.assertTrue(data['directorio']['completo'])
+        self.assertEqual(len(data['directorio']['filas']), 1)
+
+    def test_version_invalida(self):
+        self.assertEqual(self._pedir(since='abc').status_code, 400)
+
+
+class LimiteConsumoTestCase(TestCase):
+    """Tests del límite de consumo diario controlado en el cobro"""
+
+    def setUp(self):
+        from datetime import date
+
+        self.user = User.objects.create_user(username='cajero_limite', password='testpass123')
+        caja = Caja.objects.create(numero=1, nombre='Caja Test')
+        self.turno = TurnoCajero.objects.create(cajero=self.user, caja=caja, monto_inicial=Decimal('0.00'))
+        self.efectivo = MetodoPago.objects.create(nombre='Efectivo')
+        self.tarjeta = MetodoPago.objects.create(nombre='Tarjeta Cantina', es_tarjeta_cantina=True)
+        categoria = Categoria.objects.create(nombre='Snacks')
+        self.producto = Producto.objects.create(codigo='GAL', nombre='Galletita', categoria=categoria,
+                                                precio=Decimal('2000.00'), stock_actual=20)
+        self.alumno = Alumno.objects.create(
+            numero_tarjeta='T950', nombre='Tomás', apellido='Ayala', ci='950',
+            fecha_nacimiento=date(2014, 2, 2), saldo_tarjeta=Decimal('50000.00'),
+            limite_consumo=Decimal('5000.00')
+        )
+
+    def _cobrar(self, metodo=None):
+        from .checkout import procesar_carrito
+
+        return procesar_carrito(
+            self.user, self.turno, [{'producto_id': self.producto.id, 'cantidad': 1}],
+            [{'metodo_pago_id': (metodo or self.tarjeta).id, 'monto': '2000'}], alumno=self.alumno
+        )
+
+    def test_limite_diario(self):
+        from alumnos.consumo import consumo_del_dia
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._cobrar()
+            self._cobrar()
+        self.assertEqual(consumo_del_dia(self.alumno.id), Decimal('4000.00'))
+
+        with self.assertRaisesMessage(ValueError, 'Disponible hoy: 1000.00'):
+            self._cobrar()
+
+        # Lo pagado con otros medios no cuenta para el límite
+        self._cobrar(self.efectivo)
+        self.alumno.refresh_from_db()
+        self.assertEqual(self.alumno.saldo_tarjeta, Decimal('46000.00'))
+        self.assertEqual(Venta.objects.count(), 3)
+
+    def test_anulacion_libera_el_consumo(self):
+        from alumnos.consumo import consumo_del_dia
+        from .checkout import anular_venta
+
+        venta = self._cobrar()
+        self._cobrar()
+        with self.captureOnCommitCallbacks(execute=True):
+            anular_venta(venta.id, usuario=self.user)
+
+        self.assertEqual(consumo_del_dia(self.alumno.id), Decimal('2000.00'))
+        self._cobrar()
+
+    def test_sin_limite(self):
+        Alumno.objects.filter(pk=self.alumno.pk).update(limite_consumo=0)
+        self.alumno.refresh_from_db()
+
+        for _ in range(4):
+            self._cobrar()
+        self.assertEqual(self.alumno.consumos_diarios.get().total, Decimal('8000.00'))
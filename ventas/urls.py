@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, include
 from . import views
 
 app_name = 'ventas'
@@ -15,4 +15,7 @@ urlpatterns = [
     path('dashboard/', views.dashboard_cajero, name='dashboard_cajero'),
     path('turno/abrir/', views.abrir_turno, name='abrir_turno'),
     path('turno/cerrar/', views.cerrar_turno, name='cerrar_turno'),
+    
+    # API del POS
+    path('api/', include('ventas.api.urls')),
 ]
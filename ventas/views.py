@@ -4,10 +4,10 @@ from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Count, Q
 from django.http import JsonResponse
+from decimal import Decimal
 from usuarios.decorators import admin_required, admin_or_cajero_required, admin_or_supervisor_required
-from .models import Venta, TurnoCajero, Caja
+from .models import Venta, TurnoCajero, Caja, ReporteCaja
 from productos.models import Producto
-from alumnos.models import Alumno
 
 @login_required
 @admin_or_supervisor_required
@@ -21,12 +21,9 @@ def lista_ventas(request):
 @login_required
 @admin_or_cajero_required
 def nueva_venta(request):
-    productos = Producto.objects.filter(activo=True, stock_actual__gt=0)
-    alumnos = Alumno.objects.filter(activo=True)
+    # Productos y alumnos se cargan desde la instantánea del POS (api/pos/instantanea/)
     return render(request, 'ventas/nueva.html', {
-        'title': 'Nueva Venta',
-        'productos': productos,
-        'alumnos': alumnos
+        'title': 'Nueva Venta'
     })
 
 @login_required
@@ -50,29 +47,22 @@ def punto_venta(request):
         messages.warning(request, 'Debes abrir un turno antes de usar el punto de venta.')
         return redirect('ventas:abrir_turno')
     
-    productos = Producto.objects.filter(activo=True, stock_actual__gt=0)
-    categorias = productos.values_list('categoria', flat=True).distinct()
-    alumnos = Alumno.objects.filter(activo=True)
-    
+    # El catálogo y el directorio de tarjetas no se incrustan en la página:
+    # el POS los pide a api/pos/instantanea/ y luego solo los cambios
     return render(request, 'ventas/pos.html', {
         'title': 'Punto de Venta',
-        'productos': productos,
-        'categorias': categorias,
-        'alumnos': alumnos,
         'turno_activo': turno_activo
     })
 
 @login_required
 @admin_or_supervisor_required
 def reportes_ventas(request):
-    hoy = timezone.now().date()
-    
-    # Estadísticas del día
-    ventas_hoy = Venta.objects.filter(fecha__date=hoy)
+    # Estadísticas del día desde el ReporteCaja (una fila por caja)
+    resumen = ReporteCaja.resumen_del_dia()
     estadisticas = {
-        'ventas_hoy': ventas_hoy.count(),
-        'total_hoy': ventas_hoy.aggregate(Sum('total'))['total__sum'] or 0,
-        'alumnos_atendidos': ventas_hoy.values('alumno').distinct().count(),
+        'ventas_hoy': resumen['ventas'],
+        'total_hoy': resumen['monto'],
+        'alumnos_atendidos': resumen['alumnos'],
     }
     
     return render(request, 'ventas/reportes.html', {
@@ -89,20 +79,18 @@ def caja_diaria(request):
 @admin_or_cajero_required
 def dashboard_cajero(request):
     """Dashboard principal para cajeros"""
-    hoy = timezone.now().date()
-    
     # Verificar turno activo
     turno_activo = TurnoCajero.objects.filter(
         cajero=request.user,
         fecha_fin__isnull=True
     ).first()
     
-    # Estadísticas del día
-    ventas_hoy = Venta.objects.filter(fecha__date=hoy)
+    # Estadísticas del día desde el ReporteCaja (una fila por caja)
+    resumen = ReporteCaja.resumen_del_dia()
     estadisticas = {
-        'ventas_hoy': ventas_hoy.count(),
-        'total_hoy': ventas_hoy.aggregate(Sum('total'))['total__sum'] or 0,
-        'alumnos_atendidos': ventas_hoy.values('alumno').distinct().count(),
+        'ventas_hoy': resumen['ventas'],
+        'total_hoy': resumen['monto'],
+        'alumnos_atendidos': resumen['alumnos'],
         'ticket_promedio': 0
     }
     
@@ -176,24 +164,20 @@ def cerrar_turno(request):
         messages.error(request, 'No tienes un turno activo para cerrar.')
         return redirect('ventas:dashboard_cajero')
     
-    # Calcular estadísticas del turno
-    ventas_turno = Venta.objects.filter(
-        usuario=request.user,
-        fecha__gte=turno_activo.fecha_inicio
-    )
-    
-    total_ventas = ventas_turno.aggregate(Sum('total'))['total__sum'] or 0
-    cantidad_ventas = ventas_turno.count()
+    # Estadísticas del turno: contadores mantenidos por el cobro
+    total_ventas = turno_activo.total_ventas
+    cantidad_ventas = turno_activo.cantidad_ventas
     
     if request.method == 'POST':
         # Procesar el cierre
         monto_final = request.POST.get('monto_final', 0)
         observaciones = request.POST.get('observaciones', '')
         
-        turno_activo.monto_final = float(monto_final)
-        turno_activo.observaciones_cierre = observaciones
-        turno_activo.fecha_fin = timezone.now()
-        turno_activo.save()
+        try:
+            turno_activo.cerrar_turno(Decimal(str(monto_final or 0)), observaciones)
+        except (ValueError, ArithmeticError) as e:
+            messages.error(request, f'No se pudo cerrar el turno: {e}')
+            return redirect('ventas:dashboard_cajero')
         
         messages.success(request, 'Turno cerrado correctamente')
         return redirect('ventas:dashboard_cajero')